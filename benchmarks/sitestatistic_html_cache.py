@@ -0,0 +1,36 @@
+"""
+SiteStatistic 页面解析缓存性能对比，使用保存的站点首页HTML
+在 MoviePilot 环境中运行：python benchmarks/sitestatistic_html_cache.py index1.html index2.html ...
+"""
+import sys
+import timeit
+from pathlib import Path
+
+from app.plugins.sitestatistic.siteuserinfo.nexus_php import NexusPhpSiteUserInfo
+
+
+def parse_index(html_text: str, shared: bool):
+    site_info = NexusPhpSiteUserInfo(site_name="benchmark", url="https://example.com/", site_cookie="",
+                                     apikey="", token="", index_html=html_text)
+    # 与parse中对首页的解析步骤一致，不使用缓存时每一步都重新处理页面
+    for step in (site_info._parse_site_page, site_info._parse_user_base_info,
+                 site_info._parse_user_traffic_info):
+        if not shared:
+            site_info._clear_html_cache()
+        step(html_text)
+
+
+def main():
+    fixtures = [Path(arg).read_text(encoding="utf-8", errors="ignore") for arg in sys.argv[1:]]
+    if not fixtures:
+        print("请指定保存的站点首页HTML文件")
+        sys.exit(1)
+
+    number = 20
+    for shared_cache in (False, True):
+        cost = timeit.timeit(lambda: [parse_index(fixture, shared_cache) for fixture in fixtures], number=number)
+        print(f"{'共享解析缓存' if shared_cache else '每步重新解析'}：{cost / number * 1000:.1f} ms / {len(fixtures)} 个页面")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import re
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from multiprocessing.dummy import Pool as ThreadPool
-from multiprocessing.pool import ThreadPool
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Callable, Iterator
 from urllib.parse import urljoin
 
 import pytz
@@ -17,12 +17,12 @@ from app.core.config import settings
 from app.core.event import EventManager, eventmanager, Event
 from app.db.site_oper import SiteOper
 from app.db.sitestatistic_oper import SiteStatisticOper
-from app.helper.browser import PlaywrightHelper
 from app.helper.cloudflare import under_challenge
 from app.helper.module import ModuleHelper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.autosignin.browser_pool import browser_pool
 from app.schemas.types import EventType, NotificationType
 from app.utils.http import RequestUtils
 from app.utils.site import SiteUtils
@@ -38,7 +38,7 @@ class AutoSignIn(_PluginBase):
     # 插件图标
     plugin_icon = "signin.png"
     # 插件版本
-    plugin_version = "2.3.2"
+    plugin_version = "2.5"
     # 插件作者
     plugin_author = "thsrite"
     # 作者主页
@@ -68,6 +68,10 @@ class AutoSignIn(_PluginBase):
     _onlyonce: bool = False
     _notify: bool = False
     _queue_cnt: int = 5
+    # 浏览器仿真站点并发数量
+    _browser_queue_cnt: int = 2
+    # 单个站点超时时间（秒）
+    _site_timeout: int = 120
     _sign_sites: list = []
     _login_sites: list = []
     _retry_keyword = None
@@ -93,6 +97,10 @@ class AutoSignIn(_PluginBase):
             self._onlyonce = config.get("onlyonce")
             self._notify = config.get("notify")
             self._queue_cnt = config.get("queue_cnt") or 5
+            self._browser_queue_cnt = config.get("browser_queue_cnt") or 2
+            self._site_timeout = config.get("site_timeout") or 120
+            # 浏览器上下文数量与仿真队列数量一致
+            browser_pool.max_contexts = int(self._browser_queue_cnt)
             self._sign_sites = config.get("sign_sites") or []
             self._login_sites = config.get("login_sites") or []
             self._retry_keyword = config.get("retry_keyword")
@@ -144,6 +152,8 @@ class AutoSignIn(_PluginBase):
                 "cron": self._cron,
                 "onlyonce": self._onlyonce,
                 "queue_cnt": self._queue_cnt,
+                "browser_queue_cnt": self._browser_queue_cnt,
+                "site_timeout": self._site_timeout,
                 "sign_sites": self._sign_sites,
                 "login_sites": self._login_sites,
                 "retry_keyword": self._retry_keyword,
@@ -420,6 +430,40 @@ class AutoSignIn(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'browser_queue_cnt',
+                                            'label': '仿真队列数量',
+                                            'placeholder': '浏览器仿真站点同时执行数量'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'site_timeout',
+                                            'label': '站点超时时间',
+                                            'placeholder': '单个站点最长执行时间（秒）'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -519,6 +563,8 @@ class AutoSignIn(_PluginBase):
             "onlyonce": False,
             "clean": False,
             "queue_cnt": 5,
+            "browser_queue_cnt": 2,
+            "site_timeout": 120,
             "sign_sites": [],
             "login_sites": [],
             "retry_keyword": "错误|失败"
@@ -710,86 +756,80 @@ class AutoSignIn(_PluginBase):
 
         # 执行签到
         logger.info(f"开始执行{type_str}任务 ...")
-        if type_str == "签到":
-            with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.signin_site, do_sites)
-        else:
-            with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.login_site, do_sites)
+        do_func = self.signin_site if type_str == "签到" else self.login_site
 
-        if status:
-            logger.info(f"站点{type_str}任务完成！")
-            # 获取今天的日期
-            key = f"{datetime.now().month}月{datetime.now().day}日"
-            today_data = self.get_data(key)
-            if today_data:
-                if not isinstance(today_data, list):
-                    today_data = [today_data]
-                for s in status:
-                    today_data.append({
-                        "site": s[0],
-                        "status": s[1]
-                    })
-            else:
-                today_data = [{
-                    "site": s[0],
-                    "status": s[1]
-                } for s in status]
+        # 获取今天的日期
+        key = f"{datetime.now().month}月{datetime.now().day}日"
+        today_data = self.get_data(key) or []
+        if not isinstance(today_data, list):
+            today_data = [today_data]
+
+        # 全部站点结果
+        status = []
+        # 命中重试词的站点id
+        retry_sites = []
+        # 命中重试词的站点签到msg
+        retry_msg = []
+        # 登录成功
+        login_success_msg = []
+        # 签到成功
+        sign_success_msg = []
+        # 已签到
+        already_sign_msg = []
+        # 仿真签到成功
+        fz_sign_msg = []
+        # 失败｜错误
+        failed_msg = []
+
+        sites = {site.get('name'): site.get("id") for site in self.sites.get_indexers() if not site.get("public")}
+        # 每个站点完成后立即记录结果
+        for s in self.__schedule_sites(do_func=do_func, do_sites=do_sites, type_str=type_str):
+            status.append(s)
+            today_data.append({
+                "site": s[0],
+                "status": s[1]
+            })
             # 保存数据
             self.save_data(key, today_data)
 
-            # 命中重试词的站点id
-            retry_sites = []
-            # 命中重试词的站点签到msg
-            retry_msg = []
-            # 登录成功
-            login_success_msg = []
-            # 签到成功
-            sign_success_msg = []
-            # 已签到
-            already_sign_msg = []
-            # 仿真签到成功
-            fz_sign_msg = []
-            # 失败｜错误
-            failed_msg = []
+            site_name = s[0]
+            site_id = None
+            if site_name:
+                site_id = sites.get(site_name)
 
-            sites = {site.get('name'): site.get("id") for site in self.sites.get_indexers() if not site.get("public")}
-            for s in status:
-                site_name = s[0]
-                site_id = None
-                if site_name:
-                    site_id = sites.get(site_name)
+            if 'Cookie已失效' in str(s) and site_id:
+                # 触发自动登录插件登录
+                logger.info(f"触发站点 {site_name} 自动登录更新Cookie和Ua")
+                self.eventmanager.send_event(EventType.PluginAction,
+                                             {
+                                                 "site_id": site_id,
+                                                 "action": "site_refresh"
+                                             })
+            # 记录本次命中重试关键词的站点
+            if self._retry_keyword:
+                if site_id:
+                    match = re.search(self._retry_keyword, s[1])
+                    if match:
+                        logger.debug(f"站点 {site_name} 命中重试关键词 {self._retry_keyword}")
+                        retry_sites.append(site_id)
+                        # 命中的站点
+                        retry_msg.append(s)
+                        continue
 
-                if 'Cookie已失效' in str(s) and site_id:
-                    # 触发自动登录插件登录
-                    logger.info(f"触发站点 {site_name} 自动登录更新Cookie和Ua")
-                    self.eventmanager.send_event(EventType.PluginAction,
-                                                 {
-                                                     "site_id": site_id,
-                                                     "action": "site_refresh"
-                                                 })
-                # 记录本次命中重试关键词的站点
-                if self._retry_keyword:
-                    if site_id:
-                        match = re.search(self._retry_keyword, s[1])
-                        if match:
-                            logger.debug(f"站点 {site_name} 命中重试关键词 {self._retry_keyword}")
-                            retry_sites.append(site_id)
-                            # 命中的站点
-                            retry_msg.append(s)
-                            continue
+            if "登录成功" in str(s):
+                login_success_msg.append(s)
+            elif "仿真签到成功" in str(s):
+                fz_sign_msg.append(s)
+                continue
+            elif "签到成功" in str(s):
+                sign_success_msg.append(s)
+            elif '已签到' in str(s):
+                already_sign_msg.append(s)
+            else:
+                failed_msg.append(s)
 
-                if "登录成功" in str(s):
-                    login_success_msg.append(s)
-                elif "仿真签到成功" in str(s):
-                    fz_sign_msg.append(s)
-                    continue
-                elif "签到成功" in str(s):
-                    sign_success_msg.append(s)
-                elif '已签到' in str(s):
-                    already_sign_msg.append(s)
-                else:
-                    failed_msg.append(s)
+        if status:
+            logger.info(f"站点{type_str}任务完成！")
 
             if not self._retry_keyword:
                 # 没设置重试关键词则重试已选站点
@@ -835,6 +875,92 @@ class AutoSignIn(_PluginBase):
         # 保存配置
         self.__update_config()
 
+    def __schedule_sites(self, do_func: Callable[[CommentedMap], Tuple[str, str]],
+                         do_sites: List[CommentedMap], type_str: str) -> Iterator[Tuple[str, str]]:
+        """
+        分通道执行站点任务，普通站点与浏览器仿真站点分别限制并发，按完成顺序返回结果，超时的站点不再等待
+        :param do_func: 单个站点的执行方法
+        :param do_sites: 站点列表
+        :param type_str: 签到/登录
+        :return: （站点名称，结果信息）
+        """
+        lanes = {
+            "HTTP": [site for site in do_sites if not site.get("render")],
+            "浏览器仿真": [site for site in do_sites if site.get("render")]
+        }
+        lane_workers = {
+            "HTTP": int(self._queue_cnt or 5),
+            "浏览器仿真": int(self._browser_queue_cnt or 2)
+        }
+        timeout = int(self._site_timeout or 0)
+        # 站点开始及结束执行的时间，排队中的站点不计入超时
+        started: Dict[str, float] = {}
+        finished: Dict[str, float] = {}
+        # 各通道耗时统计：通道 -> [(站点名称, 耗时)]
+        metrics: Dict[str, List[Tuple[str, float]]] = {lane: [] for lane in lanes}
+
+        def run_site(site_info: CommentedMap) -> Tuple[str, str]:
+            started[site_info.get("name")] = time.time()
+            try:
+                return do_func(site_info)
+            finally:
+                finished[site_info.get("name")] = time.time()
+
+        begin_time = time.time()
+        executors = []
+        futures = {}
+        for lane, lane_sites in lanes.items():
+            if not lane_sites:
+                continue
+            executor = ThreadPoolExecutor(max_workers=max(1, min(len(lane_sites), lane_workers[lane])),
+                                          thread_name_prefix=f"autosignin-{'http' if lane == 'HTTP' else 'browser'}")
+            executors.append(executor)
+            for site_info in lane_sites:
+                futures[executor.submit(run_site, site_info)] = (lane, site_info.get("name"))
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                now = time.time()
+                for future in done:
+                    lane, site_name = futures[future]
+                    metrics[lane].append((site_name, finished.get(site_name, now) - started.get(site_name, now)))
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        logger.error(f"站点 {site_name} {type_str}异常：{str(e)}")
+                        yield site_name, f"{type_str}失败：{str(e)}！"
+                if not timeout:
+                    continue
+                for future in list(pending):
+                    lane, site_name = futures[future]
+                    start_time = started.get(site_name)
+                    if start_time and now - start_time > timeout:
+                        # 线程无法强制结束，不再等待该站点结果
+                        pending.discard(future)
+                        metrics[lane].append((site_name, now - start_time))
+                        logger.warn(f"站点 {site_name} {type_str}超时（{timeout}秒），不再等待")
+                        yield site_name, f"{type_str}失败，执行超时！"
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.__log_lane_metrics(type_str=type_str, metrics=metrics, elapsed=time.time() - begin_time)
+
+    @staticmethod
+    def __log_lane_metrics(type_str: str, metrics: Dict[str, List[Tuple[str, float]]], elapsed: float):
+        """
+        输出各通道耗时统计
+        """
+        lane_msgs = []
+        for lane, costs in metrics.items():
+            if not costs:
+                continue
+            slowest = max(costs, key=lambda x: x[1])
+            lane_msgs.append(f"{lane}通道 {len(costs)} 个站点，平均 {sum(c[1] for c in costs) / len(costs):.1f} 秒，"
+                             f"最慢 {slowest[0]} {slowest[1]:.1f} 秒")
+        if lane_msgs:
+            logger.info(f"站点{type_str}总耗时 {elapsed:.1f} 秒：{'；'.join(lane_msgs)}")
+
     def __build_class(self, url) -> Any:
         for site_schema in self._site_schema:
             try:
@@ -916,10 +1042,10 @@ class AutoSignIn(_PluginBase):
                 checkin_url = urljoin(site_url, "attendance.php")
             logger.info(f"开始站点签到：{site}，地址：{checkin_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=checkin_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server)
+                page_source = browser_pool.get_page_source(url=checkin_url,
+                                                           cookies=site_cookie,
+                                                           ua=ua,
+                                                           proxies=proxy_server)
                 if not SiteUtils.is_logged_in(page_source):
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
@@ -1015,10 +1141,10 @@ class AutoSignIn(_PluginBase):
             site_url = str(site_url).replace("attendance.php", "")
             logger.info(f"开始站点模拟登录：{site}，地址：{site_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=site_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server)
+                page_source = browser_pool.get_page_source(url=site_url,
+                                                           cookies=site_cookie,
+                                                           ua=ua,
+                                                           proxies=proxy_server)
                 if not SiteUtils.is_logged_in(page_source):
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
@@ -1065,6 +1191,7 @@ class AutoSignIn(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            browser_pool.close()
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
@@ -7,8 +7,8 @@ import chardet
 from ruamel.yaml import CommentedMap
 
 from app.core.config import settings
-from app.helper.browser import PlaywrightHelper
 from app.log import logger
+from app.plugins.autosignin.browser_pool import browser_pool
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
@@ -54,10 +54,10 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
         :return: 页面源码，错误信息
         """
         if render:
-            return PlaywrightHelper().get_page_source(url=url,
-                                                      cookies=cookie,
-                                                      ua=ua,
-                                                      proxies=settings.PROXY_SERVER if proxy else None)
+            return browser_pool.get_page_source(url=url,
+                                                cookies=cookie,
+                                                ua=ua,
+                                                proxies=settings.PROXY_SERVER if proxy else None)
         else:
             if token:
                 headers = {
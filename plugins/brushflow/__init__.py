@@ -4,8 +4,9 @@ import random
 import re
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
-from threading import Event
 from typing import Any, List, Dict, Tuple, Optional, Union, Set
 from urllib.parse import urlparse, parse_qs, unquote
 
@@ -17,6 +18,7 @@ from app import schemas
 from app.chain.torrents import TorrentsChain
 from app.core.config import settings
 from app.core.context import MediaInfo
+from app.core.event import eventmanager, Event
 from app.core.metainfo import MetaInfo
 from app.db.site_oper import SiteOper
 from app.db.subscribe_oper import SubscribeOper
@@ -24,7 +26,11 @@ from app.log import logger
 from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
+from app.plugins.brushflow.subscribe_matcher import SubscribeMatcher
+from app.plugins.brushflow.task_store import TorrentTaskStore
+from app.plugins.brushflow.torrent_sync import TorrentSyncTable
 from app.schemas import NotificationType, TorrentInfo, MediaType
+from app.schemas.types import EventType
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
@@ -78,6 +84,9 @@ class BrushConfig:
         self.auto_qb_category = config.get("auto_qb_category", False)
         self.qb_first_last_piece = config.get("qb_first_last_piece", False)
         self.site_hr_active = config.get("site_hr_active", False)
+        self.incremental_sync = config.get("incremental_sync", False)
+        self.brush_threads = self.__parse_number(config.get("brush_threads", 5))
+        self.brush_timeout = self.__parse_number(config.get("brush_timeout", 60))
 
         self.brush_tag = "刷流"
         # 站点独立配置
@@ -257,7 +266,7 @@ class BrushFlow(_PluginBase):
     # 插件图标
     plugin_icon = "brush.jpg"
     # 插件版本
-    plugin_version = "3.3"
+    plugin_version = "3.8"
     # 插件作者
     plugin_author = "jxxghp,InfinityPacer"
     # 作者主页
@@ -282,12 +291,22 @@ class BrushFlow(_PluginBase):
     _task_brush_enable = False
     # 订阅缓存信息
     _subscribe_infos = None
+    # 订阅标题匹配器
+    _subscribe_matcher = None
+    # 下载器种子增量同步表
+    _torrent_sync = None
+    # 刷流任务存储
+    _task_store = None
+    # tracker域名 -> (站点ID, 站点名称) 缓存
+    _tracker_site_cache: OrderedDict = OrderedDict()
+    _tracker_site_cache_size = 1024
+    _tracker_site_lock = threading.Lock()
     # Brush定时
     _brush_interval = 10
     # Check定时
     _check_interval = 5
     # 退出事件
-    _event = Event()
+    _event = threading.Event()
     _scheduler = None
     # tabs
     _tabs = None
@@ -301,6 +320,8 @@ class BrushFlow(_PluginBase):
         self.torrents = TorrentsChain()
         self.subscribeoper = SubscribeOper()
         self._task_brush_enable = False
+        self._torrent_sync = None
+        self.__clear_tracker_site_cache()
 
         if not config:
             logger.info("站点刷流任务出错，无法获取插件配置")
@@ -1656,6 +1677,22 @@ class BrushFlow(_PluginBase):
                                                         }
                                                     }
                                                 ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'incremental_sync',
+                                                            'label': '增量同步下载器种子',
+                                                        }
+                                                    }
+                                                ]
                                             }
                                         ]
                                     },
@@ -1677,6 +1714,40 @@ class BrushFlow(_PluginBase):
                                                         }
                                                     }
                                                 ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'brush_threads',
+                                                            'label': '站点并发数',
+                                                            'placeholder': '同时获取种子列表的站点数量'
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'brush_timeout',
+                                                            'label': '站点获取超时时间（秒）',
+                                                            'placeholder': '单个站点获取种子列表的超时时间'
+                                                        }
+                                                    }
+                                                ]
                                             }
                                         ]
                                     }
@@ -1861,12 +1932,15 @@ class BrushFlow(_PluginBase):
             "downloader_monitor": False,
             "auto_qb_category": False,
             "qb_first_last_piece": False,
+            "incremental_sync": False,
+            "brush_threads": 5,
+            "brush_timeout": 60,
             "site_config": BrushConfig.get_demo_site_config()
         }
 
     def get_page(self) -> List[dict]:
         # 种子明细
-        torrents = self.get_data("torrents") or {}
+        torrents = self.__get_tasks("torrents")
 
         if not torrents:
             return [
@@ -1962,6 +2036,9 @@ class BrushFlow(_PluginBase):
                     self._scheduler.shutdown()
                     self._event.clear()
                 self._scheduler = None
+            if self._task_store:
+                self._task_store.close()
+                self._task_store = None
         except Exception as e:
             print(str(e))
 
@@ -1983,7 +2060,7 @@ class BrushFlow(_PluginBase):
         with lock:
             logger.info(f"开始执行刷流任务 ...")
 
-            torrent_tasks: Dict[str, dict] = self.get_data("torrents") or {}
+            torrent_tasks: Dict[str, dict] = self.__get_tasks("torrents")
             torrents_size = self.__calculate_seeding_torrents_size(torrent_tasks=torrent_tasks)
 
             # 判断能否通过保种体积前置条件
@@ -2017,26 +2094,79 @@ class BrushFlow(_PluginBase):
 
             # 获取订阅标题
             subscribe_titles = self.__get_subscribe_titles()
+            subscribe_matcher = self.__get_subscribe_matcher(subscribe_titles=subscribe_titles)
+
+            # 并发获取所有站点的种子列表
+            site_torrents = self.__prefetch_site_torrents(site_infos=site_infos)
 
             # 处理所有站点
             for site in site_infos:
                 # 如果站点刷流没有正确响应，说明没有通过前置条件，其他站点也不需要继续刷流了
                 if not self.__brush_site_torrents(siteid=site.id, torrent_tasks=torrent_tasks,
                                                   statistic_info=statistic_info,
-                                                  subscribe_titles=subscribe_titles):
+                                                  subscribe_matcher=subscribe_matcher,
+                                                  torrents=site_torrents.get(site.id)):
                     logger.info(f"站点 {site.name} 刷流中途结束，停止后续刷流")
                     break
                 else:
                     logger.info(f"站点 {site.name} 刷流完成")
 
             # 保存数据
-            self.save_data("torrents", torrent_tasks)
+            self.__save_tasks("torrents", torrent_tasks)
             # 保存统计数据
             self.save_data("statistic", statistic_info)
             logger.info(f"刷流任务执行完成")
 
+    def __prefetch_site_torrents(self, site_infos: list) -> Dict[int, List[TorrentInfo]]:
+        """
+        并发获取各站点的种子列表，返回站点ID与种子列表的映射，超时或失败的站点不包含在结果中
+        """
+        if not site_infos:
+            return {}
+
+        brush_config = self.__get_brush_config()
+        max_workers = max(int(brush_config.brush_threads or 1), 1)
+        site_timeout = max(float(brush_config.brush_timeout or 60), 1)
+        # 站点数超过并发数时需要分批获取，整体等待时间按批次数放大
+        batches = (len(site_infos) + max_workers - 1) // max_workers
+        deadline = time.time() + site_timeout * batches
+
+        def browse_site(_site):
+            if self._event.is_set():
+                return None
+            _start_time = time.time()
+            logger.info(f"开始获取站点 {_site.name} 的新种子 ...")
+            _torrents = self.torrents.browse(domain=_site.domain)
+            logger.info(f"站点 {_site.name} 获取种子完成，数量：{len(_torrents or [])}，"
+                        f"耗时：{time.time() - _start_time:.1f} 秒")
+            return _torrents
+
+        start_time = time.time()
+        site_torrents = {}
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(site_infos)))
+        try:
+            futures = {site.id: (site, executor.submit(browse_site, site)) for site in site_infos}
+            for site_id, (site, future) in futures.items():
+                try:
+                    torrents = future.result(timeout=max(deadline - time.time(), 0))
+                except FuturesTimeoutError:
+                    logger.warn(f"站点 {site.name} 获取种子超时，本次跳过")
+                    continue
+                except Exception as e:
+                    logger.error(f"站点 {site.name} 获取种子失败：{str(e)}")
+                    continue
+                if torrents:
+                    site_torrents[site_id] = torrents
+        finally:
+            # 不等待超时的站点线程结束，避免阻塞刷流
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(f"站点种子获取完成，成功站点数：{len(site_torrents)}/{len(site_infos)}，"
+                    f"耗时：{time.time() - start_time:.1f} 秒")
+        return site_torrents
+
     def __brush_site_torrents(self, siteid, torrent_tasks: Dict[str, dict], statistic_info: Dict[str, int],
-                              subscribe_titles: Set[str]) -> bool:
+                              subscribe_matcher: SubscribeMatcher, torrents: Optional[List[TorrentInfo]]) -> bool:
         """
         针对站点进行刷流
         """
@@ -2045,8 +2175,6 @@ class BrushFlow(_PluginBase):
             logger.warn(f"站点不存在：{siteid}")
             return True
 
-        logger.info(f"开始获取站点 {siteinfo.name} 的新种子 ...")
-        torrents = self.torrents.browse(domain=siteinfo.domain)
         if not torrents:
             logger.info(f"站点 {siteinfo.name} 没有获取到种子")
             return True
@@ -2061,7 +2189,8 @@ class BrushFlow(_PluginBase):
 
         # 排除包含订阅的种子
         if brush_config.except_subscribe:
-            torrents = self.__filter_torrents_contains_subscribe(torrents=torrents, subscribe_titles=subscribe_titles)
+            torrents = self.__filter_torrents_contains_subscribe(torrents=torrents,
+                                                                 subscribe_matcher=subscribe_matcher)
 
         # 按发布日期降序排列
         torrents.sort(key=lambda x: x.pubdate or '', reverse=True)
@@ -2337,24 +2466,22 @@ class BrushFlow(_PluginBase):
 
         with lock:
             logger.info("开始检查刷流下载任务 ...")
-            torrent_tasks: Dict[str, dict] = self.get_data("torrents") or {}
-            unmanaged_tasks: Dict[str, dict] = self.get_data("unmanaged") or {}
+            torrent_tasks: Dict[str, dict] = self.__get_tasks("torrents")
+            unmanaged_tasks: Dict[str, dict] = self.__get_tasks("unmanaged")
 
             downloader = self.__get_downloader(brush_config.downloader)
             if not downloader:
                 logger.warn("无法获取下载器实例，将在下个时间周期重试")
                 return
 
-            seeding_torrents, error = downloader.get_torrents()
-            if error:
+            seeding_torrents_dict, changed_torrents_dict = self.__get_seeding_torrents(downloader=downloader)
+            if seeding_torrents_dict is None:
                 logger.warn("连接下载器出错，将在下个时间周期重试")
                 return
 
-            seeding_torrents_dict = {self.__get_hash(torrent): torrent for torrent in seeding_torrents}
-
-            # 检查种子刷流标签变更情况
+            # 检查种子刷流标签变更情况，增量同步时只需要检查发生变化的种子
             self.__update_seeding_tasks_based_on_tags(torrent_tasks=torrent_tasks, unmanaged_tasks=unmanaged_tasks,
-                                                      seeding_torrents_dict=seeding_torrents_dict)
+                                                      seeding_torrents_dict=changed_torrents_dict)
 
             torrent_check_hashes = list(torrent_tasks.keys())
             if not torrent_tasks or not torrent_check_hashes:
@@ -2403,10 +2530,35 @@ class BrushFlow(_PluginBase):
 
             self.__update_and_save_statistic_info(torrent_tasks)
 
-            self.save_data("torrents", torrent_tasks)
+            self.__save_tasks("torrents", torrent_tasks)
 
             logger.info("刷流下载任务检查完成")
 
+    def __get_seeding_torrents(self, downloader: Union[Transmission, Qbittorrent]) \
+            -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        获取下载器中的种子，返回全部种子以及本次发生变化的种子（hash -> 种子），获取失败时返回None
+        开启增量同步时基于内存中的同步表只拉取变化的种子，否则每次全量获取
+        """
+        brush_config = self.__get_brush_config()
+        if not brush_config.incremental_sync:
+            self._torrent_sync = None
+            seeding_torrents, error = downloader.get_torrents()
+            if error:
+                return None, None
+            seeding_torrents_dict = {self.__get_hash(torrent): torrent for torrent in seeding_torrents}
+            return seeding_torrents_dict, seeding_torrents_dict
+
+        if not self._torrent_sync or self._torrent_sync.downloader_type != brush_config.downloader:
+            self._torrent_sync = TorrentSyncTable(downloader_type=brush_config.downloader)
+
+        seeding_torrents_dict, changed_hashes = self._torrent_sync.sync(downloader=downloader)
+        if seeding_torrents_dict is None:
+            return None, None
+        logger.info(f"增量同步下载器种子完成，种子总数：{len(seeding_torrents_dict)}，本次变化：{len(changed_hashes)}")
+        changed_torrents_dict = {torrent_hash: seeding_torrents_dict[torrent_hash] for torrent_hash in changed_hashes}
+        return seeding_torrents_dict, changed_torrents_dict
+
     def __update_torrent_tasks_state(self, torrents: List[Any], torrent_tasks: Dict[str, dict]):
         """
         更新刷流任务的最新状态，上下传，分享率
@@ -2487,8 +2639,8 @@ class BrushFlow(_PluginBase):
                     logger.info(f"站点 {torrent_task.get('site_name')}，"
                                 f"刷流任务种子移除：{torrent_task.get('title')}|{torrent_task.get('description')}")
 
-        self.save_data("torrents", torrent_tasks)
-        self.save_data("unmanaged", unmanaged_tasks)
+        self.__save_tasks("torrents", torrent_tasks)
+        self.__save_tasks("unmanaged", unmanaged_tasks)
 
         # 发送汇总消息
         if added_tasks:
@@ -2883,7 +3035,7 @@ class BrushFlow(_PluginBase):
         active_uploaded, active_downloaded, active_count, total_unarchived = 0, 0, 0, 0
 
         statistic_info = self.__get_statistic_info()
-        archived_tasks = self.get_data("archived") or {}
+        archived_tasks = self.__get_tasks("archived")
         combined_tasks = {**torrent_tasks, **archived_tasks}
 
         for task in combined_tasks.values():
@@ -2922,7 +3074,7 @@ class BrushFlow(_PluginBase):
                     f"总下载量：{StringUtils.str_filesize(total_downloaded)}")
 
         self.save_data("statistic", statistic_info)
-        self.save_data("torrents", torrent_tasks)
+        self.__save_tasks("torrents", torrent_tasks)
 
     def __get_brush_config(self, sitename: str = None) -> BrushConfig:
         """
@@ -2954,7 +3106,9 @@ class BrushFlow(_PluginBase):
             "seed_avgspeed": "平均上传速度",
             "seed_inactivetime": "未活动时间",
             "up_speed": "单任务上传限速",
-            "dl_speed": "单任务下载限速"
+            "dl_speed": "单任务下载限速",
+            "brush_threads": "站点并发数",
+            "brush_timeout": "站点获取超时时间"
         }
 
         config_range_number_attr_to_desc = {
@@ -3040,6 +3194,9 @@ class BrushFlow(_PluginBase):
             "qb_category": brush_config.qb_category,
             "auto_qb_category": brush_config.auto_qb_category,
             "qb_first_last_piece": brush_config.qb_first_last_piece,
+            "incremental_sync": brush_config.incremental_sync,
+            "brush_threads": brush_config.brush_threads,
+            "brush_timeout": brush_config.brush_timeout,
             "enable_site_config": brush_config.enable_site_config,
             "site_config": brush_config.site_config,
             "_tabs": self._tabs
@@ -3617,12 +3774,10 @@ class BrushFlow(_PluginBase):
         """
         获取任务中的种子总大小
         """
-        # 读取种子记录
-        task_info = self.get_data("torrents") or {}
-        if not task_info:
+        task_store = self.__get_task_store()
+        if not task_store:
             return 0
-        total_size = sum([task.get("size") or 0 for task in task_info.values()])
-        return total_size
+        return task_store.total_size("torrents")
 
     def __get_downloader_info(self) -> schemas.DownloaderInfo:
         """
@@ -3770,8 +3925,17 @@ class BrushFlow(_PluginBase):
         unique_titles = {title for titles in self._subscribe_infos.values() for title in titles}
         return unique_titles
 
+    def __get_subscribe_matcher(self, subscribe_titles: Set[str]) -> SubscribeMatcher:
+        """
+        获取订阅标题匹配器，仅在订阅标题集合发生变化时重新构建
+        """
+        if self._subscribe_matcher is None or self._subscribe_matcher.titles != frozenset(subscribe_titles):
+            self._subscribe_matcher = SubscribeMatcher(subscribe_titles)
+            logger.info(f"订阅标题匹配器已重建，标题数量：{len(self._subscribe_matcher)}")
+        return self._subscribe_matcher
+
     @staticmethod
-    def __filter_torrents_contains_subscribe(torrents: Any, subscribe_titles: Set[str]):
+    def __filter_torrents_contains_subscribe(torrents: Any, subscribe_matcher: SubscribeMatcher):
         # 初始化两个列表，一个用于收集未被排除的种子，一个用于记录被排除的种子
         included_torrents = []
         excluded_torrents = []
@@ -3782,7 +3946,7 @@ class BrushFlow(_PluginBase):
             title = torrent.title or ''
             description = torrent.description or ''
 
-            if any(subscribe_title in title or subscribe_title in description for subscribe_title in subscribe_titles):
+            if subscribe_matcher.match(title, description):
                 # 如果种子的标题或描述包含订阅标题中的任一项，则记录为被排除
                 excluded_torrents.append(torrent)
                 logger.info(f"命中订阅内容，排除种子：{title}|{description}")
@@ -3835,10 +3999,10 @@ class BrushFlow(_PluginBase):
         """
         归档已经删除的种子数据
         """
-        torrent_tasks: Dict[str, dict] = self.get_data("torrents") or {}
+        torrent_tasks: Dict[str, dict] = self.__get_tasks("torrents")
 
         # 用于存储已删除的数据
-        archived_tasks: Dict[str, dict] = self.get_data("archived") or {}
+        archived_tasks: Dict[str, dict] = self.__get_tasks("archived")
 
         # 准备一个列表，记录所有需要从原始数据中删除的键
         keys_to_delete = []
@@ -3856,8 +4020,8 @@ class BrushFlow(_PluginBase):
         for key in keys_to_delete:
             del torrent_tasks[key]
 
-        self.save_data("archived", archived_tasks)
-        self.save_data("torrents", torrent_tasks)
+        self.__save_tasks("archived", archived_tasks)
+        self.__save_tasks("torrents", torrent_tasks)
         # 归档需要更新一下统计数据
         self.__update_and_save_statistic_info(torrent_tasks=torrent_tasks)
 
@@ -3866,11 +4030,40 @@ class BrushFlow(_PluginBase):
         清除统计数据
         彻底重置所有刷流数据，如当前还存在正在做种的刷流任务，待定时检查任务执行后，会自动纳入刷流管理
         """
-        self.save_data("torrents", {})
-        self.save_data("archived", {})
-        self.save_data("unmanaged", {})
+        task_store = self.__get_task_store()
+        if task_store:
+            task_store.clear()
         self.save_data("statistic", {})
 
+    def __get_task_store(self) -> Optional[TorrentTaskStore]:
+        """
+        获取刷流任务存储，首次使用时从插件数据迁移历史任务
+        """
+        if not self._task_store:
+            try:
+                task_store = TorrentTaskStore(db_path=self.get_data_path() / "tasks.db")
+                task_store.migrate(loader=lambda kind: self.get_data(kind))
+                self._task_store = task_store
+            except Exception as e:
+                logger.error(f"初始化刷流任务存储失败：{str(e)}")
+                return None
+        return self._task_store
+
+    def __get_tasks(self, kind: str) -> Dict[str, dict]:
+        """
+        读取刷流任务，kind 可选 torrents、unmanaged、archived
+        """
+        task_store = self.__get_task_store()
+        return task_store.load(kind) if task_store else {}
+
+    def __save_tasks(self, kind: str, tasks: Dict[str, dict]):
+        """
+        保存刷流任务，只写入发生变化的任务
+        """
+        task_store = self.__get_task_store()
+        if task_store:
+            task_store.save(kind, tasks)
+
     def __get_statistic_info(self) -> Dict[str, int]:
         """
         获取统计数据
@@ -3934,25 +4127,41 @@ class BrushFlow(_PluginBase):
         """
         根据tracker获取站点信息
         """
-        trackers = []
+        domain = "未知"
         try:
+            # 优先使用当前tracker，命中缓存时无需再解析磁力链接
             tracker_url = torrent.get("tracker")
             if tracker_url:
-                trackers.append(tracker_url)
+                site_id, domain = self.__get_site_by_tracker(tracker_url)
+                if site_id:
+                    return site_id, domain
 
             magnet_link = torrent.get("magnet_uri")
             if magnet_link:
                 query_params: dict = parse_qs(urlparse(magnet_link).query)
                 encoded_tracker_urls = query_params.get('tr', [])
-                # 解码tracker URLs然后扩展到trackers列表中
-                decoded_tracker_urls = [unquote(url) for url in encoded_tracker_urls]
-                trackers.extend(decoded_tracker_urls)
+                # 解码tracker URLs然后逐个匹配站点
+                for tracker in (unquote(url) for url in encoded_tracker_urls):
+                    if not tracker:
+                        continue
+                    site_id, domain = self.__get_site_by_tracker(tracker)
+                    if site_id:
+                        return site_id, domain
         except Exception as e:
             logger.error(e)
 
-        domain = "未知"
-        if not trackers:
-            return 0, domain
+        # 当找不到对应的站点信息时，返回一个默认值
+        return 0, domain
+
+    def __get_site_by_tracker(self, tracker: str) -> Tuple[int, str]:
+        """
+        根据tracker地址获取站点ID和名称，未匹配到站点时返回0和域名，结果按tracker域名缓存
+        """
+        netloc = urlparse(tracker).netloc or tracker
+        with self._tracker_site_lock:
+            if netloc in self._tracker_site_cache:
+                self._tracker_site_cache.move_to_end(netloc)
+                return self._tracker_site_cache[netloc]
 
         # 特定tracker到域名的映射
         tracker_mappings = {
@@ -3961,21 +4170,38 @@ class BrushFlow(_PluginBase):
             "tracker.cinefiles.info": "audiences.me",
         }
 
-        for tracker in trackers:
-            if not tracker:
-                continue
-            # 检查tracker是否包含特定的关键字，并进行相应的映射
-            for key, mapped_domain in tracker_mappings.items():
-                if key in tracker:
-                    domain = mapped_domain
-                    break
-            else:
-                # 使用StringUtils工具类获取tracker的域名
-                domain = StringUtils.get_url_domain(tracker)
+        # 检查tracker是否包含特定的关键字，并进行相应的映射
+        for key, mapped_domain in tracker_mappings.items():
+            if key in netloc:
+                domain = mapped_domain
+                break
+        else:
+            # 使用StringUtils工具类获取tracker的域名
+            domain = StringUtils.get_url_domain(tracker)
 
-            site_info = self.siteshelper.get_indexer(domain)
-            if site_info:
-                return site_info.get("id"), site_info.get("name")
+        site_info = self.siteshelper.get_indexer(domain)
+        result = (site_info.get("id"), site_info.get("name")) if site_info else (0, domain)
 
-        # 当找不到对应的站点信息时，返回一个默认值
-        return 0, domain
+        with self._tracker_site_lock:
+            self._tracker_site_cache[netloc] = result
+            while len(self._tracker_site_cache) > self._tracker_site_cache_size:
+                self._tracker_site_cache.popitem(last=False)
+        return result
+
+    @eventmanager.register(EventType.SiteUpdated)
+    def site_updated(self, event: Event = None):
+        """
+        站点新增或更新时清空tracker站点缓存
+        """
+        self.__clear_tracker_site_cache()
+
+    @eventmanager.register(EventType.SiteDeleted)
+    def site_deleted(self, event: Event = None):
+        """
+        站点删除时清空tracker站点缓存
+        """
+        self.__clear_tracker_site_cache()
+
+    def __clear_tracker_site_cache(self):
+        with self._tracker_site_lock:
+            self._tracker_site_cache.clear()
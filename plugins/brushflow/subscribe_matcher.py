@@ -0,0 +1,72 @@
+from collections import deque
+from typing import Iterable, Optional, List, Dict
+
+
+class SubscribeMatcher:
+    """
+    订阅标题多模式匹配器（Aho-Corasick自动机），一次扫描即可判断文本是否包含任一订阅标题
+    """
+
+    def __init__(self, titles: Iterable[str]):
+        self.titles = frozenset(title for title in titles if title)
+        # 状态转移表、失败指针以及每个状态命中的标题
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+        self.__build()
+
+    def __build(self):
+        """
+        构建自动机
+        """
+        for title in self.titles:
+            state = 0
+            for char in title:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                state = next_state
+            self._output[state] = title
+
+        # 广度优先计算失败指针，同时将失败状态的命中结果向下传递，匹配时只需检查当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        返回文本中命中的第一个订阅标题，未命中时返回None
+        """
+        if not text or not self.titles:
+            return None
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def match(self, *texts: str) -> bool:
+        """
+        判断任一文本是否包含订阅标题
+        """
+        return any(self.search(text) is not None for text in texts)
+
+    def __len__(self):
+        return len(self.titles)
+
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Callable, Optional
+
+from app.log import logger
+
+# 任务分类：刷流任务、未管理任务、已归档任务
+TASK_KINDS = ("torrents", "unmanaged", "archived")
+
+
+class TorrentTaskStore:
+    """
+    刷流任务存储，每个任务单独一行保存在SQLite中，保存时只写入发生变化的任务
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.__init_schema()
+        # 已落库的任务快照，用于保存时比对变化
+        self._snapshots: Dict[str, Dict[str, dict]] = {}
+
+    def __init_schema(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    kind TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    site INTEGER,
+                    site_name TEXT,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    time REAL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (kind, hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_site ON tasks (kind, site)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_deleted ON tasks (kind, deleted)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_time ON tasks (kind, time)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def migrate(self, loader: Callable[[str], Optional[dict]]):
+        """
+        从插件数据迁移任务，仅执行一次
+        :param loader: 根据任务分类读取原插件数据的方法
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+            counts = {}
+            for kind in TASK_KINDS:
+                tasks = loader(kind) or {}
+                self.__upsert(kind=kind, tasks=tasks)
+                counts[kind] = len(tasks)
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+            self._snapshots.clear()
+            logger.info(f"刷流任务数据迁移完成：{counts}")
+
+    def load(self, kind: str) -> Dict[str, dict]:
+        """
+        读取某一分类的全部任务，返回的数据可自由修改，通过save保存
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(kind)
+            if snapshot is None:
+                rows = self._conn.execute("SELECT hash, data FROM tasks WHERE kind = ?", (kind,)).fetchall()
+                snapshot = {torrent_hash: json.loads(data) for torrent_hash, data in rows}
+                self._snapshots[kind] = snapshot
+            return {torrent_hash: dict(task) for torrent_hash, task in snapshot.items()}
+
+    def save(self, kind: str, tasks: Dict[str, dict]):
+        """
+        保存某一分类的全部任务，只写入新增、变化以及删除的任务
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(kind)
+            if snapshot is None:
+                self.load(kind)
+                snapshot = self._snapshots[kind]
+
+            changed = {torrent_hash: task for torrent_hash, task in tasks.items()
+                       if snapshot.get(torrent_hash) != task}
+            removed = [torrent_hash for torrent_hash in snapshot if torrent_hash not in tasks]
+            if not changed and not removed:
+                return
+
+            self.__upsert(kind=kind, tasks=changed)
+            if removed:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM tasks WHERE kind = ? AND hash = ?",
+                                           [(kind, torrent_hash) for torrent_hash in removed])
+
+            for torrent_hash, task in changed.items():
+                snapshot[torrent_hash] = dict(task)
+            for torrent_hash in removed:
+                snapshot.pop(torrent_hash, None)
+            logger.debug(f"刷流任务 {kind} 保存完成，更新：{len(changed)}，删除：{len(removed)}")
+
+    def clear(self, kind: str = None):
+        """
+        清空任务，不指定分类时清空全部
+        """
+        with self._lock, self._conn:
+            if kind:
+                self._conn.execute("DELETE FROM tasks WHERE kind = ?", (kind,))
+                self._snapshots.pop(kind, None)
+            else:
+                self._conn.execute("DELETE FROM tasks")
+                self._snapshots.clear()
+
+    def total_size(self, kind: str, include_deleted: bool = True) -> int:
+        """
+        统计某一分类任务的种子总大小
+        """
+        sql = "SELECT COALESCE(SUM(size), 0) FROM tasks WHERE kind = ?"
+        if not include_deleted:
+            sql += " AND deleted = 0"
+        with self._lock:
+            return self._conn.execute(sql, (kind,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __upsert(self, kind: str, tasks: Dict[str, dict]):
+        if not tasks:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (kind, hash, site, site_name, deleted, size, time, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(kind, torrent_hash, task.get("site"), task.get("site_name"), 1 if task.get("deleted") else 0,
+                  task.get("size") or 0, task.get("time"), json.dumps(task, ensure_ascii=False))
+                 for torrent_hash, task in tasks.items()])
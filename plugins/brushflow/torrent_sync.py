@@ -0,0 +1,122 @@
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.log import logger
+
+# Transmission增量同步时需要获取的种子字段
+TR_TORRENT_FIELDS = ["id", "name", "status", "labels", "hashString", "totalSize", "percentDone", "addedDate",
+                     "trackerStats", "leftUntilDone", "rateDownload", "rateUpload", "recheckProgress",
+                     "peersGettingFromUs", "peersSendingToUs", "uploadRatio", "uploadedEver", "downloadedEver",
+                     "downloadDir", "error", "errorString", "doneDate", "queuePosition", "activityDate", "trackers"]
+# Transmission用于比对种子是否发生变化的轻量字段
+TR_BRIEF_FIELDS = ["id", "hashString", "activityDate", "status", "labels"]
+
+
+class TorrentSyncTable:
+    """
+    下载器种子增量同步表，qBittorrent基于sync/maindata的rid增量同步，Transmission基于活动时间比对增量同步，
+    在内存中维护完整的种子信息，每次同步只拉取发生变化的种子
+    """
+
+    def __init__(self, downloader_type: str):
+        self.downloader_type = downloader_type
+        # hash -> 种子信息
+        self._torrents: Dict[str, Any] = {}
+        # qBittorrent的同步序号
+        self._rid = 0
+        # Transmission的种子hash -> 变化标识
+        self._tr_states: Dict[str, tuple] = {}
+        self._synced = False
+
+    def reset(self):
+        """
+        清空同步表，下次同步时重新全量获取
+        """
+        self._torrents = {}
+        self._rid = 0
+        self._tr_states = {}
+        self._synced = False
+
+    def sync(self, downloader: Any) -> Tuple[Optional[Dict[str, Any]], Set[str]]:
+        """
+        同步下载器种子信息
+        :return: 全部种子信息（hash -> 种子），本次发生变化的种子hash集合；同步失败时种子信息返回None
+        """
+        try:
+            if self.downloader_type == "qbittorrent":
+                changed_hashes = self.__sync_qbittorrent(downloader)
+            else:
+                changed_hashes = self.__sync_transmission(downloader)
+        except Exception as e:
+            logger.error(f"增量同步下载器种子信息失败：{str(e)}")
+            self.reset()
+            return None, set()
+        self._synced = True
+        return self._torrents, changed_hashes
+
+    def __sync_qbittorrent(self, downloader: Any) -> Set[str]:
+        """
+        基于sync/maindata增量同步qBittorrent种子
+        """
+        if not downloader.qbc:
+            raise ConnectionError("qBittorrent未连接")
+        maindata = downloader.qbc.sync_maindata(rid=self._rid)
+        if maindata.get("full_update") or not self._synced:
+            self._torrents = {}
+
+        changed_hashes = set()
+        for torrent_hash, fields in (maindata.get("torrents") or {}).items():
+            torrent = self._torrents.get(torrent_hash)
+            if torrent is None:
+                torrent = self._torrents[torrent_hash] = {"hash": torrent_hash}
+            torrent.update(fields)
+            changed_hashes.add(torrent_hash)
+
+        for torrent_hash in maindata.get("torrents_removed") or []:
+            self._torrents.pop(torrent_hash, None)
+            changed_hashes.discard(torrent_hash)
+
+        self._rid = maindata.get("rid") or 0
+        logger.debug(f"qBittorrent增量同步完成，rid：{self._rid}，变化种子数：{len(changed_hashes)}，"
+                     f"种子总数：{len(self._torrents)}")
+        return changed_hashes
+
+    def __sync_transmission(self, downloader: Any) -> Set[str]:
+        """
+        增量同步Transmission种子，先获取轻量字段比对活动时间、标签及状态，仅对发生变化的种子获取完整信息
+        recently-active仅覆盖最近60秒内的变化，检查周期较长时会遗漏，因此这里不直接使用
+        """
+        if not downloader.trc:
+            raise ConnectionError("Transmission未连接")
+        if not self._synced:
+            self._torrents = {}
+            self._tr_states = {}
+
+        brief_torrents = downloader.trc.get_torrents(arguments=TR_BRIEF_FIELDS)
+        current_states = {torrent.hashString: (torrent.id, self.__tr_state(torrent)) for torrent in brief_torrents}
+
+        changed_ids = [torrent_id for torrent_hash, (torrent_id, state) in current_states.items()
+                       if self._tr_states.get(torrent_hash) != state]
+        removed_hashes = set(self._torrents) - set(current_states)
+
+        changed_hashes = set()
+        if changed_ids:
+            for torrent in downloader.trc.get_torrents(ids=changed_ids, arguments=TR_TORRENT_FIELDS):
+                self._torrents[torrent.hashString] = torrent
+                changed_hashes.add(torrent.hashString)
+
+        for torrent_hash in removed_hashes:
+            self._torrents.pop(torrent_hash, None)
+
+        self._tr_states = {torrent_hash: state for torrent_hash, (_, state) in current_states.items()
+                           if torrent_hash in self._torrents}
+
+        logger.debug(f"Transmission增量同步完成，变化种子数：{len(changed_hashes)}，种子总数：{len(self._torrents)}")
+        return changed_hashes
+
+    @staticmethod
+    def __tr_state(torrent: Any) -> tuple:
+        """
+        Transmission种子的变化标识
+        """
+        fields = torrent.fields
+        return fields.get("activityDate"), fields.get("status"), tuple(fields.get("labels") or [])
@@ -1,3 +1,4 @@
+import bisect
 import glob
 import os
 import shutil
@@ -15,7 +16,7 @@ from app.core.event import eventmanager, Event
 
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Set
 from app.log import logger
 from app.schemas import NotificationType
 
@@ -28,7 +29,7 @@ class CleanInvalidSeed(_PluginBase):
     # 插件图标
     plugin_icon = "clean_a.png"
     # 插件版本
-    plugin_version = "2.1"
+    plugin_version = "2.2"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -204,8 +205,7 @@ class CleanInvalidSeed(_PluginBase):
                     self.clean_invalid_seed()
                 elif event_data.get("action") == "detect_invalid_files":
                     logger.info("收到远程命令，开始检测无效源文件")
-                    self._delete_invalid_files = False
-                    self.detect_invalid_files()
+                    self.detect_invalid_files(dry_run=True)
                 elif event_data.get("action") == "delete_invalid_files":
                     logger.info("收到远程命令，开始清理无效源文件")
                     self._delete_invalid_files = True
@@ -480,13 +480,21 @@ class CleanInvalidSeed(_PluginBase):
         if self._detect_invalid_files:
             self.detect_invalid_files()
 
-    def detect_invalid_files(self):
+    def detect_invalid_files(self, dry_run: bool = False):
+        """
+        检测未做种的无效源文件
+        :param dry_run: 仅生成检测报告及各阶段耗时，不删除文件
+        """
         logger.info("开始检测未做种的无效源文件")
+        timings = {}
+        start_time = time.time()
         all_torrents = self.get_all_torrents()
+        timings["获取种子"] = time.time() - start_time
         source_path_map = {}
         source_paths = []
         total_size = 0
         deleted_file_cnt = 0
+        delete_invalid_files = self._delete_invalid_files and not dry_run
         exclude_key_words = (
             self._exclude_keywords.split("\n") if self._exclude_keywords else []
         )
@@ -502,12 +510,14 @@ class CleanInvalidSeed(_PluginBase):
             mp_path, qb_path = path.split(":")
             source_path_map[mp_path] = qb_path
             source_paths.append(mp_path)
-        # 所有做种源文件路径
-        content_path_set = set()
-        for torrent in all_torrents:
-            content_path_set.add(torrent.content_path)
+        # 所有做种源文件路径，建立后缀索引后通过二分查找判断是否包含源文件路径
+        step_time = time.time()
+        content_paths = {torrent.content_path for torrent in all_torrents if torrent.content_path}
+        seeding_index = self.__build_seeding_index(content_paths)
+        timings["建立索引"] = time.time() - step_time
 
         message = "检测未做种无效源文件：\n"
+        scan_time, size_time = 0.0, 0.0
         for source_path_str in source_paths:
             source_path = Path(source_path_str)
             # 判断source_path是否存在
@@ -519,10 +529,10 @@ class CleanInvalidSeed(_PluginBase):
                     text=f"{source_path} 不存在，无法检测未做种无效源文件",
                 )
                 continue
-            source_files = []
+            step_time = time.time()
             # 获取source_path下的所有文件包括文件夹
-            for file in source_path.iterdir():
-                source_files.append(file)
+            source_files = list(source_path.iterdir())
+            invalid_files = []
             for source_file in source_files:
                 skip = False
                 for key_word in exclude_key_words:
@@ -536,26 +546,32 @@ class CleanInvalidSeed(_PluginBase):
                 qb_path = (str(source_file)).replace(
                     source_path_str, source_path_map[source_path_str]
                 )
-                # todo: 优化性能
-                is_exist = False
-                for content_path in content_path_set:
-                    if qb_path in content_path:
-                        is_exist = True
-                        break
-
-                if not is_exist:
-                    deleted_file_cnt += 1
-                    message += f"{deleted_file_cnt}. {str(source_file)}\n"
-                    total_size += self.get_size(source_file)
-                    if self._delete_invalid_files:
-                        if source_file.is_file():
-                            source_file.unlink()
-                        elif source_file.is_dir():
-                            shutil.rmtree(source_file)
+                if not self.__is_seeding(qb_path, content_paths, seeding_index):
+                    invalid_files.append(source_file)
+            scan_time += time.time() - step_time
+
+            step_time = time.time()
+            for source_file in invalid_files:
+                deleted_file_cnt += 1
+                message += f"{deleted_file_cnt}. {str(source_file)}\n"
+                total_size += self.get_size(source_file)
+                if delete_invalid_files:
+                    if source_file.is_file():
+                        source_file.unlink()
+                    elif source_file.is_dir():
+                        shutil.rmtree(source_file)
+            size_time += time.time() - step_time
+        timings["比对文件"] = scan_time
+        timings["统计及清理"] = size_time
+        timings["总计"] = time.time() - start_time
 
         message += f"检测到{deleted_file_cnt}个未做种的无效源文件，共占用{StringUtils.str_filesize(total_size)}空间。\n"
-        if self._delete_invalid_files:
+        if delete_invalid_files:
             message += f"***已删除无效源文件，释放{StringUtils.str_filesize(total_size)}空间!***\n"
+        timing_message = "，".join(f"{name}{cost:.2f}秒" for name, cost in timings.items())
+        logger.info(f"检测无效源文件耗时：{timing_message}，做种数：{len(content_paths)}")
+        if dry_run:
+            message += f"检测报告（未删除文件），做种数：{len(content_paths)}，耗时：{timing_message}\n"
         logger.info(message)
         if self._notify:
             message = message.replace("_", "\_")
@@ -566,14 +582,57 @@ class CleanInvalidSeed(_PluginBase):
             )
         logger.info("检测无效源文件任务结束")
 
+    @staticmethod
+    def __build_seeding_index(content_paths: Set[str]) -> Tuple[List[str], List[Tuple[str, int]]]:
+        """
+        建立做种路径后缀索引，记录每个做种路径从各个路径分隔符开始的后缀，排序后可二分查找
+        :return: 排序后的后缀，及对应的（做种路径，后缀起始位置）
+        """
+        entries = sorted({(content_path[index:], content_path, index)
+                          for content_path in content_paths
+                          for index, char in enumerate(content_path) if char in "/\\"})
+        return [entry[0] for entry in entries], [(entry[1], entry[2]) for entry in entries]
+
+    @staticmethod
+    def __is_seeding(qb_path: str, content_paths: Set[str],
+                     seeding_index: Tuple[List[str], List[Tuple[str, int]]]) -> bool:
+        """
+        判断qb_path是否包含在做种路径中，与原有的子串判断结果一致，避免误删
+        qb_path在做种路径中出现时，其第一个路径分隔符开始的部分必然是该做种路径某个后缀的前缀，
+        因此只需二分查找以该部分开头的后缀，再核对分隔符之前的内容
+        """
+        separators = [index for index in (qb_path.find("/"), qb_path.find("\\")) if index >= 0]
+        if not separators:
+            return any(qb_path in content_path for content_path in content_paths)
+        head, tail = qb_path[:min(separators)], qb_path[min(separators):]
+        suffixes, owners = seeding_index
+        index = bisect.bisect_left(suffixes, tail)
+        while index < len(suffixes) and suffixes[index].startswith(tail):
+            content_path, start = owners[index]
+            if content_path[:start].endswith(head):
+                return True
+            index += 1
+        return False
+
     def get_size(self, path: Path):
-        total_size = 0
         if path.is_file():
             return path.stat().st_size
-        # rglob 方法用于递归遍历所有文件和目录
-        for entry in path.rglob("*"):
-            if entry.is_file():
-                total_size += entry.stat().st_size
+        # 基于os.scandir遍历，复用目录项中的文件信息
+        total_size = 0
+        dirs = [str(path)]
+        while dirs:
+            try:
+                with os.scandir(dirs.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                dirs.append(entry.path)
+                            elif entry.is_file():
+                                total_size += entry.stat().st_size
+                        except OSError:
+                            continue
+            except OSError:
+                continue
         return total_size
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
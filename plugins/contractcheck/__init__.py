@@ -20,7 +20,7 @@ from app.helper.module import ModuleHelper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
-from app.plugins.contractcheck.siteuserinfo import ISiteUserInfo
+from app.plugins.contractcheck.siteuserinfo import ISiteUserInfo, SiteSchemaMatcher
 from app.schemas.types import EventType, NotificationType
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
@@ -39,7 +39,7 @@ class ContractCheck(_PluginBase):
     # 插件图标
     plugin_icon = "contract.png"
     # 插件版本
-    plugin_version = "1.4"
+    plugin_version = "1.5"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -76,6 +76,10 @@ class ContractCheck(_PluginBase):
     _scheduler: Optional[BackgroundScheduler] = None
     _sites_data: dict = {}
     _site_schema: List[ISiteUserInfo] = None
+    _schema_matcher: Optional[SiteSchemaMatcher] = None
+    # 站点域名 -> 已识别的站点模型
+    _site_schema_cache: Dict[str, str] = {}
+    _site_schema_lock = Lock()
 
     # 配置属性
     _enabled: bool = False
@@ -112,6 +116,8 @@ class ContractCheck(_PluginBase):
             )
 
             self._site_schema.sort(key=lambda x: x.order)
+            self._schema_matcher = SiteSchemaMatcher(self._site_schema)
+            self._site_schema_cache = self.get_data("site_schemas") or {}
 
             # 立即运行一次
             if self._onlyonce:
@@ -733,14 +739,33 @@ class ContractCheck(_PluginBase):
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
-    def __build_class(self, html_text: str) -> Any:
-        for site_schema in self._site_schema:
-            try:
-                if site_schema.match(html_text):
-                    return site_schema
-            except Exception as e:
-                logger.error(f"站点匹配失败 {str(e)}")
-        return None
+    def __build_class(self, html_text: str, domain: str = None) -> Tuple[Any, bool]:
+        """
+        识别站点模型，已识别过的站点直接使用缓存的模型
+        :return: 站点模型，是否来自缓存
+        """
+        if domain:
+            schema_name = self._site_schema_cache.get(domain)
+            if schema_name:
+                for site_schema in self._site_schema:
+                    if site_schema.__name__ == schema_name:
+                        return site_schema, True
+        site_schema = self._schema_matcher.detect(html_text)
+        if site_schema and domain:
+            with self._site_schema_lock:
+                self._site_schema_cache[domain] = site_schema.__name__
+                self.save_data("site_schemas", self._site_schema_cache)
+        return site_schema, False
+
+    def __clear_site_schema(self, domain: str) -> bool:
+        """
+        清除站点缓存的模型，返回是否存在缓存
+        """
+        with self._site_schema_lock:
+            if self._site_schema_cache.pop(domain, None) is None:
+                return False
+            self.save_data("site_schemas", self._site_schema_cache)
+            return True
 
     def build(self, site_info: CommentedMap) -> Optional[ISiteUserInfo]:
         """
@@ -837,11 +862,11 @@ class ContractCheck(_PluginBase):
                     return None
             # 解析站点类型
             if html_text:
-                site_schema = self.__build_class(html_text)
+                site_schema, schema_cached = self.__build_class(html_text, domain=StringUtils.get_url_netloc(url)[1])
                 if not site_schema:
                     logger.error("站点 %s 无法识别站点类型" % site_name)
                     return None
-                return site_schema(
+                site_user_info = site_schema(
                     site_name,
                     url,
                     site_cookie,
@@ -850,6 +875,8 @@ class ContractCheck(_PluginBase):
                     ua=ua,
                     proxy=proxy,
                 )
+                site_user_info.schema_cached = schema_cached
+                return site_user_info
             return None
 
     # 检查契约达成情况，返回是否达成、差多少体积、差多少数量、还剩多少时间
@@ -893,7 +920,7 @@ class ContractCheck(_PluginBase):
             site_user_info: ISiteUserInfo = self.build(site_info=site_info)
             if site_user_info:
                 # 开始解析
-                site_user_info.parse_official_seeding_info()
+                site_user_info = self.__parse_site_user_info(site_info=site_info, site_user_info=site_user_info)
                 logger.info(f"站点 {site_name} 解析完成")
 
                 # 获取不到数据时，仅返回错误信息，不做历史数据更新
@@ -948,6 +975,28 @@ class ContractCheck(_PluginBase):
             logger.error(f"站点 {site_name} 获取流量数据失败：{str(e)}")
         return None
 
+    def __parse_site_user_info(self, site_info: CommentedMap, site_user_info: ISiteUserInfo) -> ISiteUserInfo:
+        """
+        解析保种信息，使用缓存的站点模型解析失败时重新识别站点模型并解析
+        """
+        error = None
+        try:
+            site_user_info.parse_official_seeding_info()
+        except Exception as e:
+            error = e
+        # 只有缓存的站点模型解析出错或未解析到用户信息时才重新识别，未登录等错误不重试
+        schema_mismatch = error or (not site_user_info.err_msg and not site_user_info.userid)
+        if site_user_info.schema_cached and schema_mismatch \
+                and self.__clear_site_schema(StringUtils.get_url_netloc(site_info.get("url"))[1]):
+            logger.info(f"站点 {site_info.get('name')} 使用 {site_user_info.site_schema()} 模型解析失败，重新识别站点模型")
+            new_site_user_info = self.build(site_info=site_info)
+            if new_site_user_info and type(new_site_user_info) is not type(site_user_info):
+                new_site_user_info.parse_official_seeding_info()
+                return new_site_user_info
+        if error:
+            raise error
+        return site_user_info
+
     @eventmanager.register(EventType.PluginAction)
     def refresh(self, event: Event):
         """
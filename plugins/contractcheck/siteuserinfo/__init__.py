@@ -3,7 +3,7 @@ import json
 import re
 from abc import ABCMeta, abstractmethod
 from enum import Enum
-from typing import Optional
+from typing import Optional, Any, List, Dict, Tuple, Set
 from urllib.parse import urljoin, urlsplit
 
 from requests import Session
@@ -40,6 +40,10 @@ class ISiteUserInfo(metaclass=ABCMeta):
     schema = SiteSchema.NexusPhp
     # 站点解析时判断顺序，值越小越先解析
     order = SITE_BASE_ORDER
+    # 站点识别特征，分别为首页html、页面文本、页面标题中包含的关键字，均未配置时使用match方法识别
+    match_html_keywords: Tuple[str, ...] = ()
+    match_text_keywords: Tuple[str, ...] = ()
+    match_title_keywords: Tuple[str, ...] = ()
 
     def __init__(self, site_name: str,
                  url: str,
@@ -74,6 +78,8 @@ class ISiteUserInfo(metaclass=ABCMeta):
 
         # 错误信息
         self.err_msg = None
+        # 站点模型是否来自缓存
+        self.schema_cached = False
         # 内部数据
         self._base_url = None
         self._site_cookie = None
@@ -105,6 +111,13 @@ class ISiteUserInfo(metaclass=ABCMeta):
         """
         return self.schema
 
+    @classmethod
+    def has_fingerprint(cls) -> bool:
+        """
+        是否配置了站点识别特征
+        """
+        return bool(cls.match_html_keywords or cls.match_text_keywords or cls.match_title_keywords)
+
     @classmethod
     def match(cls, html_text: str) -> bool:
         """
@@ -112,7 +125,9 @@ class ISiteUserInfo(metaclass=ABCMeta):
         :param html_text: 站点首页html
         :return: 是否匹配
         """
-        pass
+        if not cls.has_fingerprint():
+            return False
+        return SiteSchemaMatcher([cls]).detect(html_text) is cls
 
     # 用于契约检查插件获取保种信息
     def parse_official_seeding_info(self):
@@ -320,3 +335,84 @@ class ISiteUserInfo(metaclass=ABCMeta):
             if isinstance(getattr(self, attr), SiteSchema)
             else getattr(self, attr) for attr in attributes
         }
+
+
+class SiteSchemaMatcher:
+    """
+    站点模型识别器，将各模型的识别特征合并为一个正则，首页html、页面文本及标题各扫描一次即可识别站点模型
+    """
+
+    # 识别特征的范围
+    _scopes = ("html", "text", "title")
+
+    def __init__(self, schemas: List[Any]):
+        self._schemas = sorted(schemas, key=lambda x: x.order)
+        self._keywords: Dict[str, Set[str]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        for scope in self._scopes:
+            keywords = {keyword for schema in self._schemas
+                        for keyword in getattr(schema, f"match_{scope}_keywords") if keyword}
+            if not keywords:
+                continue
+            self._keywords[scope] = keywords
+            # 零宽断言可命中每个位置，长关键字优先，被覆盖的短关键字在命中后补全
+            self._patterns[scope] = re.compile(
+                "(?=(%s))" % "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)),
+                re.S)
+
+    def detect(self, html_text: str) -> Optional[Any]:
+        """
+        按模型顺序返回第一个匹配的站点模型
+        :param html_text: 站点首页html
+        """
+        if not html_text:
+            return None
+        hits: Dict[str, Set[str]] = {}
+        documents: Dict[str, Any] = {}
+        for schema in self._schemas:
+            try:
+                if not schema.has_fingerprint():
+                    if schema.match(html_text):
+                        return schema
+                    continue
+                for scope in self._scopes:
+                    keywords = getattr(schema, f"match_{scope}_keywords")
+                    if not keywords:
+                        continue
+                    if scope not in hits:
+                        hits[scope] = self.__scan(scope, self.__get_document(scope, html_text, documents))
+                    if hits[scope].intersection(keywords):
+                        return schema
+            except Exception as e:
+                logger.error(f"站点匹配失败 {str(e)}")
+        return None
+
+    def __scan(self, scope: str, document: str) -> Set[str]:
+        """
+        扫描文本，返回命中的全部关键字
+        """
+        if not document:
+            return set()
+        matched = {match.group(1) for match in self._patterns[scope].finditer(document)}
+        return {keyword for keyword in self._keywords[scope] if any(keyword in m for m in matched)}
+
+    @staticmethod
+    def __get_document(scope: str, html_text: str, documents: Dict[str, Any]) -> str:
+        """
+        获取识别范围对应的文本，页面只解析一次
+        """
+        if scope == "html":
+            return html_text
+        if scope not in documents:
+            if "tree" not in documents:
+                documents["tree"] = etree.HTML(html_text)
+            html = documents["tree"]
+            if html is None:
+                documents[scope] = ""
+            elif scope == "text":
+                documents[scope] = html.xpath("string(.)")
+            else:
+                titles = html.xpath("//title/text()")
+                documents[scope] = str(titles[0]) if titles else ""
+        return documents[scope]
+
@@ -16,10 +16,12 @@ class NexusPhpSiteUserInfo(ISiteUserInfo):
     @classmethod
     def match(cls, html_text: str) -> bool:
         """
-        默认使用NexusPhp解析
+        默认使用NexusPhp解析，配置了识别特征的子类按特征识别
         :param html_text:
         :return:
         """
+        if cls.has_fingerprint():
+            return super().match(html_text)
         return True
 
     def _parse_site_page(self, html_text: str):
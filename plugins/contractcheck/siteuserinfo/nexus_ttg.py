@@ -12,11 +12,8 @@ from app.utils.string import StringUtils
 class NexusTtgSiteUserInfo(NexusPhpSiteUserInfo):
     schema = SiteSchema.NexusTtg
     order = SITE_BASE_ORDER + 20
+    match_html_keywords = ('totheglory.im',)
 
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'totheglory.im' in html_text
-        
     def _parse_user_torrent_seeding_info(self, html_text: str, multi_page: bool = False) -> Optional[str]:
             """
             做种相关信息
@@ -1,17 +1,16 @@
-import hashlib
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from threading import Event
-from typing import Any, Dict, List, Optional, Tuple, Union
+from threading import Event, Lock
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import pytz
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from bencode import bdecode, bencode
 
 from app.core.config import settings
 from app.core.event import eventmanager
@@ -22,6 +21,8 @@ from app.log import logger
 from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
+from app.plugins.crossseed.torrent_cache import TorrentMetaCache, parse_torrent_data
+from app.plugins.crossseed.seed_cache import SeedCache, ERROR_CACHE_TTL
 from app.schemas import NotificationType
 from app.schemas.types import EventType
 from app.utils.string import StringUtils
@@ -97,19 +98,18 @@ class TorInfo:
     @staticmethod
     def from_data(data: bytes) -> Tuple[Optional[Any], Optional[str]]:
         try:
-            torrent = bdecode(data)
-            info = torrent["info"]
-            pieces = info["pieces"]
-            info_hash = hashlib.sha1(bencode(info)).hexdigest()
-            pieces_hash = hashlib.sha1(pieces).hexdigest()
-            local_tor = TorInfo(info_hash=info_hash, pieces_hash=pieces_hash)
-            # 从种子中获取 announce, qb可能存在获取不到的情况，会存在于fastresume文件中
-            if "announce" in torrent:
-                local_tor.torrent_announce = torrent["announce"]
-            return local_tor, None
+            return TorInfo.from_meta(parse_torrent_data(data)), None
         except Exception as err:
             return None, str(err)
 
+    @staticmethod
+    def from_meta(meta: dict, torrent_path: str = None):
+        local_tor = TorInfo(torrent_path=torrent_path, info_hash=meta.get("info_hash"),
+                            pieces_hash=meta.get("pieces_hash"))
+        # 从种子中获取 announce, qb可能存在获取不到的情况，会存在于fastresume文件中
+        local_tor.torrent_announce = meta.get("announce")
+        return local_tor
+
     def get_name_id_tag(self):
         return f"{self.site_name}:{self.torrent_id}"
 
@@ -180,7 +180,7 @@ class CrossSeed(_PluginBase):
     # 插件图标
     plugin_icon = "qingwa.png"
     # 插件版本
-    plugin_version = "2.3"
+    plugin_version = "2.6"
     # 插件作者
     plugin_author = "233@qingwa"
     # 作者主页
@@ -212,20 +212,26 @@ class CrossSeed(_PluginBase):
     _nolabels = None
     _nopaths = None
     _clearcache = False
+    # 每批次查询的种子数
+    _chunk_size = 100
+    # 同时查询的站点数上限
+    _max_site_lanes = 10
     # 退出事件
     _event = Event()
     _torrent_tags = ["已整理", "辅种"]
     # 待校全种子hash清单
     _recheck_torrents = {}
     _is_recheck_running = False
-    # 辅种缓存，出错的种子不再重复辅种，可清除
-    _error_caches = []
+    # 辅种缓存，出错的种子在有效期内不再重复辅种，可清除
+    _error_caches = SeedCache(ttl=ERROR_CACHE_TTL)
     # 辅种缓存，辅种成功的种子，可清除
-    _success_caches = []
+    _success_caches = SeedCache()
     # 辅种缓存，出错的种子不再重复辅种，且无法清除。种子被删除404等情况
-    _permanent_error_caches = []
+    _permanent_error_caches = SeedCache()
     _torrentpaths = []
     _site_cs_infos = []
+    # 种子文件元数据缓存
+    _meta_cache = None
     # 辅种计数
     total = 0
     realtotal = 0
@@ -253,9 +259,11 @@ class CrossSeed(_PluginBase):
             self._nolabels = config.get("nolabels")
             self._nopaths = config.get("nopaths")
             self._clearcache = config.get("clearcache")
-            self._permanent_error_caches = [] if self._clearcache else config.get("permanent_error_caches") or []
-            self._error_caches = [] if self._clearcache else config.get("error_caches") or []
-            self._success_caches = [] if self._clearcache else config.get("success_caches") or []
+            try:
+                self._chunk_size = max(int(config.get("chunk_size") or 100), 1)
+            except ValueError:
+                self._chunk_size = 100
+            self.__load_caches(config)
 
             # 过滤掉已删除的站点
             inner_site_list = self.siteoper.list_order_by_pri()
@@ -567,7 +575,7 @@ class CrossSeed(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 12
+                                    'md': 8
                                 },
                                 'content': [
                                     {
@@ -579,6 +587,23 @@ class CrossSeed(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'chunk_size',
+                                            'label': '每批查询数量',
+                                            'placeholder': '100'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -711,6 +736,7 @@ class CrossSeed(_PluginBase):
             "onlyonce": False,
             "notify": False,
             "clearcache": False,
+            "chunk_size": 100,
             "cron": "",
             "token": "",
             "downloaders": [],
@@ -728,6 +754,7 @@ class CrossSeed(_PluginBase):
             "enabled": self._enabled,
             "onlyonce": self._onlyonce,
             "clearcache": self._clearcache,
+            "chunk_size": self._chunk_size,
             "cron": self._cron,
             "token": self._token,
             "downloaders": self._downloaders,
@@ -735,10 +762,35 @@ class CrossSeed(_PluginBase):
             "sites": self._sites,
             "notify": self._notify,
             "nolabels": self._nolabels,
-            "nopaths": self._nopaths,
-            "success_caches": self._success_caches,
-            "error_caches": self._error_caches,
-            "permanent_error_caches": self._permanent_error_caches
+            "nopaths": self._nopaths
+        })
+
+    def __load_caches(self, config: dict):
+        """
+        读取辅种缓存，兼容旧版本保存在配置中的缓存列表，清除缓存时清空全部缓存
+        """
+        if self._clearcache:
+            self._success_caches.clear()
+            self._error_caches.clear()
+            self._permanent_error_caches.clear()
+            self.__save_caches()
+            return
+        caches = self.get_data("seed_caches") or {}
+        self._success_caches.load(caches.get("success") or config.get("success_caches"))
+        self._error_caches.load(caches.get("error") or config.get("error_caches"))
+        self._permanent_error_caches.load(caches.get("permanent_error") or config.get("permanent_error_caches"))
+        if not caches:
+            # 旧版本缓存随后会从配置中移除，立即迁移到插件数据
+            self.__save_caches()
+
+    def __save_caches(self):
+        """
+        保存辅种缓存，只保存未过期的条目
+        """
+        self.save_data("seed_caches", {
+            "success": self._success_caches.dump(),
+            "error": self._error_caches.dump(),
+            "permanent_error": self._permanent_error_caches.dump()
         })
 
     def __get_downloader(self, dtype: str):
@@ -776,7 +828,7 @@ class CrossSeed(_PluginBase):
             else:
                 logger.info(f"下载器 {downloader} 没有已完成种子")
                 continue
-            hash_strs = []
+            candidates = []
             for torrent in torrents:
                 if self._event.is_set():
                     logger.info(f"辅种服务停止")
@@ -789,30 +841,43 @@ class CrossSeed(_PluginBase):
                 save_path = self.__get_save_path(torrent, downloader)
                 # 获取种子文件路径
                 torrent_path = Path(self._torrentpaths[idx]) / f"{hash_str}.torrent"
-                torrent_info = None
                 if not torrent_path.exists():
-                    if False and downloader == "qbittorrent":
-                        # qb开启SQLite功能后将不再以hash命名的方式保存torrent文件
-                        # TODO 导出功能需要qb4.5.0以上版本才支持
-                        logger.warn(f"QB种子文件不存在：{torrent_path} 尝试远程导出种子")
-                        try:
-                            torrent_data = torrent.export()
-                            torrent_info, err = TorInfo.from_data(torrent_data)
-                        except Exception as e:
-                            err = str(e)
-                        if not torrent_info:
-                            logger.error(f"尝试远程导出种子 {hash_str} 出错 {err}")
-                            continue
-                    else:
-                        logger.error(f"种子文件不存在：{torrent_path}")
+                    logger.error(f"种子文件不存在：{torrent_path}")
+                    continue
+
+                if self._nopaths and save_path:
+                    # 过滤不需要转移的路径
+                    nopath_skip = False
+                    for nopath in self._nopaths.split('\n'):
+                        if os.path.normpath(save_path).startswith(os.path.normpath(nopath)):
+                            logger.info(f"种子 {hash_str} 保存路径 {save_path} 不需要辅种，跳过 ...")
+                            nopath_skip = True
+                            break
+                    if nopath_skip:
                         continue
 
-                # 读取种子文件具体信息
-                if not torrent_info:
-                    torrent_info, err = self.cross_helper.get_local_torrent_info(torrent_path)
-                    if not torrent_info:
-                        logger.error(f"未能读取到种子文件具体信息：{torrent_path} {err}")
+                # 获取种子标签
+                torrent_labels = self.__get_label(torrent, downloader)
+                if torrent_labels and self._nolabels:
+                    is_skip = False
+                    for label in self._nolabels.split(','):
+                        if label in torrent_labels:
+                            logger.info(f"种子 {hash_str} 含有不辅种标签 {label}，跳过 ...")
+                            is_skip = True
+                            break
+                    if is_skip:
                         continue
+                candidates.append((torrent, hash_str, save_path, torrent_path))
+
+            # 批量读取种子文件具体信息，未变化的种子文件直接使用缓存
+            torrent_metas = self.__get_torrent_metas([torrent_path for _, _, _, torrent_path in candidates])
+            hash_strs = []
+            for torrent, hash_str, save_path, torrent_path in candidates:
+                meta, err = torrent_metas.get(str(torrent_path)) or (None, None)
+                if not meta:
+                    logger.error(f"未能读取到种子文件具体信息：{torrent_path} {err}")
+                    continue
+                torrent_info = TorInfo.from_meta(meta, torrent_path=str(torrent_path))
 
                 # 用站点+pieces_hash记录该站点是否已经在该下载器中,需要从tracker补充站点名字
                 tracker_urls = set()
@@ -841,28 +906,6 @@ class CrossSeed(_PluginBase):
                         if site_info:
                             torrent_info.site_name = site_info.get("name")
 
-                if self._nopaths and save_path:
-                    # 过滤不需要转移的路径
-                    nopath_skip = False
-                    for nopath in self._nopaths.split('\n'):
-                        if os.path.normpath(save_path).startswith(os.path.normpath(nopath)):
-                            logger.info(f"种子 {hash_str} 保存路径 {save_path} 不需要辅种，跳过 ...")
-                            nopath_skip = True
-                            break
-                    if nopath_skip:
-                        continue
-
-                # 获取种子标签
-                torrent_labels = self.__get_label(torrent, downloader)
-                if torrent_labels and self._nolabels:
-                    is_skip = False
-                    for label in self._nolabels.split(','):
-                        if label in torrent_labels:
-                            logger.info(f"种子 {hash_str} 含有不辅种标签 {label}，跳过 ...")
-                            is_skip = True
-                            break
-                    if is_skip:
-                        continue
                 hash_strs.append({
                     "hash": hash_str,
                     "save_path": save_path,
@@ -875,7 +918,7 @@ class CrossSeed(_PluginBase):
             else:
                 logger.info(f"没有需要辅种的种子")
         # 保存缓存
-        self.__update_config()
+        self.__save_caches()
         # 发送消息
         if self._notify:
             if self.success or self.fail:
@@ -891,6 +934,42 @@ class CrossSeed(_PluginBase):
                 )
         logger.info("辅种任务执行完成")
 
+    def __get_meta_cache(self) -> Optional[TorrentMetaCache]:
+        """
+        获取种子文件元数据缓存
+        """
+        if not self._meta_cache:
+            try:
+                self._meta_cache = TorrentMetaCache(db_path=self.get_data_path() / "torrents.db")
+            except Exception as e:
+                logger.error(f"初始化种子文件元数据缓存失败：{str(e)}")
+                return None
+        return self._meta_cache
+
+    def __get_torrent_metas(self, torrent_paths: List[Path]) -> Dict[str, Tuple[Optional[dict], Optional[str]]]:
+        """
+        批量读取种子文件元数据，缓存不可用时逐个解析
+        :return: 种子文件路径 -> （种子元数据，错误信息）
+        """
+        if not torrent_paths:
+            return {}
+        meta_cache = self.__get_meta_cache()
+        if meta_cache:
+            try:
+                return meta_cache.load(torrent_paths)
+            except Exception as e:
+                logger.error(f"读取种子文件元数据缓存失败：{str(e)}")
+        results = {}
+        for torrent_path in torrent_paths:
+            torrent_info, err = self.cross_helper.get_local_torrent_info(torrent_path)
+            if torrent_info:
+                results[str(torrent_path)] = {"info_hash": torrent_info.info_hash,
+                                              "pieces_hash": torrent_info.pieces_hash,
+                                              "announce": torrent_info.torrent_announce}, None
+            else:
+                results[str(torrent_path)] = None, err
+        return results
+
     def check_recheck(self):
         """
         定时检查下载器中种子是否校验完成，校验完成且完整的自动开始辅种
@@ -954,73 +1033,103 @@ class CrossSeed(_PluginBase):
         logger.info(f"去重后，总共需要辅种查询的种子数：{len(pieces_hash_set)}")
         pieces_hashes = list(pieces_hash_set)
 
-        # 分站点逐个批次辅种
-        # 逐个站点查询可辅种数据
-        chunk_size = 100
+        # 每个站点一个查询通道，站点内按请求间隔逐批查询，站点之间并发查询
+        site_configs = []
         for site_config in self._site_cs_infos:
             # 检查站点是否已经停用
             db_site = self.siteoper.get(site_config.id)
             if db_site and not db_site.is_active:
                 logger.info(f"站点{site_config.name}已停用，跳过辅种")
                 continue
-            remote_tors: List[TorInfo] = []
-            total_size = len(pieces_hashes)
-            for i in range(0, len(pieces_hashes), chunk_size):
-                if self._event.is_set():
-                    logger.info(f"辅种服务停止")
-                    return
-                # 切片操作
-                chunk = pieces_hashes[i:i + chunk_size]
-                # 处理分组
-                chunk_tors, err_msg = self.cross_helper.get_target_torrent(site_config, chunk)
-                if not chunk_tors and err_msg:
-                    logger.info(
-                        f"查询站点{site_config.name}可辅种的信息出错 {err_msg},进度={i + 1}/{total_size}"
-                    )
-                else:
-                    logger.info(
-                        f"站点{site_config.name}本批次的可辅种/查询数={len(chunk_tors)}/{len(chunk)},进度={i + 1}/{total_size}"
-                    )
-                    remote_tors = remote_tors + chunk_tors
-
-            logger.info(f"站点{site_config.name}返回可以辅种的种子总数为{len(remote_tors)}")
-
-            # 去除已经下载过的种子
-            local_cnt = 0
-            not_local_tors = []
-            for tor_info in remote_tors:
-                if (
-                        tor_info
-                        and tor_info.site_name
-                        and tor_info.pieces_hash
-                        and tor_info.get_name_pieces_tag() in site_pieces_hash_set
-                ):
-                    local_cnt = local_cnt + 1
-                else:
-                    not_local_tors.append(tor_info)
-            logger.info(f"站点{site_config.name}正在做种或已经辅种过的种子数为{local_cnt}")
+            site_configs.append(site_config)
+        if not site_configs:
+            logger.info(f"下载器 {downloader} 没有可辅种的站点")
+            return
 
-            for tor_info in not_local_tors:
+        # 各站点共享的去重集合，同一站点种子只处理一次
+        seen_tags = set()
+        seen_lock = Lock()
+        executor = ThreadPoolExecutor(max_workers=min(len(site_configs), self._max_site_lanes),
+                                      thread_name_prefix="CrossSeed")
+        futures = {executor.submit(self.__query_site_torrents, site_config, pieces_hashes,
+                                   site_pieces_hash_set, seen_tags, seen_lock): site_config
+                   for site_config in site_configs}
+        try:
+            # 先返回结果的站点先辅种，添加下载任务在当前线程中依次执行
+            for future in as_completed(futures):
+                site_config = futures[future]
                 if self._event.is_set():
                     logger.info(f"辅种服务停止")
                     return
-                if not tor_info:
-                    continue
-                if not tor_info.torrent_id or not tor_info.pieces_hash:
-                    continue
-                if tor_info.get_name_id_tag() in self._success_caches:
-                    logger.info(f"{tor_info.get_name_id_tag()} 已处理过辅种，跳过 ...")
-                    continue
-                if tor_info.get_name_id_tag() in self._error_caches or tor_info.get_name_id_tag() in self._permanent_error_caches:
-                    logger.info(f"种子 {tor_info.get_name_id_tag()} 辅种失败且已缓存，跳过 ...")
+                try:
+                    remote_tors = future.result()
+                except Exception as e:
+                    logger.error(f"查询站点{site_config.name}可辅种的信息出错 {str(e)}")
                     continue
-                # 添加任务
-                self.__download_torrent(tor=tor_info, site_config=site_config,
-                                        downloader=downloader,
-                                        save_path=save_paths.get(tor_info.pieces_hash))
+                for tor_info in remote_tors:
+                    if self._event.is_set():
+                        logger.info(f"辅种服务停止")
+                        return
+                    if tor_info.get_name_id_tag() in self._success_caches:
+                        logger.info(f"{tor_info.get_name_id_tag()} 已处理过辅种，跳过 ...")
+                        continue
+                    if tor_info.get_name_id_tag() in self._error_caches or tor_info.get_name_id_tag() in self._permanent_error_caches:
+                        logger.info(f"种子 {tor_info.get_name_id_tag()} 辅种失败且已缓存，跳过 ...")
+                        continue
+                    # 添加任务
+                    self.__download_torrent(tor=tor_info, site_config=site_config,
+                                            downloader=downloader,
+                                            save_path=save_paths.get(tor_info.pieces_hash))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
         logger.info(f"下载器 {downloader} 辅种完成")
 
+    def __query_site_torrents(self, site_config: CSSiteConfig, pieces_hashes: List[str],
+                              site_pieces_hash_set: Set[str], seen_tags: Set[str], seen_lock: Lock) -> List[TorInfo]:
+        """
+        查询单个站点可辅种的种子，按批次大小分批请求，返回去除本地已有及其它批次重复后的种子
+        """
+        remote_tors: List[TorInfo] = []
+        chunk_size = self._chunk_size
+        total_size = len(pieces_hashes)
+        for i in range(0, total_size, chunk_size):
+            if self._event.is_set():
+                logger.info(f"辅种服务停止，站点{site_config.name}停止查询")
+                return []
+            # 切片操作
+            chunk = pieces_hashes[i:i + chunk_size]
+            # 处理分组
+            chunk_tors, err_msg = self.cross_helper.get_target_torrent(site_config, chunk)
+            if not chunk_tors and err_msg:
+                logger.info(
+                    f"查询站点{site_config.name}可辅种的信息出错 {err_msg},进度={i + 1}/{total_size}"
+                )
+            else:
+                logger.info(
+                    f"站点{site_config.name}本批次的可辅种/查询数={len(chunk_tors)}/{len(chunk)},进度={i + 1}/{total_size}"
+                )
+                remote_tors.extend(chunk_tors)
+
+        logger.info(f"站点{site_config.name}返回可以辅种的种子总数为{len(remote_tors)}")
+
+        # 去除已经下载过的种子
+        local_cnt = 0
+        not_local_tors = []
+        for tor_info in remote_tors:
+            if not tor_info or not tor_info.torrent_id or not tor_info.pieces_hash:
+                continue
+            if tor_info.site_name and tor_info.get_name_pieces_tag() in site_pieces_hash_set:
+                local_cnt = local_cnt + 1
+                continue
+            with seen_lock:
+                if tor_info.get_name_id_tag() in seen_tags:
+                    continue
+                seen_tags.add(tor_info.get_name_id_tag())
+            not_local_tors.append(tor_info)
+        logger.info(f"站点{site_config.name}正在做种或已经辅种过的种子数为{local_cnt}")
+        return not_local_tors
+
     def __download(self, downloader: str, content: Union[bytes, str],
                    save_path: str) -> Optional[str]:
         """
@@ -1087,10 +1196,10 @@ class CrossSeed(_PluginBase):
             self.cached += 1
             # 加入失败缓存
             if error_msg and ('无法打开链接' in error_msg or '触发站点流控' in error_msg):
-                self._error_caches.append(tor.get_name_id_tag())
+                self._error_caches.add(tor.get_name_id_tag())
             else:
                 # 种子不存在的情况
-                self._permanent_error_caches.append(tor.get_name_id_tag())
+                self._permanent_error_caches.add(tor.get_name_id_tag())
             logger.error(f"下载种子文件失败：{tor.get_name_id_tag()}")
             return False
 
@@ -1100,7 +1209,7 @@ class CrossSeed(_PluginBase):
             tors, msg = self.__get_downloader(downloader).get_torrents(ids=[tmp_tor_info.info_hash])
             if tors:
                 self.exist += 1
-                self._success_caches.append(tor.get_name_id_tag())
+                self._success_caches.add(tor.get_name_id_tag())
                 logger.info(f"下载的种子{tor.get_name_id_tag()}已存在, 跳过")
                 return True
         else:
@@ -1116,7 +1225,7 @@ class CrossSeed(_PluginBase):
             self.fail += 1
             self.cached += 1
             # 加入失败缓存
-            self._error_caches.append(tor.get_name_id_tag())
+            self._error_caches.add(tor.get_name_id_tag())
             return False
         else:
             self.success += 1
@@ -1132,7 +1241,7 @@ class CrossSeed(_PluginBase):
                 # 开始校验种子
                 self.__get_downloader(downloader).recheck_torrents(ids=[download_id])
             # 成功也加入缓存，有一些改了路径校验不通过的，手动删除后，下一次又会辅上
-            self._success_caches.append(tor.get_name_id_tag())
+            self._success_caches.add(tor.get_name_id_tag())
             return True
 
     @staticmethod
@@ -1193,6 +1302,9 @@ class CrossSeed(_PluginBase):
                     self._scheduler.shutdown()
                     self._event.clear()
                 self._scheduler = None
+            if self._meta_cache:
+                self._meta_cache.close()
+                self._meta_cache = None
         except Exception as e:
             print(str(e))
 
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# 缓存条目数上限
+MAX_CACHE_SIZE = 50000
+# 可重试的辅种失败缓存有效期（秒），过期后自动重新辅种
+ERROR_CACHE_TTL = 3 * 24 * 3600
+
+
+class SeedCache:
+    """
+    有界的辅种缓存，基于哈希表判断是否存在，条目可设置有效期，超出数量上限时淘汰最早加入的条目
+    """
+
+    def __init__(self, ttl: int = 0, max_size: int = MAX_CACHE_SIZE):
+        # 有效期（秒），0为永久有效
+        self.ttl = ttl
+        self.max_size = max_size
+        # key -> 过期时间，0为永久有效
+        self._items: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            expire_at = self._items.get(key)
+            if expire_at is None:
+                return False
+            if expire_at and expire_at <= time.time():
+                del self._items[key]
+                return False
+            return True
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: Optional[str]):
+        """
+        加入缓存，已存在时刷新有效期
+        """
+        if not key:
+            return
+        expire_at = int(time.time()) + self.ttl if self.ttl else 0
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = expire_at
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def load(self, data: Any):
+        """
+        读取缓存数据，兼容旧版本保存在配置中的列表
+        """
+        now = time.time()
+        with self._lock:
+            self._items.clear()
+            if isinstance(data, dict):
+                items = data.items()
+            elif isinstance(data, list):
+                items = ((key, int(now) + self.ttl if self.ttl else 0) for key in data)
+            else:
+                return
+            for key, expire_at in items:
+                if key and (not expire_at or expire_at > now):
+                    self._items[key] = int(expire_at or 0)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def dump(self) -> Dict[str, int]:
+        """
+        导出未过期的缓存数据，key -> 过期时间
+        """
+        now = time.time()
+        with self._lock:
+            return {key: expire_at for key, expire_at in self._items.items()
+                    if not expire_at or expire_at > now}
@@ -0,0 +1,162 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bencode import bdecode, bencode
+
+from app.log import logger
+
+# 未命中缓存的种子数达到该值时才使用进程池解析，spawn方式启动进程开销较大，数量较少时在当前线程解析更快
+PROCESS_POOL_THRESHOLD = 64
+# 解析进程数上限
+MAX_PROCESS_WORKERS = 4
+# 超过该天数未使用的缓存将被清理
+EXPIRE_DAYS = 30
+
+
+def parse_torrent_data(data: bytes) -> dict:
+    """
+    解析种子内容，计算info_hash及pieces_hash
+    """
+    torrent = bdecode(data)
+    info = torrent["info"]
+    announce = torrent.get("announce")
+    if isinstance(announce, bytes):
+        announce = announce.decode("utf-8", "ignore")
+    return {
+        "info_hash": hashlib.sha1(bencode(info)).hexdigest(),
+        "pieces_hash": hashlib.sha1(info["pieces"]).hexdigest(),
+        # qb可能存在获取不到的情况，会存在于fastresume文件中
+        "announce": announce or None
+    }
+
+
+def parse_torrent_file(path: str) -> Tuple[str, Optional[dict], Optional[str]]:
+    """
+    读取并解析种子文件，供进程池调用
+    :return: 种子文件路径，种子元数据，错误信息
+    """
+    try:
+        with open(path, "rb") as f:
+            return path, parse_torrent_data(f.read()), None
+    except Exception as err:
+        return path, None, str(err)
+
+
+class TorrentMetaCache:
+    """
+    种子文件元数据缓存，以（路径，大小，修改时间）判断种子文件是否变化，未变化的种子文件无需重新解析
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.__init_schema()
+
+    def __init_schema(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS torrent_meta (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    info_hash TEXT NOT NULL,
+                    pieces_hash TEXT NOT NULL,
+                    announce TEXT,
+                    used_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_torrent_meta_used ON torrent_meta (used_at)")
+
+    def load(self, paths: Iterable[Path], max_workers: int = None) -> Dict[str, Tuple[Optional[dict], Optional[str]]]:
+        """
+        批量读取种子文件元数据，命中缓存的直接返回，其余种子文件解析后写入缓存
+        :param paths: 种子文件路径
+        :param max_workers: 解析进程数，默认为CPU核数，不超过MAX_PROCESS_WORKERS
+        :return: 种子文件路径 -> （种子元数据，错误信息）
+        """
+        results: Dict[str, Tuple[Optional[dict], Optional[str]]] = {}
+        stats: Dict[str, Tuple[int, float]] = {}
+        for path in paths:
+            path = str(path)
+            try:
+                stat = os.stat(path)
+            except OSError as err:
+                results[path] = None, str(err)
+                continue
+            stats[path] = stat.st_size, stat.st_mtime
+
+        now = time.time()
+        cached = self.__get_many(list(stats))
+        hits, misses = [], []
+        for path, (size, mtime) in stats.items():
+            row = cached.get(path)
+            if row and row[0] == size and row[1] == mtime:
+                results[path] = {"info_hash": row[2], "pieces_hash": row[3], "announce": row[4]}, None
+                hits.append(path)
+            else:
+                misses.append(path)
+
+        parsed = []
+        for path, meta, err in self.__parse_files(misses, max_workers=max_workers):
+            results[path] = meta, err
+            if meta:
+                size, mtime = stats[path]
+                parsed.append((path, size, mtime, meta["info_hash"], meta["pieces_hash"], meta["announce"], now))
+
+        with self._lock, self._conn:
+            if parsed:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO torrent_meta "
+                    "(path, size, mtime, info_hash, pieces_hash, announce, used_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    parsed)
+            if hits:
+                self._conn.executemany("UPDATE torrent_meta SET used_at = ? WHERE path = ?",
+                                       [(now, path) for path in hits])
+            self._conn.execute("DELETE FROM torrent_meta WHERE used_at < ?", (now - EXPIRE_DAYS * 86400,))
+        logger.info(f"种子文件元数据读取完成，缓存命中：{len(hits)}，重新解析：{len(misses)}")
+        return results
+
+    def __get_many(self, paths: List[str]) -> Dict[str, tuple]:
+        """
+        分批查询缓存，避免超出SQLite参数数量限制
+        """
+        rows = {}
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                cursor = self._conn.execute(
+                    f"SELECT path, size, mtime, info_hash, pieces_hash, announce FROM torrent_meta "
+                    f"WHERE path IN ({', '.join('?' * len(chunk))})", chunk)
+                for row in cursor.fetchall():
+                    rows[row[0]] = row[1:]
+        return rows
+
+    @staticmethod
+    def __parse_files(paths: List[str], max_workers: int = None) -> List[Tuple[str, Optional[dict], Optional[str]]]:
+        """
+        解析种子文件，数量较多时使用进程池并行计算hash，进程池不可用时在当前线程解析
+        主程序为多线程运行，fork出的子进程可能继承被其它线程持有的锁而死锁，因此以spawn方式启动进程
+        """
+        if len(paths) >= PROCESS_POOL_THRESHOLD:
+            max_workers = min(max_workers or os.cpu_count() or 1, MAX_PROCESS_WORKERS)
+            try:
+                with ProcessPoolExecutor(max_workers=max_workers,
+                                         mp_context=multiprocessing.get_context("spawn")) as executor:
+                    return list(executor.map(parse_torrent_file, paths, chunksize=32))
+            except Exception as err:
+                logger.warn(f"进程池解析种子文件失败：{str(err)}，改为逐个解析")
+        return [parse_torrent_file(path) for path in paths]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
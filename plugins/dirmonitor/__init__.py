@@ -32,6 +32,86 @@ from app.utils.system import SystemUtils
 lock = threading.Lock()
 
 
+class ExcludeRules:
+    """
+    目录监控过滤规则，预编译过滤关键字及整理屏蔽词，仅在配置发生变化时重新编译
+    """
+
+    # 回收站及隐藏文件路径特征
+    _ignore_parts = ('/@Recycle/', '/#recycle/', '/.', '/@eaDir')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source: Optional[tuple] = None
+        # (规则名称, 关键字, 编译后的正则)
+        self._rules: List[Tuple[str, str, re.Pattern]] = []
+        # 所有规则合并后的正则，用于快速判断未命中
+        self._combined: Optional[re.Pattern] = None
+
+    def update(self, exclude_keywords: str, transfer_exclude_words: Optional[List[str]]):
+        """
+        配置发生变化时重新编译规则
+        """
+        source = (exclude_keywords or "", tuple(transfer_exclude_words or []))
+        if source == self._source:
+            return
+        with self._lock:
+            if source == self._source:
+                return
+            rules = []
+            for keyword in source[0].split("\n"):
+                rule = self.__compile(keyword, 0)
+                if rule:
+                    rules.append(("过滤关键字", keyword, rule))
+            for keyword in source[1]:
+                rule = self.__compile(keyword, re.IGNORECASE)
+                if rule:
+                    rules.append(("整理屏蔽词", keyword, rule))
+            combined = None
+            # 含分组引用的规则合并后编号会错位，此时逐条判断
+            if rules and not any(re.search(r"\\\d|\(\?P=", rule.pattern) for _, _, rule in rules):
+                try:
+                    combined = re.compile("|".join(f"(?:{rule.pattern})" if not rule.flags & re.IGNORECASE
+                                                   else f"(?i:{rule.pattern})"
+                                                   for _, _, rule in rules))
+                except re.error:
+                    combined = None
+            self._rules = rules
+            self._combined = combined
+            self._source = source
+            logger.debug(f"目录监控过滤规则已更新，共 {len(rules)} 条")
+
+    @staticmethod
+    def __compile(keyword: str, flags: int) -> Optional[re.Pattern]:
+        if not keyword:
+            return None
+        try:
+            return re.compile(keyword, flags)
+        except re.error as e:
+            logger.error(f"目录监控过滤规则 {keyword} 无效：{str(e)}")
+            return None
+
+    def is_ignored(self, event_path: str) -> bool:
+        """
+        是否回收站或隐藏的文件
+        """
+        return any(part in event_path for part in self._ignore_parts)
+
+    def match(self, event_path: str) -> Optional[Tuple[str, str]]:
+        """
+        返回命中的规则名称及关键字，未命中时返回None
+        """
+        rules, combined = self._rules, self._combined
+        if not rules:
+            return None
+        if combined is not None and not combined.search(event_path):
+            return None
+        for name, keyword, rule in rules:
+            if rule.search(event_path):
+                return name, keyword
+        return None
+
+
 class FileMonitorHandler(FileSystemEventHandler):
     """
     目录监控响应类
@@ -59,7 +139,7 @@ class DirMonitor(_PluginBase):
     # 插件图标
     plugin_icon = "directory.png"
     # 插件版本
-    plugin_version = "2.3"
+    plugin_version = "2.4"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -96,6 +176,8 @@ class DirMonitor(_PluginBase):
     # 存储源目录转移方式
     _transferconf: Dict[str, Optional[str]] = {}
     _medias = {}
+    # 过滤规则
+    _exclude_rules = ExcludeRules()
     # 退出事件
     _event = threading.Event()
 
@@ -293,38 +375,26 @@ class DirMonitor(_PluginBase):
         try:
             if not file_path.exists():
                 return
-            # 全程加锁
-            with lock:
-                # 回收站及隐藏的文件不处理
-                if event_path.find('/@Recycle/') != -1 \
-                        or event_path.find('/#recycle/') != -1 \
-                        or event_path.find('/.') != -1 \
-                        or event_path.find('/@eaDir') != -1:
-                    logger.debug(f"{event_path} 是回收站或隐藏的文件")
-                    return
+            # 回收站及隐藏的文件不处理
+            if self._exclude_rules.is_ignored(event_path):
+                logger.debug(f"{event_path} 是回收站或隐藏的文件")
+                return
 
-                # 命中过滤关键字不处理
-                if self._exclude_keywords:
-                    for keyword in self._exclude_keywords.split("\n"):
-                        if keyword and re.findall(keyword, event_path):
-                            logger.info(f"{event_path} 命中过滤关键字 {keyword}，不处理")
-                            return
-
-                # 整理屏蔽词不处理
-                transfer_exclude_words = self.systemconfig.get(SystemConfigKey.TransferExcludeWords)
-                if transfer_exclude_words:
-                    for keyword in transfer_exclude_words:
-                        if not keyword:
-                            continue
-                        if keyword and re.search(r"%s" % keyword, event_path, re.IGNORECASE):
-                            logger.info(f"{event_path} 命中整理屏蔽词 {keyword}，不处理")
-                            return
+            # 命中过滤关键字及整理屏蔽词不处理，规则仅在配置变化时重新编译
+            self._exclude_rules.update(self._exclude_keywords,
+                                       self.systemconfig.get(SystemConfigKey.TransferExcludeWords))
+            matched = self._exclude_rules.match(event_path)
+            if matched:
+                logger.info(f"{event_path} 命中{matched[0]} {matched[1]}，不处理")
+                return
 
-                # 不是媒体文件不处理
-                if file_path.suffix not in settings.RMT_MEDIAEXT:
-                    logger.debug(f"{event_path} 不是媒体文件")
-                    return
+            # 不是媒体文件不处理
+            if file_path.suffix not in settings.RMT_MEDIAEXT:
+                logger.debug(f"{event_path} 不是媒体文件")
+                return
 
+            # 加锁整理
+            with lock:
                 # 判断是不是蓝光目录
                 bluray_flag = False
                 if re.search(r"BDMV[/\\]STREAM", event_path, re.IGNORECASE):
@@ -20,6 +20,7 @@ from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
 from app.plugins.iyuuautoseed.iyuu_helper import IyuuHelper
+from app.plugins.iyuuautoseed.seed_cache import SeedCache, ERROR_CACHE_TTL
 from app.schemas import NotificationType
 from app.schemas.types import EventType
 from app.utils.http import RequestUtils
@@ -34,7 +35,7 @@ class IYUUAutoSeed(_PluginBase):
     # 插件图标
     plugin_icon = "IYUU.png"
     # 插件版本
-    plugin_version = "1.9"
+    plugin_version = "2.0"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -81,12 +82,12 @@ class IYUUAutoSeed(_PluginBase):
     # 待校全种子hash清单
     _recheck_torrents = {}
     _is_recheck_running = False
-    # 辅种缓存，出错的种子不再重复辅种，可清除
-    _error_caches = []
+    # 辅种缓存，出错的种子在有效期内不再重复辅种，可清除
+    _error_caches = SeedCache(ttl=ERROR_CACHE_TTL)
     # 辅种缓存，辅种成功的种子，可清除
-    _success_caches = []
+    _success_caches = SeedCache()
     # 辅种缓存，出错的种子不再重复辅种，且无法清除。种子被删除404等情况
-    _permanent_error_caches = []
+    _permanent_error_caches = SeedCache()
     # 辅种计数
     total = 0
     realtotal = 0
@@ -115,9 +116,7 @@ class IYUUAutoSeed(_PluginBase):
             self._addhosttotag = config.get("addhosttotag")
             self._size = float(config.get("size")) if config.get("size") else 0
             self._clearcache = config.get("clearcache")
-            self._permanent_error_caches = [] if self._clearcache else config.get("permanent_error_caches") or []
-            self._error_caches = [] if self._clearcache else config.get("error_caches") or []
-            self._success_caches = [] if self._clearcache else config.get("success_caches") or []
+            self.__load_caches(config)
 
             # 过滤掉已删除的站点
             all_sites = [site.id for site in self.siteoper.list_order_by_pri()] + [site.get("id") for site in
@@ -510,10 +509,35 @@ class IYUUAutoSeed(_PluginBase):
             "nopaths": self._nopaths,
             "labelsafterseed": self._labelsafterseed,
             "addhosttotag": self._addhosttotag,
-            "size": self._size,
-            "success_caches": self._success_caches,
-            "error_caches": self._error_caches,
-            "permanent_error_caches": self._permanent_error_caches
+            "size": self._size
+        })
+
+    def __load_caches(self, config: dict):
+        """
+        读取辅种缓存，兼容旧版本保存在配置中的缓存列表，清除缓存时清空全部缓存
+        """
+        if self._clearcache:
+            self._success_caches.clear()
+            self._error_caches.clear()
+            self._permanent_error_caches.clear()
+            self.__save_caches()
+            return
+        caches = self.get_data("seed_caches") or {}
+        self._success_caches.load(caches.get("success") or config.get("success_caches"))
+        self._error_caches.load(caches.get("error") or config.get("error_caches"))
+        self._permanent_error_caches.load(caches.get("permanent_error") or config.get("permanent_error_caches"))
+        if not caches:
+            # 旧版本缓存随后会从配置中移除，立即迁移到插件数据
+            self.__save_caches()
+
+    def __save_caches(self):
+        """
+        保存辅种缓存，只保存未过期的条目
+        """
+        self.save_data("seed_caches", {
+            "success": self._success_caches.dump(),
+            "error": self._error_caches.dump(),
+            "permanent_error": self._permanent_error_caches.dump()
         })
 
     def __get_downloader(self, dtype: str):
@@ -613,7 +637,7 @@ class IYUUAutoSeed(_PluginBase):
             else:
                 logger.info(f"没有需要辅种的种子")
         # 保存缓存
-        self.__update_config()
+        self.__save_caches()
         # 发送消息
         if self._notify:
             if self.success or self.fail:
@@ -679,6 +703,7 @@ class IYUUAutoSeed(_PluginBase):
         logger.info(f"下载器 {downloader} 开始查询辅种，数量：{len(hash_strs)} ...")
         # 下载器中的Hashs
         hashs = [item.get("hash") for item in hash_strs]
+        hash_set = set(hashs)
         # 每个Hash的保存目录
         save_paths = {}
         for item in hash_strs:
@@ -712,7 +737,7 @@ class IYUUAutoSeed(_PluginBase):
                     continue
                 if not seed.get("sid") or not seed.get("info_hash"):
                     continue
-                if seed.get("info_hash") in hashs:
+                if seed.get("info_hash") in hash_set:
                     logger.info(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
                     continue
                 if seed.get("info_hash") in self._success_caches:
@@ -857,7 +882,7 @@ class IYUUAutoSeed(_PluginBase):
         site_url, download_page = self.iyuuhelper.get_torrent_url(seed.get("sid"))
         if not site_url or not download_page:
             # 加入缓存
-            self._error_caches.append(seed.get("info_hash"))
+            self._error_caches.add(seed.get("info_hash"))
             self.fail += 1
             self.cached += 1
             return False
@@ -891,7 +916,7 @@ class IYUUAutoSeed(_PluginBase):
                                               base_url=download_page)
         if not torrent_url:
             # 加入失败缓存
-            self._error_caches.append(seed.get("info_hash"))
+            self._error_caches.add(seed.get("info_hash"))
             self.fail += 1
             self.cached += 1
             return False
@@ -912,10 +937,10 @@ class IYUUAutoSeed(_PluginBase):
             self.fail += 1
             # 加入失败缓存
             if error_msg and ('无法打开链接' in error_msg or '触发站点流控' in error_msg):
-                self._error_caches.append(seed.get("info_hash"))
+                self._error_caches.add(seed.get("info_hash"))
             else:
                 # 种子不存在的情况
-                self._permanent_error_caches.append(seed.get("info_hash"))
+                self._permanent_error_caches.add(seed.get("info_hash"))
             logger.error(f"下载种子文件失败：{torrent_url}")
             return False
         # 添加下载，辅种任务默认暂停
@@ -928,7 +953,7 @@ class IYUUAutoSeed(_PluginBase):
             # 下载失败
             self.fail += 1
             # 加入失败缓存
-            self._error_caches.append(seed.get("info_hash"))
+            self._error_caches.add(seed.get("info_hash"))
             return False
         else:
             self.success += 1
@@ -948,7 +973,7 @@ class IYUUAutoSeed(_PluginBase):
             # 下载成功
             logger.info(f"成功添加辅种下载，站点：{site_info.get('name')}，种子链接：{torrent_url}")
             # 成功也加入缓存，有一些改了路径校验不通过的，手动删除后，下一次又会辅上
-            self._success_caches.append(seed.get("info_hash"))
+            self._success_caches.add(seed.get("info_hash"))
             return True
 
     @staticmethod
@@ -4,7 +4,7 @@ import os
 import re
 import time
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Generator, Pattern, Union
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -13,12 +13,63 @@ from app import schemas
 from app.chain.transfer import TransferChain
 from app.core.config import settings
 from app.core.event import eventmanager, Event
+from app.db import SessionFactory
 from app.db.models.transferhistory import TransferHistory
 from app.log import logger
 from app.modules.emby import Emby
 from app.modules.jellyfin import Jellyfin
 from app.plugins import _PluginBase
 from app.schemas.types import NotificationType, EventType, MediaType, MediaImageType
+from app.utils.http import RequestUtils
+
+
+class TorrentActionBatch:
+    """
+    种子删除、暂停操作批次，按下载器分组后一次性提交
+    """
+
+    def __init__(self, chain):
+        self._chain = chain
+        # 下载器 -> 种子hash（保持加入顺序并去重）
+        self._remove_hashs: Dict[Optional[str], Dict[str, None]] = {}
+        self._stop_hashs: Dict[Optional[str], Dict[str, None]] = {}
+
+    def remove(self, hashs: Union[str, list], downloader: str = None):
+        self.__add(self._remove_hashs, hashs, downloader)
+
+    def stop(self, hashs: Union[str, list], downloader: str = None):
+        self.__add(self._stop_hashs, hashs, downloader)
+
+    @staticmethod
+    def __add(queue: Dict[Optional[str], Dict[str, None]], hashs: Union[str, list], downloader: Optional[str]):
+        if not hashs:
+            return
+        if not isinstance(hashs, list):
+            hashs = [hashs]
+        queue.setdefault(downloader, {}).update(dict.fromkeys(hashs))
+
+    def flush(self):
+        """
+        提交所有种子操作，同一种子同时需要删除和暂停时只删除
+        """
+        for downloader, hashs in self._remove_hashs.items():
+            logger.info(f"删除下载任务：{downloader or settings.DEFAULT_DOWNLOADER} - {len(hashs)} 个")
+            try:
+                self._chain.remove_torrents(hashs=list(hashs), downloader=downloader)
+            except Exception as e:
+                logger.error(f"删除下载任务失败：{str(e)}")
+        for downloader, hashs in self._stop_hashs.items():
+            removed_hashs = self._remove_hashs.get(downloader) or {}
+            hashs = [torrent_hash for torrent_hash in hashs if torrent_hash not in removed_hashs]
+            if not hashs:
+                continue
+            logger.info(f"暂停下载任务：{downloader or settings.DEFAULT_DOWNLOADER} - {len(hashs)} 个")
+            try:
+                self._chain.stop_torrents(hashs=hashs, downloader=downloader)
+            except Exception as e:
+                logger.error(f"暂停下载任务失败：{str(e)}")
+        self._remove_hashs = {}
+        self._stop_hashs = {}
 
 
 class MediaSyncDel(_PluginBase):
@@ -29,7 +80,7 @@ class MediaSyncDel(_PluginBase):
     # 插件图标
     plugin_icon = "mediasyncdel.png"
     # 插件版本
-    plugin_version = "1.7"
+    plugin_version = "1.9"
     # 插件作者
     plugin_author = "thsrite"
     # 作者主页
@@ -51,9 +102,15 @@ class MediaSyncDel(_PluginBase):
     _del_history = False
     _exclude_path = None
     _library_path = None
+    # 日志中删除媒体记录的正则
+    _emby_log_pattern = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}.\d{3}) Info App: Removing item from database, '
+                                   r'Type: (\w+), Name: (.*), Path: (.*), Id: (\d+)')
+    _jellyfin_log_pattern = re.compile(r'\[(.*?)\].*?Removing item, Type: "(.*?)", Name: "(.*?)", Path: "(.*?)"')
     _transferchain = None
     _transferhis = None
     _downloadhis = None
+    # 日志方式同步删除时每批处理的删除记录数
+    _log_batch_size = 50
 
     def init_plugin(self, config: dict = None):
         self._transferchain = TransferChain()
@@ -783,45 +840,16 @@ class MediaSyncDel(_PluginBase):
                 f"{media_type} {media_name} 未获取到可删除数据，请检查路径映射是否配置错误，请检查tmdbid获取是否正确")
             return
 
-        # 开始删除
-        year = None
-        del_torrent_hashs = []
-        stop_torrent_hashs = []
-        error_cnt = 0
-        image = 'https://emby.media/notificationicon.png'
-        for transferhis in transfer_history:
-            title = transferhis.title
-            if title not in media_name:
-                logger.warn(
-                    f"当前转移记录 {transferhis.id} {title} {transferhis.tmdbid} 与删除媒体{media_name}不符，防误删，暂不自动删除")
-                continue
-            image = transferhis.image or image
-            year = transferhis.year
-
-            # 0、删除转移记录
-            self._transferhis.delete(transferhis.id)
-
-            # 删除种子任务
-            if self._del_source:
-                # 1、直接删除源文件
-                if transferhis.src and Path(transferhis.src).suffix in settings.RMT_MEDIAEXT:
-                    self._transferchain.delete_files(Path(transferhis.src))
-                    if transferhis.download_hash:
-                        try:
-                            # 2、判断种子是否被删除完
-                            delete_flag, success_flag, handle_torrent_hashs = self.handle_torrent(
-                                type=transferhis.type,
-                                src=transferhis.src,
-                                torrent_hash=transferhis.download_hash)
-                            if not success_flag:
-                                error_cnt += 1
-                            else:
-                                if delete_flag:
-                                    del_torrent_hashs += handle_torrent_hashs
-                                else:
-                                    stop_torrent_hashs += handle_torrent_hashs
-                        except Exception as e:
-                            logger.error("删除种子失败：%s" % str(e))
+        # 开始删除，种子操作按下载器合并后统一提交
+        batch = TorrentActionBatch(chain=self.chain)
+        try:
+            result = self.__delete_transfer_histories(transfer_history=transfer_history,
+                                                      media_name=media_name,
+                                                      batch=batch)
+        finally:
+            batch.flush()
+        image = result.get("image") or 'https://emby.media/notificationicon.png'
+        year = result.get("year")
 
         logger.info(f"同步删除 {msg} 完成！")
 
@@ -837,19 +865,6 @@ class MediaSyncDel(_PluginBase):
                 episode=episode_num
             ) or image
 
-            torrent_cnt_msg = ""
-            if del_torrent_hashs:
-                torrent_cnt_msg += f"删除种子{len(set(del_torrent_hashs))}个\n"
-            if stop_torrent_hashs:
-                stop_cnt = 0
-                # 排除已删除
-                for stop_hash in set(stop_torrent_hashs):
-                    if stop_hash not in set(del_torrent_hashs):
-                        stop_cnt += 1
-                if stop_cnt > 0:
-                    torrent_cnt_msg += f"暂停种子{stop_cnt}个\n"
-            if error_cnt:
-                torrent_cnt_msg += f"删种失败{error_cnt}个\n"
             # 发送通知
             self.post_message(
                 mtype=NotificationType.MediaServer,
@@ -857,7 +872,7 @@ class MediaSyncDel(_PluginBase):
                 image=backrop_image,
                 text=f"{msg}\n"
                      f"删除记录{len(transfer_history)}个\n"
-                     f"{torrent_cnt_msg}"
+                     f"{self.__build_torrent_cnt_msg(result)}"
                      f"时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))}"
             )
 
@@ -955,188 +970,332 @@ class MediaSyncDel(_PluginBase):
         # 读取历史记录
         history = self.get_data('history') or []
         last_time = self.get_data("last_time") or None
-        del_medias = []
+        # 各日志文件已读取的位置
+        log_offsets = self.get_data("log_offsets") or {}
 
         # 媒体服务器类型，多个以,分隔
         if not settings.MEDIASERVER:
             return
         media_servers = settings.MEDIASERVER.split(',')
+        del_cnt = 0
         for media_server in media_servers:
             if media_server == 'emby':
-                del_medias.extend(self.parse_emby_log(last_time))
+                del_medias = self.parse_emby_log(last_time, log_offsets=log_offsets)
             elif media_server == 'jellyfin':
-                del_medias.extend(self.parse_jellyfin_log(last_time))
-            elif media_server == 'plex':
+                del_medias = self.parse_jellyfin_log(last_time, log_offsets=log_offsets)
+            else:
                 # TODO plex解析日志
-                return
-
-        if not del_medias:
+                continue
+            # 边解析边处理，每批处理完成后保存进度，日志读取位置只会越过已处理的删除记录
+            pending = []
+            for del_media in del_medias:
+                pending.append(del_media)
+                if len(pending) < self._log_batch_size:
+                    continue
+                last_time = self.__sync_del_medias(del_medias=pending, history=history) or last_time
+                del_cnt += len(pending)
+                pending = []
+                self.__save_log_progress(history=history, log_offsets=log_offsets, last_time=last_time)
+            if pending:
+                last_time = self.__sync_del_medias(del_medias=pending, history=history) or last_time
+                del_cnt += len(pending)
+
+        if not del_cnt:
             logger.error("未解析到已删除媒体信息")
-            return
+        # 保存历史及日志读取位置
+        self.__save_log_progress(history=history, log_offsets=log_offsets, last_time=last_time)
 
-        # 遍历删除
-        last_del_time = None
-        for del_media in del_medias:
-            # 删除时间
-            del_time = del_media.get("time")
-            last_del_time = del_time or datetime.datetime.now()
-            # 媒体类型 Movie|Series|Season|Episode
-            media_type = del_media.get("type")
-            # 媒体名称 蜀山战纪
-            media_name = del_media.get("name")
-            # 媒体年份 2015
-            media_year = del_media.get("year")
-            # 媒体路径 /data/series/国产剧/蜀山战纪 (2015)/Season 2/蜀山战纪 - S02E01 - 第1集.mp4
-            media_path = del_media.get("path")
-            # 季数 S02
-            media_season = del_media.get("season")
-            # 集数 E02
-            media_episode = del_media.get("episode")
-
-            # 排除路径不处理
-            if self._exclude_path and media_path and any(
-                    os.path.abspath(media_path).startswith(os.path.abspath(path)) for path in
-                    self._exclude_path.split(",")):
-                logger.info(f"媒体路径 {media_path} 已被排除，暂不处理")
-                self.save_data("last_time", last_del_time)
-                return
+    def __save_log_progress(self, history: list, log_offsets: dict, last_time: Optional[str]):
+        """
+        保存同步删除历史、日志读取位置及最后一条删除记录的时间
+        """
+        self.save_data("history", history)
+        self.save_data("log_offsets", log_offsets)
+        if last_time:
+            self.save_data("last_time", last_time)
 
-            # 处理路径映射 (处理同一媒体多分辨率的情况)
-            if self._library_path:
-                paths = self._library_path.split("\n")
-                for path in paths:
-                    sub_paths = path.split(":")
-                    if len(sub_paths) < 2:
-                        continue
-                    media_path = media_path.replace(sub_paths[0], sub_paths[1]).replace('\\', '/')
-
-            # 获取删除的记录
-            # 删除电影
-            if media_type == "Movie":
-                msg = f'电影 {media_name}'
-                transfer_history: List[TransferHistory] = self._transferhis.get_by(
-                    title=media_name,
-                    year=media_year,
-                    dest=media_path)
-            # 删除电视剧
-            elif media_type == "Series":
-                msg = f'剧集 {media_name}'
-                transfer_history: List[TransferHistory] = self._transferhis.get_by(
-                    title=media_name,
-                    year=media_year)
-            # 删除季 S02
-            elif media_type == "Season":
-                msg = f'剧集 {media_name} {media_season}'
-                transfer_history: List[TransferHistory] = self._transferhis.get_by(
-                    title=media_name,
-                    year=media_year,
-                    season=media_season)
-            # 删除剧集S02E02
-            elif media_type == "Episode":
-                msg = f'剧集 {media_name} {media_season}{media_episode}'
-                transfer_history: List[TransferHistory] = self._transferhis.get_by(
-                    title=media_name,
-                    year=media_year,
-                    season=media_season,
-                    episode=media_episode,
-                    dest=media_path)
-            else:
-                self.save_data("last_time", last_del_time)
+    def __sync_del_medias(self, del_medias: List[dict], history: list) -> Optional[str]:
+        """
+        处理一批日志中解析到的删除记录，一次查询全部相关的转移记录，种子操作按下载器合并后统一提交
+        :return: 本批最后一条删除记录的时间
+        """
+        # 最后一条删除记录的时间
+        last_del_time = del_medias[-1].get("time")
+
+        # 合并同一媒体的删除记录，删除剧集时只按剧集整体查询一次
+        del_medias = self.__merge_del_medias(del_medias)
+        # 按标题一次查询本批全部转移记录
+        histories = self.__get_transfer_histories(titles={media.get("name") for media in del_medias})
+
+        batch = TorrentActionBatch(chain=self.chain)
+        try:
+            for del_media in del_medias:
+                # 媒体类型 Movie|Series|Season|Episode
+                media_type = del_media.get("type")
+                # 媒体名称 蜀山战纪
+                media_name = del_media.get("name")
+                # 媒体年份 2015
+                media_year = del_media.get("year")
+                # 媒体路径 /data/series/国产剧/蜀山战纪 (2015)/Season 2/蜀山战纪 - S02E01 - 第1集.mp4
+                media_path = del_media.get("path")
+                # 季数 S02
+                media_season = del_media.get("season")
+                # 集数 E02
+                media_episode = del_media.get("episode")
+
+                # 排除路径不处理
+                if self._exclude_path and media_path and any(
+                        os.path.abspath(media_path).startswith(os.path.abspath(path)) for path in
+                        self._exclude_path.split(",")):
+                    logger.info(f"媒体路径 {media_path} 已被排除，暂不处理")
+                    continue
+
+                # 处理路径映射 (处理同一媒体多分辨率的情况)
+                if self._library_path:
+                    paths = self._library_path.split("\n")
+                    for path in paths:
+                        sub_paths = path.split(":")
+                        if len(sub_paths) < 2:
+                            continue
+                        media_path = media_path.replace(sub_paths[0], sub_paths[1]).replace('\\', '/')
+
+                # 获取删除的记录
+                # 删除电影
+                if media_type == "Movie":
+                    msg = f'电影 {media_name}'
+                # 删除电视剧
+                elif media_type == "Series":
+                    msg = f'剧集 {media_name}'
+                # 删除季 S02
+                elif media_type == "Season":
+                    msg = f'剧集 {media_name} {media_season}'
+                # 删除剧集S02E02
+                elif media_type == "Episode":
+                    msg = f'剧集 {media_name} {media_season}{media_episode}'
+                else:
+                    continue
+                transfer_history = self.__match_transfer_histories(histories=histories, media_type=media_type,
+                                                                   title=media_name, year=media_year,
+                                                                   season=media_season, episode=media_episode,
+                                                                   dest=media_path)
+
+                logger.info(f"正在同步删除 {msg}")
+
+                if not transfer_history:
+                    logger.info(f"未获取到 {msg} 转移记录，请检查路径映射是否配置错误，请检查tmdbid获取是否正确")
+                    continue
+
+                logger.info(f"获取到删除历史记录数量 {len(transfer_history)}")
+
+                # 开始删除
+                result = self.__delete_transfer_histories(transfer_history=transfer_history,
+                                                          media_name=media_name,
+                                                          batch=batch)
+                image = result.get("image") or 'https://emby.media/notificationicon.png'
+
+                logger.info(f"同步删除 {msg} 完成！")
+
+                # 发送消息
+                if self._notify:
+                    self.post_message(
+                        mtype=NotificationType.MediaServer,
+                        title="媒体库同步删除任务完成",
+                        text=f"{msg}\n"
+                             f"删除记录{len(transfer_history)}个\n"
+                             f"{self.__build_torrent_cnt_msg(result)}"
+                             f"时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))}",
+                        image=image)
+
+                history.append({
+                    "type": "电影" if media_type == "Movie" else "电视剧",
+                    "title": media_name,
+                    "year": media_year,
+                    "path": media_path,
+                    "season": media_season,
+                    "episode": media_episode,
+                    "image": image,
+                    "del_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time()))
+                })
+        finally:
+            # 统一提交种子删除、暂停操作
+            batch.flush()
+
+        return last_del_time
+
+    def __get_transfer_histories(self, titles: set) -> Optional[List[TransferHistory]]:
+        """
+        按标题一次查询转移记录，查询失败时返回None
+        """
+        titles = [title for title in titles if title]
+        if not titles:
+            return []
+        try:
+            with SessionFactory() as db:
+                return db.query(TransferHistory).filter(TransferHistory.title.in_(titles)).all()
+        except Exception as e:
+            logger.warn(f"批量查询转移记录失败，改为逐条查询：{str(e)}")
+            return None
+
+    def __match_transfer_histories(self, histories: Optional[List[TransferHistory]], media_type: str,
+                                   title: str, year: str, season: str = None, episode: str = None,
+                                   dest: str = None) -> List[TransferHistory]:
+        """
+        从批量查询的转移记录中筛选删除媒体对应的记录，条件与逐条查询一致，批量查询失败时逐条查询
+        """
+        # 各媒体类型的查询条件
+        if media_type == "Movie":
+            conditions = {"title": title, "year": year, "dest": dest}
+        elif media_type == "Series":
+            conditions = {"title": title, "year": year}
+        elif media_type == "Season":
+            conditions = {"title": title, "year": year, "season": season}
+        else:
+            conditions = {"title": title, "year": year, "season": season, "episode": episode, "dest": dest}
+        if histories is None:
+            return self._transferhis.get_by(**conditions)
+        fields = {"title": "title", "year": "year", "season": "seasons", "episode": "episodes", "dest": "dest"}
+        return [his for his in histories
+                if all(getattr(his, fields[key]) == value for key, value in conditions.items() if value)]
+
+    @staticmethod
+    def __merge_del_medias(del_medias: List[dict]) -> List[dict]:
+        """
+        合并同一媒体的删除记录：整部剧集被删除时忽略其下的季、集记录，整季被删除时忽略其下的集记录
+        """
+        deleted_series = {(media.get("name"), media.get("year")) for media in del_medias
+                          if media.get("type") == "Series"}
+        deleted_seasons = {(media.get("name"), media.get("year"), media.get("season")) for media in del_medias
+                           if media.get("type") == "Season"}
+
+        merged_medias = []
+        merged_keys = set()
+        for media in del_medias:
+            mtype = media.get("type")
+            series_key = (media.get("name"), media.get("year"))
+            if mtype in ["Season", "Episode"] and series_key in deleted_series:
                 continue
+            if mtype == "Episode" and (*series_key, media.get("season")) in deleted_seasons:
+                continue
+            media_key = (mtype, *series_key, media.get("season"), media.get("episode"), media.get("path"))
+            if media_key in merged_keys:
+                continue
+            merged_keys.add(media_key)
+            merged_medias.append(media)
 
-            logger.info(f"正在同步删除 {msg}")
+        if len(merged_medias) < len(del_medias):
+            logger.info(f"解析到删除媒体 {len(del_medias)} 条，合并后需处理 {len(merged_medias)} 条")
+        return merged_medias
 
-            if not transfer_history:
-                logger.info(f"未获取到 {msg} 转移记录，请检查路径映射是否配置错误，请检查tmdbid获取是否正确")
-                self.save_data("last_time", last_del_time)
+    def __delete_transfer_histories(self, transfer_history: List[TransferHistory], media_name: str,
+                                    batch: "TorrentActionBatch") -> dict:
+        """
+        删除转移记录及对应的源文件、下载任务，转移记录批量删除，种子操作加入批次统一提交
+        """
+        image = None
+        year = None
+        del_torrent_hashs = []
+        stop_torrent_hashs = []
+        error_cnt = 0
+        history_ids = []
+        for transferhis in transfer_history:
+            title = transferhis.title
+            if title not in media_name:
+                logger.warn(
+                    f"当前转移记录 {transferhis.id} {title} {transferhis.tmdbid} 与删除媒体{media_name}不符，防误删，暂不自动删除")
                 continue
+            image = transferhis.image or image
+            year = transferhis.year
 
-            logger.info(f"获取到删除历史记录数量 {len(transfer_history)}")
-
-            # 开始删除
-            image = 'https://emby.media/notificationicon.png'
-            del_torrent_hashs = []
-            stop_torrent_hashs = []
-            error_cnt = 0
-            for transferhis in transfer_history:
-                title = transferhis.title
-                if title not in media_name:
-                    logger.warn(
-                        f"当前转移记录 {transferhis.id} {title} {transferhis.tmdbid} 与删除媒体{media_name}不符，防误删，暂不自动删除")
-                    self.save_data("last_time", last_del_time)
-                    continue
-                image = transferhis.image or image
-                # 0、删除转移记录
-                self._transferhis.delete(transferhis.id)
-
-                # 删除种子任务
-                if self._del_source:
-                    # 1、直接删除源文件
-                    if transferhis.src and Path(transferhis.src).suffix in settings.RMT_MEDIAEXT:
-                        self._transferchain.delete_files(Path(transferhis.src))
-                        if transferhis.download_hash:
-                            try:
-                                # 2、判断种子是否被删除完
-                                delete_flag, success_flag, handle_torrent_hashs = self.handle_torrent(
-                                    type=transferhis.type,
-                                    src=transferhis.src,
-                                    torrent_hash=transferhis.download_hash)
-                                if not success_flag:
-                                    error_cnt += 1
+            # 0、删除转移记录
+            history_ids.append(transferhis.id)
+
+            # 删除种子任务
+            if self._del_source:
+                # 1、直接删除源文件
+                if transferhis.src and Path(transferhis.src).suffix in settings.RMT_MEDIAEXT:
+                    self._transferchain.delete_files(Path(transferhis.src))
+                    if transferhis.download_hash:
+                        try:
+                            # 2、判断种子是否被删除完
+                            delete_flag, success_flag, handle_torrent_hashs = self.handle_torrent(
+                                type=transferhis.type,
+                                src=transferhis.src,
+                                torrent_hash=transferhis.download_hash,
+                                batch=batch)
+                            if not success_flag:
+                                error_cnt += 1
+                            else:
+                                if delete_flag:
+                                    del_torrent_hashs += handle_torrent_hashs
                                 else:
-                                    if delete_flag:
-                                        del_torrent_hashs += handle_torrent_hashs
-                                    else:
-                                        stop_torrent_hashs += handle_torrent_hashs
-                            except Exception as e:
-                                logger.error("删除种子失败：%s" % str(e))
-
-            logger.info(f"同步删除 {msg} 完成！")
-
-            # 发送消息
-            if self._notify:
-                torrent_cnt_msg = ""
-                if del_torrent_hashs:
-                    torrent_cnt_msg += f"删除种子{len(set(del_torrent_hashs))}个\n"
-                if stop_torrent_hashs:
-                    stop_cnt = 0
-                    # 排除已删除
-                    for stop_hash in set(stop_torrent_hashs):
-                        if stop_hash not in set(del_torrent_hashs):
-                            stop_cnt += 1
-                    if stop_cnt > 0:
-                        torrent_cnt_msg += f"暂停种子{stop_cnt}个\n"
-                self.post_message(
-                    mtype=NotificationType.MediaServer,
-                    title="媒体库同步删除任务完成",
-                    text=f"{msg}\n"
-                         f"删除记录{len(transfer_history)}个\n"
-                         f"{torrent_cnt_msg}"
-                         f"时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))}",
-                    image=image)
-
-            history.append({
-                "type": "电影" if media_type == "Movie" else "电视剧",
-                "title": media_name,
-                "year": media_year,
-                "path": media_path,
-                "season": media_season,
-                "episode": media_episode,
-                "image": image,
-                "del_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time()))
-            })
+                                    stop_torrent_hashs += handle_torrent_hashs
+                        except Exception as e:
+                            logger.error("删除种子失败：%s" % str(e))
 
-        # 保存历史
-        self.save_data("history", history)
+        self.__delete_transfer_history_by_ids(history_ids)
 
-        self.save_data("last_time", last_del_time)
+        return {
+            "image": image,
+            "year": year,
+            "del_torrent_hashs": del_torrent_hashs,
+            "stop_torrent_hashs": stop_torrent_hashs,
+            "error_cnt": error_cnt
+        }
 
-    def handle_torrent(self, type: str, src: str, torrent_hash: str):
+    def __delete_transfer_history_by_ids(self, history_ids: List[int]):
+        """
+        批量删除转移记录，批量删除失败时回滚后逐条删除
+        """
+        if not history_ids:
+            return
+        try:
+            with SessionFactory() as db:
+                try:
+                    count = db.query(TransferHistory).filter(
+                        TransferHistory.id.in_(history_ids)).delete(synchronize_session=False)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+            logger.info(f"批量删除转移记录 {count} 条")
+        except Exception as e:
+            logger.warn(f"批量删除转移记录失败，改为逐条删除：{str(e)}")
+            for history_id in history_ids:
+                self._transferhis.delete(history_id)
+
+    @staticmethod
+    def __build_torrent_cnt_msg(result: dict) -> str:
+        """
+        组装种子处理数量消息
+        """
+        del_torrent_hashs = set(result.get("del_torrent_hashs") or [])
+        stop_torrent_hashs = set(result.get("stop_torrent_hashs") or [])
+        error_cnt = result.get("error_cnt")
+        torrent_cnt_msg = ""
+        if del_torrent_hashs:
+            torrent_cnt_msg += f"删除种子{len(del_torrent_hashs)}个\n"
+        # 排除已删除
+        stop_cnt = len(stop_torrent_hashs - del_torrent_hashs)
+        if stop_cnt > 0:
+            torrent_cnt_msg += f"暂停种子{stop_cnt}个\n"
+        if error_cnt:
+            torrent_cnt_msg += f"删种失败{error_cnt}个\n"
+        return torrent_cnt_msg
+
+    def handle_torrent(self, type: str, src: str, torrent_hash: str, batch: "TorrentActionBatch" = None):
         """
         判断种子是否局部删除
         局部删除则暂停种子
         全部删除则删除种子
+        传入batch时种子操作加入批次，由调用方统一提交
         """
+        if batch is None:
+            batch = TorrentActionBatch(chain=self.chain)
+            try:
+                return self.handle_torrent(type=type, src=src, torrent_hash=torrent_hash, batch=batch)
+            finally:
+                batch.flush()
+
         download_id = torrent_hash
         download = settings.DEFAULT_DOWNLOADER
         history_key = "%s-%s" % (download, torrent_hash)
@@ -1189,14 +1348,13 @@ class MediaSyncDel(_PluginBase):
 
                         # 删除源种子
                         logger.info(f"删除源下载器下载任务：{settings.DEFAULT_DOWNLOADER} - {torrent_hash}")
-                        self.chain.remove_torrents(torrent_hash)
+                        batch.remove(torrent_hash)
                         handle_torrent_hashs.append(torrent_hash)
 
                     # 删除转种后任务
                     logger.info(f"删除转种后下载任务：{download} - {download_id}")
                     # 删除转种后下载任务
-                    self.chain.remove_torrents(hashs=torrent_hash,
-                                               downloader=download)
+                    batch.remove(torrent_hash, downloader=download)
                     handle_torrent_hashs.append(download_id)
                 else:
                     # 暂停种子
@@ -1206,43 +1364,45 @@ class MediaSyncDel(_PluginBase):
 
                         # 暂停源种子
                         logger.info(f"暂停源下载器下载任务：{settings.DEFAULT_DOWNLOADER} - {torrent_hash}")
-                        self.chain.stop_torrents(torrent_hash)
+                        batch.stop(torrent_hash)
                         handle_torrent_hashs.append(torrent_hash)
 
                     logger.info(f"暂停转种后下载任务：{download} - {download_id}")
                     # 删除转种后下载任务
-                    self.chain.stop_torrents(hashs=download_id, downloader=download)
+                    batch.stop(download_id, downloader=download)
                     handle_torrent_hashs.append(download_id)
             else:
                 # 未转种de情况
                 if delete_flag:
                     # 删除源种子
                     logger.info(f"删除源下载器下载任务：{download} - {download_id}")
-                    self.chain.remove_torrents(download_id)
+                    batch.remove(download_id)
                 else:
                     # 暂停源种子
                     logger.info(f"暂停源下载器下载任务：{download} - {download_id}")
-                    self.chain.stop_torrents(download_id)
+                    batch.stop(download_id)
                 handle_torrent_hashs.append(download_id)
 
             # 处理辅种
             handle_torrent_hashs = self.__del_seed(download_id=download_id,
                                                    delete_flag=delete_flag,
-                                                   handle_torrent_hashs=handle_torrent_hashs)
+                                                   handle_torrent_hashs=handle_torrent_hashs,
+                                                   batch=batch)
             # 处理合集
             if str(type) == "电视剧":
                 handle_torrent_hashs = self.__del_collection(src=src,
                                                              delete_flag=delete_flag,
                                                              torrent_hash=torrent_hash,
                                                              download_files=download_files,
-                                                             handle_torrent_hashs=handle_torrent_hashs)
+                                                             handle_torrent_hashs=handle_torrent_hashs,
+                                                             batch=batch)
             return delete_flag, True, handle_torrent_hashs
         except Exception as e:
             logger.error(f"删种失败： {str(e)}")
             return False, False, 0
 
     def __del_collection(self, src: str, delete_flag: bool, torrent_hash: str, download_files: list,
-                         handle_torrent_hashs: list):
+                         handle_torrent_hashs: list, batch: "TorrentActionBatch"):
         """
         处理合集
         """
@@ -1272,13 +1432,11 @@ class MediaSyncDel(_PluginBase):
 
                             # 删除合集种子
                             if delete_flag:
-                                self.chain.remove_torrents(hashs=download_file.download_hash,
-                                                           downloader=download_file.downloader)
+                                batch.remove(download_file.download_hash, downloader=download_file.downloader)
                                 logger.info(f"删除合集种子 {download_file.downloader} {download_file.download_hash}")
                             else:
                                 # 暂停合集种子
-                                self.chain.stop_torrents(hashs=download_file.download_hash,
-                                                         downloader=download_file.downloader)
+                                batch.stop(download_file.download_hash, downloader=download_file.downloader)
                                 logger.info(f"暂停合集种子 {download_file.downloader} {download_file.download_hash}")
                             # 已处理种子+1
                             handle_torrent_hashs.append(download_file.download_hash)
@@ -1286,14 +1444,15 @@ class MediaSyncDel(_PluginBase):
                             # 处理合集辅种
                             handle_torrent_hashs = self.__del_seed(download_id=download_file.download_hash,
                                                                    delete_flag=delete_flag,
-                                                                   handle_torrent_hashs=handle_torrent_hashs)
+                                                                   handle_torrent_hashs=handle_torrent_hashs,
+                                                                   batch=batch)
         except Exception as e:
             logger.error(f"处理 {torrent_hash} 合集失败")
             print(str(e))
 
         return handle_torrent_hashs
 
-    def __del_seed(self, download_id, delete_flag, handle_torrent_hashs):
+    def __del_seed(self, download_id, delete_flag, handle_torrent_hashs, batch: "TorrentActionBatch"):
         """
         删除辅种
         """
@@ -1320,17 +1479,17 @@ class MediaSyncDel(_PluginBase):
                     # 删除辅种
                     if delete_flag:
                         logger.info(f"删除辅种：{downloader} - {torrent}")
-                        self.chain.remove_torrents(hashs=torrent,
-                                                   downloader=downloader)
+                        batch.remove(torrent, downloader=downloader)
                     # 暂停辅种
                     else:
-                        self.chain.stop_torrents(hashs=torrent, download=downloader)
+                        batch.stop(torrent, downloader=downloader)
                         logger.info(f"辅种：{downloader} - {torrent} 暂停")
 
                     # 处理辅种的辅种
                     handle_torrent_hashs = self.__del_seed(download_id=torrent,
                                                            delete_flag=delete_flag,
-                                                           handle_torrent_hashs=handle_torrent_hashs)
+                                                           handle_torrent_hashs=handle_torrent_hashs,
+                                                           batch=batch)
 
             # 删除辅种历史
             if delete_flag:
@@ -1338,85 +1497,12 @@ class MediaSyncDel(_PluginBase):
                               plugin_id=plugin_id)
         return handle_torrent_hashs
 
-    @staticmethod
-    def parse_emby_log(last_time):
+    def parse_emby_log(self, last_time, log_offsets: dict = None) -> Generator[dict, None, None]:
         """
-        获取emby日志列表、解析emby日志
+        获取emby日志列表、流式解析emby日志，按删除顺序逐条返回删除的媒体信息
+        :param last_time: 上次处理的删除时间，早于该时间的记录会被忽略
+        :param log_offsets: 各日志文件已读取的位置，解析过程中会被更新
         """
-
-        def __parse_log(file_name: str, del_list: list):
-            """
-            解析emby日志
-            """
-            log_url = f"[HOST]System/Logs/{file_name}?api_key=[APIKEY]"
-            log_res = Emby().get_data(log_url)
-            if not log_res or log_res.status_code != 200:
-                logger.error("获取emby日志失败，请检查服务器配置")
-                return del_list
-
-            # 正则解析删除的媒体信息
-            pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}.\d{3}) Info App: Removing item from database, Type: (\w+), Name: (.*), Path: (.*), Id: (\d+)'
-            matches = re.findall(pattern, log_res.text)
-
-            # 循环获取媒体信息
-            for match in matches:
-                mtime = match[0]
-                # 排除已处理的媒体信息
-                if last_time and mtime < last_time:
-                    continue
-
-                mtype = match[1]
-                name = match[2]
-                path = match[3]
-
-                year = None
-                year_pattern = r'\(\d+\)'
-                year_match = re.search(year_pattern, path)
-                if year_match:
-                    year = year_match.group()[1:-1]
-
-                season = None
-                episode = None
-                if mtype == 'Episode' or mtype == 'Season':
-                    name_pattern = r"\/([\u4e00-\u9fa5]+)(?= \()"
-                    season_pattern = r"Season\s*(\d+)"
-                    episode_pattern = r"S\d+E(\d+)"
-                    name_match = re.search(name_pattern, path)
-                    season_match = re.search(season_pattern, path)
-                    episode_match = re.search(episode_pattern, path)
-
-                    if name_match:
-                        name = name_match.group(1)
-
-                    if season_match:
-                        season = season_match.group(1)
-                        if int(season) < 10:
-                            season = f'S0{season}'
-                        else:
-                            season = f'S{season}'
-                    else:
-                        season = None
-
-                    if episode_match:
-                        episode = episode_match.group(1)
-                        episode = f'E{episode}'
-                    else:
-                        episode = None
-
-                media = {
-                    "time": mtime,
-                    "type": mtype,
-                    "name": name,
-                    "year": year,
-                    "path": path,
-                    "season": season,
-                    "episode": episode,
-                }
-                logger.debug(f"解析到删除媒体：{json.dumps(media)}")
-                del_list.append(media)
-
-            return del_list
-
         log_files = []
         try:
             # 获取所有emby日志
@@ -1427,100 +1513,28 @@ class MediaSyncDel(_PluginBase):
                 log_files_dict = json.loads(log_list_res.text)
                 for item in log_files_dict.get("Items"):
                     if str(item.get('Name')).startswith("embyserver"):
-                        log_files.append(str(item.get('Name')))
+                        log_files.append(item)
         except Exception as e:
             print(str(e))
 
         if not log_files:
-            log_files.append("embyserver.txt")
+            log_files.append({"Name": "embyserver.txt"})
 
-        del_medias = []
         log_files.reverse()
         for log_file in log_files:
-            del_medias = __parse_log(file_name=log_file,
-                                     del_list=del_medias)
-
-        return del_medias
-
-    @staticmethod
-    def parse_jellyfin_log(last_time: datetime):
+            file_name = str(log_file.get('Name'))
+            log_url = self.__get_log_url(host=settings.EMBY_HOST, apikey=settings.EMBY_API_KEY,
+                                         path=f"System/Logs/{file_name}")
+            yield from self.__parse_log(server="emby", log_file=log_file, log_url=log_url,
+                                        pattern=self._emby_log_pattern, keyword=b"Removing item from database",
+                                        last_time=last_time, log_offsets=log_offsets)
+
+    def parse_jellyfin_log(self, last_time, log_offsets: dict = None) -> Generator[dict, None, None]:
         """
-        获取jellyfin日志列表、解析jellyfin日志
+        获取jellyfin日志列表、流式解析jellyfin日志，按删除顺序逐条返回删除的媒体信息
+        :param last_time: 上次处理的删除时间，早于该时间的记录会被忽略
+        :param log_offsets: 各日志文件已读取的位置，解析过程中会被更新
         """
-
-        def __parse_log(file_name: str, del_list: list):
-            """
-            解析jellyfin日志
-            """
-            log_url = f"[HOST]System/Logs/Log?name={file_name}&api_key=[APIKEY]"
-            log_res = Jellyfin().get_data(log_url)
-            if not log_res or log_res.status_code != 200:
-                logger.error("获取jellyfin日志失败，请检查服务器配置")
-                return del_list
-
-            # 正则解析删除的媒体信息
-            pattern = r'\[(.*?)\].*?Removing item, Type: "(.*?)", Name: "(.*?)", Path: "(.*?)"'
-            matches = re.findall(pattern, log_res.text)
-
-            # 循环获取媒体信息
-            for match in matches:
-                mtime = match[0]
-                # 排除已处理的媒体信息
-                if last_time and mtime < last_time:
-                    continue
-
-                mtype = match[1]
-                name = match[2]
-                path = match[3]
-
-                year = None
-                year_pattern = r'\(\d+\)'
-                year_match = re.search(year_pattern, path)
-                if year_match:
-                    year = year_match.group()[1:-1]
-
-                season = None
-                episode = None
-                if mtype == 'Episode' or mtype == 'Season':
-                    name_pattern = r"\/([\u4e00-\u9fa5]+)(?= \()"
-                    season_pattern = r"Season\s*(\d+)"
-                    episode_pattern = r"S\d+E(\d+)"
-                    name_match = re.search(name_pattern, path)
-                    season_match = re.search(season_pattern, path)
-                    episode_match = re.search(episode_pattern, path)
-
-                    if name_match:
-                        name = name_match.group(1)
-
-                    if season_match:
-                        season = season_match.group(1)
-                        if int(season) < 10:
-                            season = f'S0{season}'
-                        else:
-                            season = f'S{season}'
-                    else:
-                        season = None
-
-                    if episode_match:
-                        episode = episode_match.group(1)
-                        episode = f'E{episode}'
-                    else:
-                        episode = None
-
-                media = {
-                    "time": mtime,
-                    "type": mtype,
-                    "name": name,
-                    "year": year,
-                    "path": path,
-                    "season": season,
-                    "episode": episode,
-                }
-                logger.debug(f"解析到删除媒体：{json.dumps(media)}")
-                del_list.append(media)
-
-            return del_list
-
         log_files = []
         try:
             # 获取所有jellyfin日志
@@ -1531,20 +1545,168 @@ class MediaSyncDel(_PluginBase):
                 log_files_dict = json.loads(log_list_res.text)
                 for item in log_files_dict:
                     if str(item.get('Name')).startswith("log_"):
-                        log_files.append(str(item.get('Name')))
+                        log_files.append(item)
         except Exception as e:
             print(str(e))
 
         if not log_files:
-            log_files.append("log_%s.log" % datetime.date.today().strftime("%Y%m%d"))
+            log_files.append({"Name": "log_%s.log" % datetime.date.today().strftime("%Y%m%d")})
 
-        del_medias = []
         log_files.reverse()
         for log_file in log_files:
-            del_medias = __parse_log(file_name=log_file,
-                                     del_list=del_medias)
+            file_name = str(log_file.get('Name'))
+            log_url = self.__get_log_url(host=settings.JELLYFIN_HOST, apikey=settings.JELLYFIN_API_KEY,
+                                         path=f"System/Logs/Log?name={file_name}")
+            yield from self.__parse_log(server="jellyfin", log_file=log_file, log_url=log_url,
+                                        pattern=self._jellyfin_log_pattern, keyword=b"Removing item",
+                                        last_time=last_time, log_offsets=log_offsets)
+
+    def __parse_log(self, server: str, log_file: dict, log_url: Optional[str], pattern: Pattern,
+                    keyword: bytes, last_time, log_offsets: Optional[dict]) -> Generator[dict, None, None]:
+        """
+        从上次读取的位置开始解析日志，只对包含关键字的行执行正则匹配
+        """
+        if not log_url:
+            logger.error(f"获取{server}日志失败，请检查服务器配置")
+            return
 
-        return del_medias
+        file_name = str(log_file.get('Name'))
+        offset_key = f"{server}:{file_name}"
+        file_size = log_file.get("Size")
+        file_created = log_file.get("DateCreated")
+
+        offset = 0
+        if log_offsets is not None:
+            state = log_offsets.get(offset_key) or {}
+            # 日志文件被重新创建或截断时从头读取
+            if state.get("created") == file_created and (file_size is None or state.get("offset", 0) <= file_size):
+                offset = state.get("offset", 0)
+            # 文件大小没有变化，没有新的日志
+            if file_size is not None and offset and offset == file_size:
+                logger.debug(f"{server}日志 {file_name} 没有新的内容，跳过解析")
+                return
+
+        position = offset
+        for line, position in self.__stream_log_lines(log_url=log_url, offset=offset, keyword=keyword):
+            if line is None:
+                break
+            match = pattern.search(line)
+            if not match:
+                continue
+            mtime, mtype, name, path = match.group(1), match.group(2), match.group(3), match.group(4)
+            # 排除已处理的媒体信息
+            if last_time and mtime < last_time:
+                continue
+            media = self.__build_del_media(mtime=mtime, mtype=mtype, name=name, path=path)
+            logger.debug(f"解析到删除媒体：{json.dumps(media)}")
+            yield media
+            # 媒体处理完成后再记录位置，中途退出时下次可以重新解析
+            if log_offsets is not None:
+                log_offsets[offset_key] = {"offset": position, "size": file_size, "created": file_created}
+
+        if log_offsets is not None:
+            log_offsets[offset_key] = {"offset": position, "size": file_size, "created": file_created}
+
+    @staticmethod
+    def __stream_log_lines(log_url: str, offset: int, keyword: bytes) -> Generator[Tuple[Optional[str], int], None, None]:
+        """
+        从offset开始流式读取日志，返回包含关键字的完整行及该行结束后的位置
+        读取结束时返回(None, 最后一个完整行结束后的位置)，无论该行是否包含关键字
+        服务器支持Range时只下载新增部分，否则跳过已读取部分
+        """
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        res = RequestUtils(headers=headers, timeout=60).get_res(url=log_url, stream=True)
+        if res is None or res.status_code not in (200, 206):
+            logger.error("获取日志失败，请检查服务器配置")
+            return
+
+        position = offset if res.status_code == 206 else 0
+        buffer = b""
+        try:
+            for chunk in res.iter_content(chunk_size=64 * 1024):
+                if not chunk:
+                    continue
+                # 服务器不支持Range时跳过已读取的内容
+                if position < offset:
+                    skip = min(offset - position, len(chunk))
+                    position += skip
+                    chunk = chunk[skip:]
+                    if not chunk:
+                        continue
+                buffer += chunk
+                lines = buffer.split(b"\n")
+                # 最后一段可能是不完整的行，留到下次处理
+                buffer = lines.pop()
+                for line in lines:
+                    position += len(line) + 1
+                    if keyword in line:
+                        yield line.decode("utf-8", "ignore"), position
+            yield None, position
+        finally:
+            res.close()
+
+    @staticmethod
+    def __get_log_url(host: str, apikey: str, path: str) -> Optional[str]:
+        """
+        拼装媒体服务器日志地址
+        """
+        if not host or not apikey:
+            return None
+        if not host.startswith("http"):
+            host = "http://" + host
+        if not host.endswith("/"):
+            host += "/"
+        separator = "&" if "?" in path else "?"
+        return f"{host}{path}{separator}api_key={apikey}"
+
+    @staticmethod
+    def __build_del_media(mtime: str, mtype: str, name: str, path: str) -> dict:
+        """
+        根据日志中的删除记录组装媒体信息
+        """
+        year = None
+        year_pattern = r'\(\d+\)'
+        year_match = re.search(year_pattern, path)
+        if year_match:
+            year = year_match.group()[1:-1]
+
+        season = None
+        episode = None
+        if mtype == 'Episode' or mtype == 'Season':
+            name_pattern = r"\/([\u4e00-\u9fa5]+)(?= \()"
+            season_pattern = r"Season\s*(\d+)"
+            episode_pattern = r"S\d+E(\d+)"
+            name_match = re.search(name_pattern, path)
+            season_match = re.search(season_pattern, path)
+            episode_match = re.search(episode_pattern, path)
+
+            if name_match:
+                name = name_match.group(1)
+
+            if season_match:
+                season = season_match.group(1)
+                if int(season) < 10:
+                    season = f'S0{season}'
+                else:
+                    season = f'S{season}'
+            else:
+                season = None
+
+            if episode_match:
+                episode = episode_match.group(1)
+                episode = f'E{episode}'
+            else:
+                episode = None
+
+        return {
+            "time": mtime,
+            "type": mtype,
+            "name": name,
+            "year": year,
+            "path": path,
+            "season": season,
+            "episode": episode,
+        }
 
     def get_state(self):
         return self._enabled
@@ -1,12 +1,14 @@
 import base64
 import copy
 import datetime
+import hashlib
 import json
 import re
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, Callable, List, Dict, Tuple, Optional
 
 import pytz
 import zhconv
@@ -25,6 +27,9 @@ from app.modules.emby import Emby
 from app.modules.jellyfin import Jellyfin
 from app.modules.plex import Plex
 from app.plugins import _PluginBase
+from app.plugins.personmeta.douban_limiter import DoubanActorCache, TokenBucket
+from app.plugins.personmeta.person_registry import PersonRegistry
+from app.plugins.personmeta.scan_checkpoint import ScanCheckpoint
 from app.schemas import MediaInfo, MediaServerItem
 from app.schemas.types import EventType, MediaType
 from app.utils.common import retry
@@ -40,7 +45,7 @@ class PersonMeta(_PluginBase):
     # 插件图标
     plugin_icon = "actor.png"
     # 插件版本
-    plugin_version = "1.3"
+    plugin_version = "1.7"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -65,6 +70,22 @@ class PersonMeta(_PluginBase):
     _delay = 0
     _type = "all"
     _remove_nozh = False
+    _incremental = False
+    _full_rescan = False
+    # 豆瓣请求速率（次/分钟）及突发请求数
+    _douban_rate = 10
+    _douban_burst = 2
+    _douban_limiter = None
+    # 豆瓣演员查询结果缓存
+    _douban_cache = DoubanActorCache()
+    # 单个媒体服务器的并发数
+    _server_concurrency = 4
+    _server_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+    _semaphore_lock = threading.Lock()
+    # 已处理人物登记表
+    _person_registry = None
+    # 媒体库扫描检查点
+    _scan_checkpoint = None
 
     def init_plugin(self, config: dict = None):
         self.tmdbchain = TmdbChain()
@@ -76,6 +97,22 @@ class PersonMeta(_PluginBase):
             self._type = config.get("type") or "all"
             self._delay = config.get("delay") or 0
             self._remove_nozh = config.get("remove_nozh") or False
+            self._incremental = config.get("incremental") or False
+            self._full_rescan = config.get("full_rescan") or False
+            try:
+                self._douban_rate = float(config.get("douban_rate") or 10)
+                self._douban_burst = int(config.get("douban_burst") or 2)
+            except ValueError:
+                self._douban_rate, self._douban_burst = 10, 2
+            try:
+                self._server_concurrency = max(int(config.get("server_concurrency") or 4), 1)
+            except ValueError:
+                self._server_concurrency = 4
+            # 并发数变化后重新创建信号量
+            self._server_semaphores = {}
+
+        # 豆瓣请求限流
+        self._douban_limiter = TokenBucket(rate=self._douban_rate / 60, burst=self._douban_burst)
 
         # 停止现有任务
         self.stop_service()
@@ -107,7 +144,12 @@ class PersonMeta(_PluginBase):
             "cron": self._cron,
             "type": self._type,
             "delay": self._delay,
-            "remove_nozh": self._remove_nozh
+            "remove_nozh": self._remove_nozh,
+            "incremental": self._incremental,
+            "full_rescan": self._full_rescan,
+            "douban_rate": self._douban_rate,
+            "douban_burst": self._douban_burst,
+            "server_concurrency": self._server_concurrency
         })
 
     def get_state(self) -> bool:
@@ -252,7 +294,7 @@ class PersonMeta(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 4
                                 },
                                 'content': [
                                     {
@@ -263,6 +305,116 @@ class PersonMeta(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'incremental',
+                                            'label': '增量扫描媒体库',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'server_concurrency',
+                                            'label': '媒体服务器并发数',
+                                            'placeholder': '4'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'full_rescan',
+                                            'label': '下次全量扫描',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'douban_rate',
+                                            'label': '豆瓣请求速率（次/分钟）',
+                                            'placeholder': '10'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'douban_burst',
+                                            'label': '豆瓣突发请求数',
+                                            'placeholder': '2'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VAlert',
+                                        'props': {
+                                            'type': 'info',
+                                            'variant': 'tonal',
+                                            'text': '增量扫描只处理新增或发生变化的媒体项，扫描中断后下次运行从未完成的媒体项继续；'
+                                                    '开启下次全量扫描后，下次扫描将重新处理全部媒体项。'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     }
@@ -274,7 +426,12 @@ class PersonMeta(_PluginBase):
             "cron": "",
             "type": "all",
             "delay": 30,
-            "remove_nozh": False
+            "remove_nozh": False,
+            "incremental": False,
+            "full_rescan": False,
+            "douban_rate": 10,
+            "douban_burst": 2,
+            "server_concurrency": 4
         }
 
     def get_page(self) -> List[dict]:
@@ -317,9 +474,22 @@ class PersonMeta(_PluginBase):
         # 所有媒体服务器
         if not settings.MEDIASERVER:
             return
+        person_registry = self.__get_person_registry()
+        if person_registry:
+            person_registry.purge()
+            person_registry.reset_stats()
+        # 增量扫描检查点，全量扫描时清空检查点后按增量方式扫描，中断后仍可继续
+        scan_checkpoint = self.__get_scan_checkpoint() if self._incremental or self._full_rescan else None
+        if self._full_rescan:
+            logger.info(f"开始全量扫描媒体库 ...")
+            if scan_checkpoint:
+                scan_checkpoint.clear()
+            self._full_rescan = False
+            self.__update_config()
         for server in settings.MEDIASERVER.split(","):
             # 扫描所有媒体库
             logger.info(f"开始刮削服务器 {server} 的演员信息 ...")
+            skipped = 0
             for library in self.mschain.librarys(server):
                 logger.info(f"开始刮削媒体库 {library.name} 的演员信息 ...")
                 for item in self.mschain.items(server, library.id):
@@ -333,12 +503,35 @@ class PersonMeta(_PluginBase):
                     if self._event.is_set():
                         logger.info(f"演职人员刮削服务停止")
                         return
+                    iteminfo = None
+                    if scan_checkpoint:
+                        # 跳过上次处理完成后未发生变化的媒体项
+                        iteminfo = self.get_iteminfo(server=server, itemid=item.item_id)
+                        if iteminfo and scan_checkpoint.get(server=server, item_id=item.item_id) \
+                                == self.__get_fingerprint(iteminfo):
+                            logger.debug(f"{item.title} 自上次扫描后未发生变化，跳过")
+                            skipped += 1
+                            continue
                     # 处理条目
                     logger.info(f"开始刮削 {item.title} 的演员信息 ...")
-                    self.__update_item(server=server, item=item)
+                    success = self.__update_item(server=server, item=item, iteminfo=iteminfo)
+                    if self._event.is_set():
+                        logger.info(f"演职人员刮削服务停止")
+                        return
+                    if scan_checkpoint and success:
+                        # 全部处理完成后才记录指纹，未完成的媒体项下次继续处理
+                        # 人物信息更新后指纹会变化，需重新获取
+                        iteminfo = self.get_iteminfo(server=server, itemid=item.item_id)
+                        if iteminfo:
+                            scan_checkpoint.put(server=server, item_id=item.item_id,
+                                                fingerprint=self.__get_fingerprint(iteminfo))
                     logger.info(f"{item.title} 的演员信息刮削完成")
                 logger.info(f"媒体库 {library.name} 的演员信息刮削完成")
+            if skipped:
+                logger.info(f"服务器 {server} 共 {skipped} 个媒体项未发生变化，已跳过")
             logger.info(f"服务器 {server} 的演员信息刮削完成")
+        if person_registry:
+            person_registry.log_stats()
 
     def __update_peoples(self, server: str, itemid: str, iteminfo: dict, douban_actors):
         # 处理媒体项中的人物信息
@@ -377,9 +570,11 @@ class PersonMeta(_PluginBase):
             self.set_iteminfo(server=server, itemid=itemid, iteminfo=iteminfo)
 
     def __update_item(self, server: str, item: MediaServerItem,
-                      mediainfo: MediaInfo = None, season: int = None):
+                      mediainfo: MediaInfo = None, season: int = None, iteminfo: dict = None) -> bool:
         """
         更新媒体服务器中的条目
+        :param iteminfo: 已获取的媒体项详情，为空时重新获取
+        :return: 是否全部处理完成，识别失败、未获取到豆瓣演员或部分媒体项失败时为False
         """
 
         def __need_trans_actor(_item):
@@ -406,24 +601,28 @@ class PersonMeta(_PluginBase):
         if not mediainfo:
             if not item.tmdbid:
                 logger.warn(f"{item.title} 未找到tmdbid，无法识别媒体信息")
-                return
+                return False
             mtype = MediaType.TV if item.item_type in ['Series', 'show'] else MediaType.MOVIE
             mediainfo = self.chain.recognize_media(mtype=mtype, tmdbid=item.tmdbid)
             if not mediainfo:
                 logger.warn(f"{item.title} 未识别到媒体信息")
-                return
+                return False
 
         # 获取媒体项
-        iteminfo = self.get_iteminfo(server=server, itemid=item.item_id)
+        if not iteminfo:
+            iteminfo = self.get_iteminfo(server=server, itemid=item.item_id)
         if not iteminfo:
             logger.warn(f"{item.title} 未找到媒体项")
-            return
+            return False
 
+        success = True
         if __need_trans_actor(iteminfo):
             # 获取豆瓣演员信息
             logger.info(f"开始获取 {item.title} 的豆瓣演员信息 ...")
             douban_actors = self.__get_douban_actors(mediainfo=mediainfo, season=season)
             logger.info(f"获取 {item.title} 的豆瓣演员信息为 {douban_actors}")
+            if not douban_actors:
+                success = False
             self.__update_peoples(server=server, itemid=item.item_id, iteminfo=iteminfo, douban_actors=douban_actors)
         else:
             logger.info(f"{item.title} 的人物信息已是中文，无需更新")
@@ -434,7 +633,7 @@ class PersonMeta(_PluginBase):
             seasons = self.get_items(server=server, parentid=item.item_id, mtype="Season")
             if not seasons:
                 logger.warn(f"{item.title} 未找到季媒体项")
-                return
+                return False
             for season in seasons["Items"]:
                 # 获取豆瓣演员信息
                 season_actors = self.__get_douban_actors(mediainfo=mediainfo, season=season.get("IndexNumber"))
@@ -443,6 +642,7 @@ class PersonMeta(_PluginBase):
                     seasoninfo = self.get_iteminfo(server=server, itemid=season.get("Id"))
                     if not seasoninfo:
                         logger.warn(f"{item.title} 未找到季媒体项：{season.get('Id')}")
+                        success = False
                         continue
 
                     if __need_trans_actor(seasoninfo):
@@ -456,21 +656,78 @@ class PersonMeta(_PluginBase):
                 episodes = self.get_items(server=server, parentid=season.get("Id"), mtype="Episode")
                 if not episodes:
                     logger.warn(f"{item.title} 未找到集媒体项")
+                    success = False
                     continue
-                # 更新集媒体项人物
-                for episode in episodes["Items"]:
-                    # 获取集媒体项详情
-                    episodeinfo = self.get_iteminfo(server=server, itemid=episode.get("Id"))
-                    if not episodeinfo:
-                        logger.warn(f"{item.title} 未找到集媒体项：{episode.get('Id')}")
-                        continue
-                    if __need_trans_actor(episodeinfo):
-                        # 更新集媒体项人物
-                        self.__update_peoples(server=server, itemid=episode.get("Id"), iteminfo=episodeinfo,
-                                              douban_actors=season_actors)
-                        logger.info(f"集 {episodeinfo.get('Id')} 的人物信息更新完成")
-                    else:
-                        logger.info(f"集 {episodeinfo.get('Id')} 的人物信息已是中文，无需更新")
+                # 并发更新集媒体项人物
+                results = self.__update_episodes(server=server, title=item.title, season=season.get("IndexNumber"),
+                                                 episodes=episodes["Items"], douban_actors=season_actors,
+                                                 need_trans=__need_trans_actor)
+                if self._event.is_set():
+                    logger.info(f"演职人员刮削服务停止")
+                    return False
+                if results.get("failed") or (results.get("updated") and not season_actors):
+                    success = False
+        return success
+
+    def __update_episodes(self, server: str, title: str, season: int, episodes: List[dict],
+                          douban_actors: list, need_trans: Callable[[dict], bool]) -> Dict[str, int]:
+        """
+        并发更新一季中所有集媒体项的人物，同一媒体服务器的并发数不超过设定值，停止服务时取消未开始的任务
+        :return: 各处理结果的集数
+        """
+        if not episodes:
+            return {}
+        semaphore = self.__get_server_semaphore(server)
+
+        def __update_episode(episode: dict) -> str:
+            with semaphore:
+                if self._event.is_set():
+                    return "cancelled"
+                # 获取集媒体项详情
+                episodeinfo = self.get_iteminfo(server=server, itemid=episode.get("Id"))
+                if not episodeinfo:
+                    logger.warn(f"{title} 未找到集媒体项：{episode.get('Id')}")
+                    return "failed"
+                if need_trans(episodeinfo):
+                    # 更新集媒体项人物
+                    self.__update_peoples(server=server, itemid=episode.get("Id"), iteminfo=episodeinfo,
+                                          douban_actors=douban_actors)
+                    logger.info(f"集 {episodeinfo.get('Id')} 的人物信息更新完成")
+                    return "updated"
+                logger.info(f"集 {episodeinfo.get('Id')} 的人物信息已是中文，无需更新")
+                return "skipped"
+
+        results = {"updated": 0, "skipped": 0, "failed": 0}
+        executor = ThreadPoolExecutor(max_workers=min(len(episodes), self._server_concurrency),
+                                      thread_name_prefix="PersonMeta")
+        futures = [executor.submit(__update_episode, episode) for episode in episodes]
+        try:
+            for future in as_completed(futures):
+                if self._event.is_set():
+                    break
+                try:
+                    status = future.result()
+                except Exception as err:
+                    logger.error(f"{title} 更新集媒体项人物失败：{str(err)}")
+                    status = "failed"
+                if status in results:
+                    results[status] += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"{title} 第 {season} 季集人物信息处理完成，更新：{results['updated']}，"
+                    f"无需更新：{results['skipped']}，失败：{results['failed']}")
+        return results
+
+    def __get_server_semaphore(self, server: str) -> threading.BoundedSemaphore:
+        """
+        获取媒体服务器并发控制信号量，同一媒体服务器的所有刮削任务共用
+        """
+        with self._semaphore_lock:
+            semaphore = self._server_semaphores.get(server)
+            if not semaphore:
+                semaphore = threading.BoundedSemaphore(self._server_concurrency)
+                self._server_semaphores[server] = semaphore
+            return semaphore
 
     def __update_people(self, server: str, people: dict, douban_actors: list = None) -> Optional[dict]:
         """
@@ -497,6 +754,22 @@ class PersonMeta(_PluginBase):
         # 返回的人物信息
         ret_people = copy.deepcopy(people)
 
+        # 有效期内已处理过的人物，直接复用登记的中文名，不再查询和写入媒体服务器
+        person_registry = self.__get_person_registry()
+        registered = person_registry.get(server=server, person_id=people.get("Id")) \
+            if person_registry and people.get("Id") else None
+        if registered:
+            douban_actor = self.__match_douban_actor(people, douban_actors)
+            if registered.get("name"):
+                ret_people["Name"] = registered.get("name")
+                character = self.__get_douban_character(douban_actor)
+                if character:
+                    ret_people["Role"] = character
+                return ret_people
+            if not douban_actor:
+                # 之前未找到中文数据，本次也没有匹配的豆瓣演员
+                return None
+
         try:
             # 查询媒体库人物详情
             personinfo = self.get_iteminfo(server=server, itemid=people.get("Id"))
@@ -562,40 +835,33 @@ class PersonMeta(_PluginBase):
                                   or not updated_overview
                                   or not update_character):
                 # 从豆瓣演员中匹配中文名称、角色和简介
-                for douban_actor in douban_actors:
-                    if douban_actor.get("latin_name") == people.get("Name") \
-                            or douban_actor.get("name") == people.get("Name"):
-                        # 名称
-                        if not updated_name:
-                            logger.info(f"{people.get('Name')} 从豆瓣中获取到中文名：{douban_actor.get('name')}")
-                            personinfo["Name"] = douban_actor.get("name")
-                            ret_people["Name"] = douban_actor.get("name")
-                            updated_name = True
-                        # 描述
-                        if not updated_overview:
-                            if douban_actor.get("title"):
-                                logger.info(f"{people.get('Name')} 从豆瓣中获取到中文描述：{douban_actor.get('title')}")
-                                personinfo["Overview"] = douban_actor.get("title")
-                                updated_overview = True
-                        # 饰演角色
-                        if not update_character:
-                            if douban_actor.get("character"):
-                                # "饰 詹姆斯·邦德 James Bond 007"
-                                character = re.sub(r"饰\s+", "",
-                                                   douban_actor.get("character"))
-                                character = re.sub("演员", "",
-                                                   character)
-                                if character:
-                                    logger.info(f"{people.get('Name')} 从豆瓣中获取到饰演角色：{character}")
-                                    ret_people["Role"] = character
-                                    update_character = True
-                        # 图片
-                        if not profile_path:
-                            avatar = douban_actor.get("avatar") or {}
-                            if avatar.get("large"):
-                                logger.info(f"{people.get('Name')} 从豆瓣中获取到图片：{avatar.get('large')}")
-                                profile_path = avatar.get("large")
-                        break
+                douban_actor = self.__match_douban_actor(people, douban_actors)
+                if douban_actor:
+                    # 名称
+                    if not updated_name:
+                        logger.info(f"{people.get('Name')} 从豆瓣中获取到中文名：{douban_actor.get('name')}")
+                        personinfo["Name"] = douban_actor.get("name")
+                        ret_people["Name"] = douban_actor.get("name")
+                        updated_name = True
+                    # 描述
+                    if not updated_overview:
+                        if douban_actor.get("title"):
+                            logger.info(f"{people.get('Name')} 从豆瓣中获取到中文描述：{douban_actor.get('title')}")
+                            personinfo["Overview"] = douban_actor.get("title")
+                            updated_overview = True
+                    # 饰演角色
+                    if not update_character:
+                        character = self.__get_douban_character(douban_actor)
+                        if character:
+                            logger.info(f"{people.get('Name')} 从豆瓣中获取到饰演角色：{character}")
+                            ret_people["Role"] = character
+                            update_character = True
+                    # 图片
+                    if not profile_path:
+                        avatar = douban_actor.get("avatar") or {}
+                        if avatar.get("large"):
+                            logger.info(f"{people.get('Name')} 从豆瓣中获取到图片：{avatar.get('large')}")
+                            profile_path = avatar.get("large")
 
             # 更新人物图片
             if profile_path:
@@ -615,22 +881,93 @@ class PersonMeta(_PluginBase):
                 logger.info(f"更新人物 {people.get('Name')} 的信息：{personinfo}")
                 ret = self.set_iteminfo(server=server, itemid=people.get("Id"), iteminfo=personinfo)
                 if ret:
+                    if person_registry:
+                        person_registry.put(server=server, person_id=people.get("Id"),
+                                            name=personinfo.get("Name") if updated_name else None,
+                                            overview=personinfo.get("Overview") if updated_overview else None,
+                                            image=profile_path)
                     return ret_people
             else:
                 logger.info(f"人物 {people.get('Name')} 未找到中文数据")
+                if person_registry:
+                    person_registry.put(server=server, person_id=people.get("Id"))
         except Exception as err:
             logger.error(f"更新人物信息失败：{str(err)}")
         return None
 
+    @staticmethod
+    def __match_douban_actor(people: dict, douban_actors: list = None) -> Optional[dict]:
+        """
+        按名称匹配豆瓣演员
+        """
+        for douban_actor in douban_actors or []:
+            if douban_actor.get("latin_name") == people.get("Name") \
+                    or douban_actor.get("name") == people.get("Name"):
+                return douban_actor
+        return None
+
+    @staticmethod
+    def __get_douban_character(douban_actor: Optional[dict]) -> Optional[str]:
+        """
+        获取豆瓣演员的饰演角色
+        """
+        if not douban_actor or not douban_actor.get("character"):
+            return None
+        # "饰 詹姆斯·邦德 James Bond 007"
+        character = re.sub(r"饰\s+", "",
+                           douban_actor.get("character"))
+        character = re.sub("演员", "",
+                           character)
+        return character or None
+
+    @staticmethod
+    def __get_fingerprint(iteminfo: dict) -> str:
+        """
+        计算媒体项指纹，由修改时间、Etag、子项数量、递归子项数量、最近添加媒体时间及人物信息组成
+        剧集的子项数量只包括季，递归子项数量及最近添加媒体时间可反映已有季中新增的集
+        """
+        peoples = [(people.get("Id"), people.get("Name"), people.get("Role"))
+                   for people in iteminfo.get("People") or []]
+        data = [iteminfo.get("Etag"), iteminfo.get("DateModified"), iteminfo.get("ChildCount"),
+                iteminfo.get("RecursiveItemCount"), iteminfo.get("DateLastMediaAdded"), peoples]
+        return hashlib.md5(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+    def __get_scan_checkpoint(self) -> Optional[ScanCheckpoint]:
+        """
+        获取媒体库扫描检查点
+        """
+        if not self._scan_checkpoint:
+            try:
+                self._scan_checkpoint = ScanCheckpoint(db_path=self.get_data_path() / "scan.db")
+            except Exception as e:
+                logger.error(f"初始化媒体库扫描检查点失败：{str(e)}")
+                return None
+        return self._scan_checkpoint
+
+    def __get_person_registry(self) -> Optional[PersonRegistry]:
+        """
+        获取已处理人物登记表
+        """
+        if not self._person_registry:
+            try:
+                self._person_registry = PersonRegistry(db_path=self.get_data_path() / "persons.db")
+            except Exception as e:
+                logger.error(f"初始化人物登记表失败：{str(e)}")
+                return None
+        return self._person_registry
+
     def __get_douban_actors(self, mediainfo: MediaInfo, season: int = None) -> List[dict]:
         """
-        获取豆瓣演员信息
+        获取豆瓣演员信息，命中缓存时直接返回，实际请求豆瓣时按令牌桶限流
         """
-        # 随机休眠 3-10 秒
-        sleep_time = 3 + int(time.time()) % 7
-        logger.info(f"随机休眠 {sleep_time}秒 ...")
-        time.sleep(sleep_time)
+        cache_key = (mediainfo.title, mediainfo.year, season, mediainfo.imdb_id)
+        douban_actors = self._douban_cache.get(cache_key)
+        if douban_actors is not None:
+            logger.debug(f"{mediainfo.title_year} 第 {season} 季的豆瓣演员信息命中缓存")
+            return douban_actors
         # 匹配豆瓣信息
+        if not self.__acquire_douban():
+            return []
         doubaninfo = self.chain.match_doubaninfo(name=mediainfo.title,
                                                  imdbid=mediainfo.imdb_id,
                                                  mtype=mediainfo.type,
@@ -638,12 +975,23 @@ class PersonMeta(_PluginBase):
                                                  season=season)
         # 豆瓣演员
         if doubaninfo:
+            if not self.__acquire_douban():
+                return []
             doubanitem = self.chain.douban_info(doubaninfo.get("id")) or {}
-            return (doubanitem.get("actors") or []) + (doubanitem.get("directors") or [])
+            douban_actors = (doubanitem.get("actors") or []) + (doubanitem.get("directors") or [])
+            if doubanitem:
+                self._douban_cache.set(cache_key, douban_actors)
+            return douban_actors
         else:
             logger.info(f"未找到豆瓣信息：{mediainfo.title_year}")
         return []
 
+    def __acquire_douban(self) -> bool:
+        """
+        豆瓣请求限流，停止服务时放弃等待
+        """
+        return self._douban_limiter.acquire(stop_event=self._event)
+
     @staticmethod
     def get_iteminfo(server: str, itemid: str) -> dict:
         """
@@ -656,7 +1004,7 @@ class PersonMeta(_PluginBase):
             """
             try:
                 url = f'[HOST]emby/Users/[USER]/Items/{itemid}?' \
-                      f'Fields=ChannelMappingInfo&api_key=[APIKEY]'
+                      f'Fields=ChannelMappingInfo,RecursiveItemCount,DateLastMediaAdded&api_key=[APIKEY]'
                 res = Emby().get_data(url=url)
                 if res:
                     return res.json()
@@ -669,7 +1017,8 @@ class PersonMeta(_PluginBase):
             获得Jellyfin媒体项详情
             """
             try:
-                url = f'[HOST]Users/[USER]/Items/{itemid}?Fields=ChannelMappingInfo&api_key=[APIKEY]'
+                url = f'[HOST]Users/[USER]/Items/{itemid}?Fields=ChannelMappingInfo,RecursiveItemCount,DateLastMediaAdded' \
+                      f'&api_key=[APIKEY]'
                 res = Jellyfin().get_data(url=url)
                 if res:
                     result = res.json()
@@ -709,6 +1058,8 @@ class PersonMeta(_PluginBase):
                     iteminfo['FileName'] = Path(location).name
                 iteminfo['Overview'] = plexitem.summary
                 iteminfo['CommunityRating'] = plexitem.audienceRating
+                iteminfo['DateModified'] = str(plexitem.updatedAt)
+                iteminfo['RecursiveItemCount'] = getattr(plexitem, 'leafCount', None)
                 return iteminfo
             except Exception as err:
                 logger.error(f"获取Plex媒体项详情失败：{str(err)}")
@@ -1024,5 +1375,11 @@ class PersonMeta(_PluginBase):
                     self._scheduler.shutdown()
                     self._event.clear()
                 self._scheduler = None
+            if self._person_registry:
+                self._person_registry.close()
+                self._person_registry = None
+            if self._scan_checkpoint:
+                self._scan_checkpoint.close()
+                self._scan_checkpoint = None
         except Exception as e:
             print(str(e))
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，按固定速率补充令牌，允许短时间内突发不超过桶容量的请求
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        # 每秒补充的令牌数
+        self.rate = max(rate, 0.001)
+        # 桶容量
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        """
+        获取一个令牌，令牌不足时等待
+        :param stop_event: 停止事件，等待期间触发时放弃获取
+        :return: 是否获取到令牌
+        """
+        while True:
+            with self._lock:
+                self.__refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = (1 - self._tokens) / self.rate
+            if stop_event:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+
+class DoubanActorCache:
+    """
+    豆瓣演员查询结果缓存，以（标题，年份，季，IMDBID）为键，超出数量上限时淘汰最久未使用的结果
+    """
+
+    def __init__(self, ttl: int = 24 * 3600, max_size: int = 1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[List[dict]]:
+        with self._lock:
+            item = self._items.get(key)
+            if not item:
+                return None
+            expire_at, value = item
+            if expire_at <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: tuple, value: Any):
+        with self._lock:
+            self._items[key] = (time.time() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.log import logger
+
+# 人物信息有效期（秒），过期后重新从TMDB及媒体服务器获取
+PERSON_TTL = 7 * 24 * 3600
+
+
+class PersonRegistry:
+    """
+    已处理人物登记表，按媒体服务器及人物ID记录已写入的中文名称、描述及图片，
+    有效期内再次遇到同一人物时直接复用，不再重复查询和写入媒体服务器
+    """
+
+    def __init__(self, db_path: Path, ttl: int = PERSON_TTL):
+        self._db_path = db_path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.__init_schema()
+        # 命中及未命中次数
+        self.hits = 0
+        self.misses = 0
+
+    def __init_schema(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS persons (
+                    server TEXT NOT NULL,
+                    person_id TEXT NOT NULL,
+                    name TEXT,
+                    overview TEXT,
+                    image TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (server, person_id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_persons_updated ON persons (updated_at)")
+
+    def get(self, server: str, person_id: str) -> Optional[dict]:
+        """
+        查询有效期内的人物信息，未登记或已过期时返回None
+        :return: {"name": 中文名, "overview": 描述, "image": 图片}，name为空表示未找到中文数据
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, overview, image FROM persons WHERE server = ? AND person_id = ? AND updated_at >= ?",
+                (server, str(person_id), time.time() - self.ttl)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {"name": row[0], "overview": row[1], "image": row[2]}
+
+    def put(self, server: str, person_id: str, name: str = None, overview: str = None, image: str = None):
+        """
+        登记人物信息
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO persons (server, person_id, name, overview, image, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (server, str(person_id), name, overview, image, time.time()))
+
+    def purge(self):
+        """
+        清理过期的人物信息
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM persons WHERE updated_at < ?", (time.time() - self.ttl,))
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def log_stats(self):
+        """
+        输出命中统计
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            rate = self.hits / total * 100 if total else 0
+            logger.info(f"人物登记表命中：{self.hits}，未命中：{self.misses}，命中率：{rate:.1f}%")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
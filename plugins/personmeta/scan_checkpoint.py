@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.log import logger
+
+
+class ScanCheckpoint:
+    """
+    媒体库扫描检查点，按媒体服务器及媒体项ID记录上次处理完成时的媒体项指纹，
+    增量扫描时只处理新增或发生变化的媒体项，扫描中断后再次运行可从未完成的媒体项继续
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.__init_schema()
+
+    def __init_schema(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scanned_items (
+                    server TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    scanned_at REAL NOT NULL,
+                    PRIMARY KEY (server, item_id)
+                )
+            """)
+
+    def get(self, server: str, item_id: str) -> Optional[str]:
+        """
+        查询媒体项上次处理完成时的指纹
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint FROM scanned_items WHERE server = ? AND item_id = ?",
+                                     (server, str(item_id))).fetchone()
+        return row[0] if row else None
+
+    def put(self, server: str, item_id: str, fingerprint: str):
+        """
+        记录媒体项处理完成时的指纹
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scanned_items (server, item_id, fingerprint, scanned_at) VALUES (?, ?, ?, ?)",
+                (server, str(item_id), fingerprint, time.time()))
+
+    def clear(self, server: str = None):
+        """
+        清空检查点，不指定媒体服务器时清空全部
+        """
+        with self._lock, self._conn:
+            if server:
+                self._conn.execute("DELETE FROM scanned_items WHERE server = ?", (server,))
+            else:
+                self._conn.execute("DELETE FROM scanned_items")
+        logger.info(f"媒体库扫描检查点已清空：{server or '全部'}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
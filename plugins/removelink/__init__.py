@@ -1,9 +1,10 @@
+import json
 import os
 import threading
 import time
 import traceback
 from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, Set
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
@@ -41,11 +42,14 @@ class FileMonitorHandler(FileSystemEventHandler):
                     return
         # 新增文件记录
         with state_lock:
-            self.sync.state_set[str(file_path)] = file_path.stat().st_ino
+            self.sync.state_index.add(str(file_path), file_path.stat())
 
     def on_moved(self, event):
         if event.is_directory:
             return
+        # 移出原路径记录
+        with state_lock:
+            self.sync.state_index.remove(str(event.src_path))
         file_path = Path(event.dest_path)
         if file_path.suffix in [".!qB", ".part", ".mp"]:
             return
@@ -57,7 +61,7 @@ class FileMonitorHandler(FileSystemEventHandler):
                     return
         # 新增文件记录
         with state_lock:
-            self.sync.state_set[str(file_path)] = file_path.stat().st_ino
+            self.sync.state_index.add(str(file_path), file_path.stat())
 
     def on_deleted(self, event):
         file_path = Path(event.src_path)
@@ -83,28 +87,95 @@ class FileMonitorHandler(FileSystemEventHandler):
         self.sync.handle_deleted(file_path)
 
 
-def updateState(monitor_dirs: List[str]):
+class InodeIndex:
+    """
+    文件与inode的双向索引：路径 -> (设备号, inode)，(设备号, inode) -> 路径集合
+    """
+
+    def __init__(self):
+        self._paths: Dict[str, Tuple[int, int]] = {}
+        self._inodes: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self):
+        return len(self._paths)
+
+    def add(self, path: str, stat: os.stat_result):
+        """
+        新增或更新文件记录
+        """
+        self.remove(path)
+        key = (stat.st_dev, stat.st_ino)
+        self._paths[path] = key
+        self._inodes.setdefault(key, set()).add(path)
+
+    def remove(self, path: str) -> Optional[Tuple[int, int]]:
+        """
+        移除文件记录，返回文件对应的(设备号, inode)
+        """
+        key = self._paths.pop(path, None)
+        if key:
+            paths = self._inodes.get(key)
+            if paths:
+                paths.discard(path)
+                if not paths:
+                    self._inodes.pop(key, None)
+        return key
+
+    def get(self, path: str) -> Optional[Tuple[int, int]]:
+        return self._paths.get(path)
+
+    def paths_of(self, key: Tuple[int, int]) -> List[str]:
+        """
+        获取与(设备号, inode)对应的所有文件
+        """
+        return list(self._inodes.get(key) or [])
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        return {path: list(key) for path, key in self._paths.items()}
+
+    @staticmethod
+    def from_dict(data: Dict[str, List[int]]) -> "InodeIndex":
+        index = InodeIndex()
+        for path, key in data.items():
+            key = tuple(key)
+            index._paths[path] = key
+            index._inodes.setdefault(key, set()).add(path)
+        return index
+
+
+def updateState(monitor_dirs: List[str]) -> InodeIndex:
     """
     更新监控目录的文件列表
     """
     # 记录开始时间
     start_time = time.time()
-    state_set = {}
+    state_index = InodeIndex()
+
+    def scan(path: str):
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            scan(entry.path)
+                        elif entry.is_file():
+                            # 记录文件inode，DirEntry会缓存stat结果
+                            state_index.add(entry.path, entry.stat())
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warn(f"扫描目录 {path} 失败：{str(e)}")
+
     for mon_path in monitor_dirs:
-        for root, dirs, files in os.walk(mon_path):
-            for file in files:
-                file = Path(root) / file
-                if not file.exists():
-                    continue
-                # 记录文件inode
-                state_set[str(file)] = file.stat().st_ino
+        if mon_path:
+            scan(mon_path)
     # 记录结束时间
     end_time = time.time()
     # 计算耗时
     elapsed_time = end_time - start_time
-    logger.info(f"更新文件列表完成，共计{len(state_set)}个文件，耗时：{elapsed_time}秒")
+    logger.info(f"更新文件列表完成，共计{len(state_index)}个文件，耗时：{elapsed_time}秒")
 
-    return state_set
+    return state_index
 
 
 class RemoveLink(_PluginBase):
@@ -115,7 +186,7 @@ class RemoveLink(_PluginBase):
     # 插件图标
     plugin_icon = "Ombi_A.png"
     # 插件版本
-    plugin_version = "2.1"
+    plugin_version = "2.2"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -138,8 +209,11 @@ class RemoveLink(_PluginBase):
     _delete_history = False
     _transferhistory = None
     _observer = []
-    # 监控目录的文件列表
-    state_set: Dict[str, int] = {}
+    _persist_index = False
+    # 监控目录的文件索引
+    state_index: InodeIndex = InodeIndex()
+    # 当前文件索引对应的监控目录
+    _index_dirs: List[str] = []
 
     def init_plugin(self, config: dict = None):
         logger.info(f"Hello, RemoveLink! config {config}")
@@ -153,6 +227,7 @@ class RemoveLink(_PluginBase):
             self._delete_scrap_infos = config.get("delete_scrap_infos")
             self._delete_torrents = config.get("delete_torrents")
             self._delete_history = config.get("delete_history")
+            self._persist_index = config.get("persist_index")
 
         # 停止现有任务
         self.stop_service()
@@ -180,9 +255,52 @@ class RemoveLink(_PluginBase):
                     err_msg = str(e)
                     logger.error(f"{mon_path} 启动目录监控失败：{err_msg}")
                     self.systemmessage.put(f"{mon_path} 启动目录监控失败：{err_msg}", title="清理硬链接")
-            # 更新监控集合
+            # 更新监控集合，开启持久化时优先加载上次保存的索引
             with state_lock:
-                self.state_set = updateState(monitor_dirs)
+                state_index = self.__load_index(monitor_dirs) if self._persist_index else None
+                if state_index is None:
+                    state_index = updateState(monitor_dirs)
+                self.state_index = state_index
+                self._index_dirs = monitor_dirs
+                if self._persist_index:
+                    self.__save_index(monitor_dirs)
+
+    def __get_index_file(self) -> Path:
+        return self.get_data_path() / "inode_index.json"
+
+    def __load_index(self, monitor_dirs: List[str]) -> Optional[InodeIndex]:
+        """
+        加载持久化的文件索引，监控目录发生变化时返回None
+        """
+        index_file = self.__get_index_file()
+        if not index_file.exists():
+            return None
+        try:
+            data = json.loads(index_file.read_text(encoding="utf-8"))
+            if data.get("monitor_dirs") != monitor_dirs:
+                logger.info("监控目录已变化，重新扫描文件列表")
+                return None
+            state_index = InodeIndex.from_dict(data.get("paths") or {})
+            logger.info(f"已加载持久化文件索引，共计{len(state_index)}个文件")
+            return state_index
+        except Exception as e:
+            logger.error(f"加载持久化文件索引失败：{str(e)}")
+            return None
+
+    def __save_index(self, monitor_dirs: List[str]):
+        """
+        持久化文件索引
+        """
+        try:
+            index_file = self.__get_index_file()
+            tmp_file = index_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps({
+                "monitor_dirs": monitor_dirs,
+                "paths": self.state_index.to_dict()
+            }, ensure_ascii=False), encoding="utf-8")
+            tmp_file.replace(index_file)
+        except Exception as e:
+            logger.error(f"保存文件索引失败：{str(e)}")
 
     def __update_config(self):
         """
@@ -241,6 +359,19 @@ class RemoveLink(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "persist_index",
+                                            "label": "持久化文件索引",
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -395,7 +526,8 @@ class RemoveLink(_PluginBase):
                                         "props": {
                                             "type": "info",
                                             "variant": "tonal",
-                                            "text": "监控目录如有多个需换行，源目录和硬链接目录都需要添加到监控目录中；如需实现删除硬链接时不删除源文件，可把源文件目录配置到不删除目录中。",
+                                            "text": "监控目录如有多个需换行，源目录和硬链接目录都需要添加到监控目录中；如需实现删除硬链接时不删除源文件，可把源文件目录配置到不删除目录中。"
+                                                    "开启持久化文件索引后重启时不再重新扫描监控目录，插件停止期间新增的文件不会被索引。",
                                         },
                                     }
                                 ],
@@ -407,6 +539,7 @@ class RemoveLink(_PluginBase):
         ], {
             "enabled": False,
             "notify": False,
+            "persist_index": False,
             "monitor_dirs": "",
             "exclude_keywords": "",
         }
@@ -427,6 +560,10 @@ class RemoveLink(_PluginBase):
                     print(str(e))
                     logger.error(f"停止目录监控失败：{str(e)}")
         self._observer = []
+        # 保存文件索引，下次启动时无需重新扫描，按索引建立时的监控目录保存，避免配置变更后误用旧索引
+        if self._persist_index and self._index_dirs and len(self.state_index):
+            with state_lock:
+                self.__save_index(self._index_dirs)
 
     def __is_excluded(self, file_path: Path) -> bool:
         """
@@ -546,39 +683,47 @@ class RemoveLink(_PluginBase):
             # 删除历史记录
             self.delete_history(str(file_path))
             # 删除的文件inode
-            deleted_inode = self.state_set.get(str(file_path))
+            deleted_inode = self.state_index.remove(str(file_path))
             if not deleted_inode:
                 logger.info(f"文件 {file_path} 未在监控列表中，不处理")
                 return
-            else:
-                self.state_set.pop(str(file_path))
             try:
-                # 在current_set中查找与deleted_inode有相同inode的文件并删除
-                for path, inode in self.state_set.copy().items():
-                    if inode == deleted_inode:
-                        file = Path(path)
-                        if self.__is_excluded(file):
-                            logger.info(f"文件 {file} 在不删除目录中，不处理")
-                            continue
-                        # 删除硬链接文件
-                        logger.info(f"删除硬链接文件：{path}， inode: {inode}")
-                        file.unlink()
-                        # 清理刮削文件
-                        self.delete_scrap_infos(file_path)
-                        if self._delete_torrents:
-                            # 发送事件
-                            eventmanager.send_event(
-                                EventType.DownloadFileDeleted, {"src": str(file_path)}
-                            )
-                        # 删除历史记录
-                        self.delete_history(str(file_path))
-                        if self._notify:
-                            self.post_message(
-                                mtype=NotificationType.SiteMessage,
-                                title=f"【清理硬链接】",
-                                text=f"监控到删除源文件：[{file_path}]\n"
-                                f"同步删除硬链接文件：[{path}]",
-                            )
+                # 通过索引查找与deleted_inode有相同inode的文件并删除
+                for path in self.state_index.paths_of(deleted_inode):
+                    file = Path(path)
+                    if self.__is_excluded(file):
+                        logger.info(f"文件 {file} 在不删除目录中，不处理")
+                        continue
+                    # 持久化索引可能过期，删除前确认文件仍是同一inode
+                    try:
+                        file_stat = file.stat()
+                    except FileNotFoundError:
+                        self.state_index.remove(path)
+                        continue
+                    if (file_stat.st_dev, file_stat.st_ino) != deleted_inode:
+                        self.state_index.add(path, file_stat)
+                        continue
+                    inode = deleted_inode[1]
+                    # 删除硬链接文件
+                    logger.info(f"删除硬链接文件：{path}， inode: {inode}")
+                    self.state_index.remove(path)
+                    file.unlink()
+                    # 清理刮削文件
+                    self.delete_scrap_infos(file_path)
+                    if self._delete_torrents:
+                        # 发送事件
+                        eventmanager.send_event(
+                            EventType.DownloadFileDeleted, {"src": str(file_path)}
+                        )
+                    # 删除历史记录
+                    self.delete_history(str(file_path))
+                    if self._notify:
+                        self.post_message(
+                            mtype=NotificationType.SiteMessage,
+                            title=f"【清理硬链接】",
+                            text=f"监控到删除源文件：[{file_path}]\n"
+                            f"同步删除硬链接文件：[{path}]",
+                        )
             except Exception as e:
                 logger.error(
                     "删除硬链接文件发生错误：%s - %s" % (str(e), traceback.format_exc())
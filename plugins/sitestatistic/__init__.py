@@ -18,12 +18,13 @@ from app.core.event import Event
 from app.core.event import eventmanager
 from app.db.models import PluginData
 from app.db.site_oper import SiteOper
-from app.helper.browser import PlaywrightHelper
 from app.helper.module import ModuleHelper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
-from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo
+from app.plugins.sitestatistic.browser_pool import browser_pool
+from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SiteSchemaMatcher
+from app.plugins.sitestatistic.stat_store import SiteStatStore
 from app.schemas.types import EventType, NotificationType
 from app.utils.http import RequestUtils
 from app.utils.object import ObjectUtils
@@ -43,7 +44,7 @@ class SiteStatistic(_PluginBase):
     # 插件图标
     plugin_icon = "statistic.png"
     # 插件版本
-    plugin_version = "3.6"
+    plugin_version = "4.2"
     # 插件作者
     plugin_author = "lightolly"
     # 作者主页
@@ -62,6 +63,16 @@ class SiteStatistic(_PluginBase):
     _last_update_time: Optional[datetime] = None
     _sites_data: dict = {}
     _site_schema: List[ISiteUserInfo] = None
+    _stat_store: Optional[SiteStatStore] = None
+    _schema_matcher: Optional[SiteSchemaMatcher] = None
+    # 站点域名 -> 已识别的站点模型
+    _site_schema_cache: Dict[str, str] = {}
+    _site_schema_lock = Lock()
+    # 站点域名 -> 首页请求缓存（最终地址、编码、ETag、Last-Modified）
+    _site_http_cache: Dict[str, dict] = {}
+    # 站点域名 -> 支持条件请求的首页内容，仅保存在内存中
+    _site_homepages: Dict[str, str] = {}
+    _site_http_lock = Lock()
 
     # 配置属性
     _enabled: bool = False
@@ -89,6 +100,8 @@ class SiteStatistic(_PluginBase):
             self._notify = config.get("notify")
             self._sitemsg = config.get("sitemsg")
             self._queue_cnt = config.get("queue_cnt")
+            # 浏览器上下文数量与刷新队列数量一致，仿真站点刷新时无需等待其它站点归还上下文
+            browser_pool.max_contexts = int(self._queue_cnt or 5)
             self._remove_failed = config.get("remove_failed")
             self._statistic_type = config.get("statistic_type") or "all"
             self._statistic_sites = config.get("statistic_sites") or []
@@ -106,6 +119,10 @@ class SiteStatistic(_PluginBase):
                                                   filter_func=lambda _, obj: hasattr(obj, 'schema'))
 
             self._site_schema.sort(key=lambda x: x.order)
+            self._schema_matcher = SiteSchemaMatcher(self._site_schema)
+            self._site_schema_cache = self.get_data("site_schemas") or {}
+            self._site_http_cache = self.get_data("site_http_cache") or {}
+            self._site_homepages = {}
             # 站点上一次更新时间
             self._last_update_time = None
             # 站点数据
@@ -166,6 +183,12 @@ class SiteStatistic(_PluginBase):
             "methods": ["GET"],
             "summary": "刷新站点数据",
             "description": "刷新对应域名的站点数据",
+        }, {
+            "path": "/history",
+            "endpoint": self.get_history,
+            "methods": ["GET"],
+            "summary": "站点历史数据",
+            "description": "按日期区间获取站点历史数据，支持按天、周、月降采样",
         }]
 
     def get_service(self) -> List[Dict[str, Any]]:
@@ -428,30 +451,73 @@ class SiteStatistic(_PluginBase):
             "dashboard_type": 'today'
         }
 
+    def __get_stat_store(self) -> Optional[SiteStatStore]:
+        """
+        获取站点数据存储，首次使用时从插件数据迁移历史数据
+        """
+        if not self._stat_store:
+            try:
+                stat_store = SiteStatStore(db_path=self.get_data_path() / "statistic.db")
+                stat_store.migrate(loader=self.__load_legacy_data)
+                self._stat_store = stat_store
+            except Exception as e:
+                logger.error(f"初始化站点数据存储失败：{str(e)}")
+                return None
+        return self._stat_store
+
+    def __load_legacy_data(self) -> List[Tuple[str, dict]]:
+        """
+        读取按天保存在插件数据中的历史站点数据
+        """
+        data_list: List[PluginData] = self.get_data(key=None) or []
+        return [(data.key, json.loads(data.value)) for data in data_list
+                if re.match(r"\d{4}-\d{2}-\d{2}", data.key) and ObjectUtils.is_obj(data.value)]
+
+    def __get_day_data(self, date: str) -> Dict[str, Dict[str, Any]]:
+        """
+        获取某一天的站点数据
+        """
+        stat_store = self.__get_stat_store()
+        return stat_store.get_day(date) if stat_store and date else {}
+
+    def get_history(self, apikey: str, start: str = None, end: str = None,
+                    interval: str = "day") -> schemas.Response:
+        """
+        获取站点历史数据，按周期降采样，可由API调用
+        :param apikey: API密钥
+        :param start: 开始日期，默认为30天前
+        :param end: 结束日期，默认为今天
+        :param interval: 降采样周期 day/week/month
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        stat_store = self.__get_stat_store()
+        if not stat_store:
+            return schemas.Response(success=True, data=[])
+        end = end or datetime.now().strftime('%Y-%m-%d')
+        start = start or (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        return schemas.Response(success=True, data=[
+            {"date": date, "site": site, **data}
+            for date, site, data in stat_store.get_range(start=start, end=end, interval=interval)
+        ])
+
     def __get_data(self) -> Tuple[str, dict, dict]:
         """
         获取今天的日期、今天的站点数据、昨天的站点数据
         """
-        # 最近一天的签到数据
-        stattistic_data: Dict[str, Dict[str, Any]] = {}
         # 昨天数据
         yesterday_sites_data: Dict[str, Dict[str, Any]] = {}
-        # 获取最近所有数据
-        data_list: List[PluginData] = self.get_data(key=None)
-        if not data_list:
+        # 只读取最近两天的数据
+        stat_store = self.__get_stat_store()
+        dates = stat_store.latest_dates(limit=2) if stat_store else []
+        if not dates:
             return "", {}, {}
-        # 取key符合日期格式的数据
-        data_list = [data for data in data_list if re.match(r"\d{4}-\d{2}-\d{2}", data.key)]
-        # 按日期倒序排序
-        data_list.sort(key=lambda x: x.key, reverse=True)
         # 今天的日期
-        today = data_list[0].key
-        # 数据按时间降序排序
-        datas = [json.loads(data.value) for data in data_list if ObjectUtils.is_obj(data.value)]
-        if len(data_list) > 0:
-            stattistic_data = datas[0]
-        if len(data_list) > 1:
-            yesterday_sites_data = datas[1]
+        today = dates[0]
+        # 最近一天的数据
+        stattistic_data = stat_store.get_day(today)
+        if len(dates) > 1:
+            yesterday_sites_data = stat_store.get_day(dates[1])
 
         # 数据按时间降序排序
         stattistic_data = dict(sorted(stattistic_data.items(),
@@ -1117,17 +1183,40 @@ class SiteStatistic(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            browser_pool.close()
+            if self._stat_store:
+                self._stat_store.close()
+                self._stat_store = None
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
-    def __build_class(self, html_text: str) -> Any:
-        for site_schema in self._site_schema:
-            try:
-                if site_schema.match(html_text):
-                    return site_schema
-            except Exception as e:
-                logger.error(f"站点匹配失败 {str(e)}")
-        return None
+    def __build_class(self, html_text: str, domain: str = None) -> Tuple[Any, bool]:
+        """
+        识别站点模型，已识别过的站点直接使用缓存的模型
+        :return: 站点模型，是否来自缓存
+        """
+        if domain:
+            schema_name = self._site_schema_cache.get(domain)
+            if schema_name:
+                for site_schema in self._site_schema:
+                    if site_schema.__name__ == schema_name:
+                        return site_schema, True
+        site_schema = self._schema_matcher.detect(html_text)
+        if site_schema and domain:
+            with self._site_schema_lock:
+                self._site_schema_cache[domain] = site_schema.__name__
+                self.save_data("site_schemas", self._site_schema_cache)
+        return site_schema, False
+
+    def __clear_site_schema(self, domain: str) -> bool:
+        """
+        清除站点缓存的模型，返回是否存在缓存
+        """
+        with self._site_schema_lock:
+            if self._site_schema_cache.pop(domain, None) is None:
+                return False
+            self.save_data("site_schemas", self._site_schema_cache)
+            return True
 
     def build(self, site_info: CommentedMap) -> Optional[ISiteUserInfo]:
         """
@@ -1150,81 +1239,27 @@ class SiteStatistic(_PluginBase):
             logger.debug(f"站点 {site_name} url={url}，site_cookie={site_cookie}，ua={ua}，api_key={apikey}，token={token}，proxy={proxy}")
             if render:
                 # 演染模式
-                html_text = PlaywrightHelper().get_page_source(url=url,
-                                                               cookies=site_cookie,
-                                                               ua=ua,
-                                                               proxies=proxy_server)
+                html_text = browser_pool.get_page_source(url=url,
+                                                         cookies=site_cookie,
+                                                         ua=ua,
+                                                         proxies=proxy_server)
             else:
-                # 普通模式
-                res = RequestUtils(cookies=site_cookie,
-                                   session=session,
-                                   ua=ua,
-                                   proxies=proxies
-                                   ).get_res(url=url)
-                if res and res.status_code == 200:
-                    if re.search(r"charset=\"?utf-8\"?", res.text, re.IGNORECASE):
-                        res.encoding = "utf-8"
-                    else:
-                        res.encoding = res.apparent_encoding
-                    html_text = res.text
-                    # 第一次登录反爬
-                    if html_text.find("title") == -1:
-                        i = html_text.find("window.location")
-                        if i == -1:
-                            return None
-                        tmp_url = url + html_text[i:html_text.find(";")] \
-                            .replace("\"", "") \
-                            .replace("+", "") \
-                            .replace(" ", "") \
-                            .replace("window.location=", "")
-                        res = RequestUtils(cookies=site_cookie,
-                                           session=session,
-                                           ua=ua,
-                                           proxies=proxies
-                                           ).get_res(url=tmp_url)
-                        if res and res.status_code == 200:
-                            if "charset=utf-8" in res.text or "charset=UTF-8" in res.text:
-                                res.encoding = "UTF-8"
-                            else:
-                                res.encoding = res.apparent_encoding
-                            html_text = res.text
-                            if not html_text:
-                                return None
-                        elif res is not None:
-                            logger.error("站点 %s 被反爬限制：%s, 状态码：%s" % (site_name, url, res.status_code))
-                            return None
-                        else:
-                            logger.error("站点 %s 无法访问：%s" % (site_name, url))
-                            return None
-
-                    # 兼容假首页情况，假首页通常没有 <link rel="search" 属性
-                    if '"search"' not in html_text and '"csrf-token"' not in html_text:
-                        res = RequestUtils(cookies=site_cookie,
-                                           session=session,
-                                           ua=ua,
-                                           proxies=proxies
-                                           ).get_res(url=url + "/index.php")
-                        if res and res.status_code == 200:
-                            if re.search(r"charset=\"?utf-8\"?", res.text, re.IGNORECASE):
-                                res.encoding = "utf-8"
-                            else:
-                                res.encoding = res.apparent_encoding
-                            html_text = res.text
-                            if not html_text:
-                                return None
-                elif res is not None:
-                    logger.error(f"站点 {site_name} 连接失败，状态码：{res.status_code}")
-                    return None
-                else:
-                    logger.error(f"站点 {site_name} 无法访问：{url}")
-                    return None
+                # 普通模式，优先使用缓存的最终地址及编码请求首页
+                domain = StringUtils.get_url_netloc(url)[1]
+                html_text = self.__get_cached_homepage(site_name=site_name, domain=domain, session=session,
+                                                       site_cookie=site_cookie, ua=ua, proxies=proxies)
+                if not html_text:
+                    html_text = self.__get_homepage(site_name=site_name, domain=domain, url=url, session=session,
+                                                    site_cookie=site_cookie, ua=ua, proxies=proxies)
+                    if not html_text:
+                        return None
             # 解析站点类型
             if html_text:
-                site_schema = self.__build_class(html_text)
+                site_schema, schema_cached = self.__build_class(html_text, domain=StringUtils.get_url_netloc(url)[1])
                 if not site_schema:
                     logger.error("站点 %s 无法识别站点类型" % site_name)
                     return None
-                return site_schema(
+                site_user_info = site_schema(
                     site_name=site_name,
                     url=url,
                     site_cookie=site_cookie,
@@ -1234,8 +1269,159 @@ class SiteStatistic(_PluginBase):
                     session=session,
                     ua=ua,
                     proxy=proxy)
+                site_user_info.schema_cached = schema_cached
+                return site_user_info
+            return None
+
+    def __get_cached_homepage(self, site_name: str, domain: str, session: requests.Session,
+                              site_cookie: str, ua: str, proxies: dict) -> Optional[str]:
+        """
+        使用缓存的最终地址及编码请求站点首页，支持条件请求，页面异常时清除缓存并返回None
+        """
+        http_cache = self._site_http_cache.get(domain)
+        if not http_cache or not http_cache.get("url"):
+            return None
+        headers = {"User-Agent": ua or settings.USER_AGENT}
+        cached_html = self._site_homepages.get(domain)
+        if cached_html:
+            if http_cache.get("etag"):
+                headers["If-None-Match"] = http_cache.get("etag")
+            if http_cache.get("last_modified"):
+                headers["If-Modified-Since"] = http_cache.get("last_modified")
+        res = RequestUtils(cookies=site_cookie,
+                           session=session,
+                           ua=ua,
+                           headers=headers,
+                           proxies=proxies
+                           ).get_res(url=http_cache.get("url"))
+        if res is not None and res.status_code == 304 and cached_html:
+            logger.debug(f"站点 {site_name} 首页未变化，使用缓存页面")
+            return cached_html
+        if res and res.status_code == 200:
+            res.encoding = http_cache.get("encoding") or res.apparent_encoding
+            html_text = res.text
+            if self.__is_valid_homepage(html_text):
+                self.__update_http_cache(domain=domain, url=http_cache.get("url"), res=res, html_text=html_text)
+                return html_text
+        logger.info(f"站点 {site_name} 缓存的首页地址 {http_cache.get('url')} 访问异常，重新探测")
+        self.__clear_http_cache(domain)
+        return None
+
+    def __get_homepage(self, site_name: str, domain: str, url: str, session: requests.Session,
+                       site_cookie: str, ua: str, proxies: dict) -> Optional[str]:
+        """
+        请求站点首页，处理反爬跳转及假首页，成功时缓存最终地址及编码
+        """
+        home_url = url
+        res = RequestUtils(cookies=site_cookie,
+                           session=session,
+                           ua=ua,
+                           proxies=proxies
+                           ).get_res(url=url)
+        if res and res.status_code == 200:
+            if re.search(r"charset=\"?utf-8\"?", res.text, re.IGNORECASE):
+                res.encoding = "utf-8"
+            else:
+                res.encoding = res.apparent_encoding
+            html_text = res.text
+            # 第一次登录反爬
+            if html_text.find("title") == -1:
+                i = html_text.find("window.location")
+                if i == -1:
+                    return None
+                tmp_url = url + html_text[i:html_text.find(";")] \
+                    .replace("\"", "") \
+                    .replace("+", "") \
+                    .replace(" ", "") \
+                    .replace("window.location=", "")
+                res = RequestUtils(cookies=site_cookie,
+                                   session=session,
+                                   ua=ua,
+                                   proxies=proxies
+                                   ).get_res(url=tmp_url)
+                if res and res.status_code == 200:
+                    if "charset=utf-8" in res.text or "charset=UTF-8" in res.text:
+                        res.encoding = "UTF-8"
+                    else:
+                        res.encoding = res.apparent_encoding
+                    html_text = res.text
+                    if not html_text:
+                        return None
+                    home_url = tmp_url
+                elif res is not None:
+                    logger.error("站点 %s 被反爬限制：%s, 状态码：%s" % (site_name, url, res.status_code))
+                    return None
+                else:
+                    logger.error("站点 %s 无法访问：%s" % (site_name, url))
+                    return None
+
+            # 兼容假首页情况，假首页通常没有 <link rel="search" 属性
+            if '"search"' not in html_text and '"csrf-token"' not in html_text:
+                res = RequestUtils(cookies=site_cookie,
+                                   session=session,
+                                   ua=ua,
+                                   proxies=proxies
+                                   ).get_res(url=url + "/index.php")
+                if res and res.status_code == 200:
+                    if re.search(r"charset=\"?utf-8\"?", res.text, re.IGNORECASE):
+                        res.encoding = "utf-8"
+                    else:
+                        res.encoding = res.apparent_encoding
+                    html_text = res.text
+                    if not html_text:
+                        return None
+                    home_url = url + "/index.php"
+            # 仅缓存有效的首页，后续刷新直接请求最终地址
+            if self.__is_valid_homepage(html_text):
+                self.__update_http_cache(domain=domain, url=home_url, res=res, html_text=html_text)
+            return html_text
+        elif res is not None:
+            logger.error(f"站点 {site_name} 连接失败，状态码：{res.status_code}")
+            return None
+        else:
+            logger.error(f"站点 {site_name} 无法访问：{url}")
             return None
 
+    @staticmethod
+    def __is_valid_homepage(html_text: str) -> bool:
+        """
+        是否为正常的站点首页（非反爬页面及假首页）
+        """
+        return bool(html_text) and html_text.find("title") != -1 \
+            and ('"search"' in html_text or '"csrf-token"' in html_text)
+
+    def __update_http_cache(self, domain: str, url: str, res: Any, html_text: str):
+        """
+        更新站点首页的请求缓存
+        """
+        etag = res.headers.get("ETag")
+        last_modified = res.headers.get("Last-Modified")
+        with self._site_http_lock:
+            http_cache = {
+                "url": url,
+                "encoding": res.encoding,
+                "etag": etag,
+                "last_modified": last_modified
+            }
+            changed = self._site_http_cache.get(domain) != http_cache
+            self._site_http_cache[domain] = http_cache
+            # 支持条件请求时才在内存中保留页面
+            if etag or last_modified:
+                self._site_homepages[domain] = html_text
+            else:
+                self._site_homepages.pop(domain, None)
+            if changed:
+                self.save_data("site_http_cache", self._site_http_cache)
+
+    def __clear_http_cache(self, domain: str):
+        """
+        清除站点首页的请求缓存
+        """
+        with self._site_http_lock:
+            self._site_homepages.pop(domain, None)
+            if self._site_http_cache.pop(domain, None) is not None:
+                self.save_data("site_http_cache", self._site_http_cache)
+
     def refresh_by_domain(self, domain: str, apikey: str) -> schemas.Response:
         """
         刷新一个站点数据，可由API调用
@@ -1274,10 +1460,7 @@ class SiteStatistic(_PluginBase):
         try:
             site_user_info: ISiteUserInfo = self.build(site_info=site_info)
             if site_user_info:
-                logger.debug(f"站点 {site_name} 开始以 {site_user_info.site_schema()} 模型解析")
-                # 开始解析
-                site_user_info.parse()
-                logger.debug(f"站点 {site_name} 解析完成")
+                site_user_info = self.__parse_site_user_info(site_info=site_info, site_user_info=site_user_info)
 
                 # 获取不到数据时，仅返回错误信息，不做历史数据更新
                 if site_user_info.err_msg:
@@ -1321,6 +1504,33 @@ class SiteStatistic(_PluginBase):
             logger.error(traceback.format_exc())
         return None
 
+    def __parse_site_user_info(self, site_info: CommentedMap, site_user_info: ISiteUserInfo) -> ISiteUserInfo:
+        """
+        解析站点信息，使用缓存的站点模型解析失败时重新识别站点模型并解析
+        """
+        site_name = site_info.get('name')
+        error = None
+        logger.debug(f"站点 {site_name} 开始以 {site_user_info.site_schema()} 模型解析")
+        try:
+            site_user_info.parse()
+        except Exception as e:
+            error = e
+        # 只有缓存的站点模型解析出错或未解析到用户信息时才重新识别，未登录等错误不重试
+        schema_mismatch = error or (not site_user_info.err_msg and not site_user_info.userid and not site_user_info.username)
+        if site_user_info.schema_cached and schema_mismatch \
+                and self.__clear_site_schema(StringUtils.get_url_netloc(site_info.get("url"))[1]):
+            logger.info(f"站点 {site_name} 使用 {site_user_info.site_schema()} 模型解析失败，重新识别站点模型")
+            new_site_user_info = self.build(site_info=site_info)
+            if new_site_user_info and type(new_site_user_info) is not type(site_user_info):
+                logger.debug(f"站点 {site_name} 开始以 {new_site_user_info.site_schema()} 模型解析")
+                new_site_user_info.parse()
+                logger.debug(f"站点 {site_name} 解析完成")
+                return new_site_user_info
+        if error:
+            raise error
+        logger.debug(f"站点 {site_name} 解析完成")
+        return site_user_info
+
     def __notify_unread_msg(self, site_name: str, site_user_info: ISiteUserInfo, unread_msg_notify: bool):
         if site_user_info.message_unread <= 0:
             return
@@ -1384,7 +1594,7 @@ class SiteStatistic(_PluginBase):
             today_date = datetime.now().strftime('%Y-%m-%d')
             if self._statistic_type == "add" or not self._remove_failed:
                 if last_update_time := self.get_data("last_update_time"):
-                    yesterday_sites_data = self.get_data(last_update_time) or {}
+                    yesterday_sites_data = self.__get_day_data(last_update_time)
 
             if not self._remove_failed and yesterday_sites_data:
                 site_names = [site.get("name") for site in refresh_sites]
@@ -1436,7 +1646,9 @@ class SiteStatistic(_PluginBase):
                                       title="站点数据统计", text="\n".join(sorted_messages))
 
             # 保存数据
-            self.save_data(today_date, self._sites_data)
+            stat_store = self.__get_stat_store()
+            if stat_store:
+                stat_store.save_day(date=today_date, sites_data=self._sites_data)
 
             # 更新时间
             self.save_data("last_update_time", today_date)
@@ -0,0 +1,227 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+from cf_clearance import sync_cf_retry, sync_stealth
+from playwright.sync_api import sync_playwright
+
+from app.helper.browser import PlaywrightHelper
+from app.log import logger
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    浏览器工作线程，独占一个常驻的浏览器及上下文；Playwright同步接口只能在创建它的线程中使用，
+    因此每个上下文都由单独的线程持有，页面请求通过队列交给该线程执行
+    """
+
+    def __init__(self, pool: "BrowserContextPool", key: tuple):
+        super().__init__(name=f"BrowserWorker-{id(self)}", daemon=True)
+        self.pool = pool
+        # （代理，UA）
+        self.key = key
+        # 是否被借出
+        self.borrowed = False
+        self.last_used = time.time()
+        self._jobs = queue.Queue()
+
+    def submit(self, url: str, cookies: Optional[str], timeout: int) -> Future:
+        future = Future()
+        self._jobs.put((future, url, cookies, timeout))
+        return future
+
+    def stop(self):
+        self._jobs.put(None)
+
+    def run(self):
+        proxy, ua = self.key
+        try:
+            with sync_playwright() as playwright:
+                browser = playwright[self.pool.browser_type].launch(headless=False)
+                try:
+                    context = browser.new_context(user_agent=ua or None,
+                                                  proxy=dict(proxy) if proxy else None)
+                    logger.debug(f"浏览器上下文已启动，当前上下文数：{self.pool.size}")
+                    while True:
+                        try:
+                            job = self._jobs.get(timeout=self.pool.idle_timeout)
+                        except queue.Empty:
+                            # 空闲超时且未被借出时回收
+                            if self.pool.retire(self):
+                                logger.debug("浏览器上下文空闲超时，已回收")
+                                break
+                            continue
+                        if job is None:
+                            break
+                        future, url, cookies, timeout = job
+                        if future.set_running_or_notify_cancel():
+                            future.set_result(self.__get_page_source(context, url, cookies, timeout))
+                finally:
+                    browser.close()
+        except Exception as e:
+            logger.error(f"浏览器上下文运行失败：{str(e)}")
+        finally:
+            self.pool.discard(self)
+            # 未执行的请求直接失败，由调用方回退为独立浏览器
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job and job[0].set_running_or_notify_cancel():
+                    job[0].set_exception(RuntimeError("浏览器上下文已关闭"))
+
+    @staticmethod
+    def __get_page_source(context, url: str, cookies: Optional[str], timeout: int) -> Optional[str]:
+        """
+        在上下文中打开新页面获取网页源码，已通过的Cloudflare验证可在后续请求中复用
+        与PlaywrightHelper一致，站点Cookie以请求头发送，只作用于当前页面，跳转到其它子域名时同样携带，
+        也不会残留在共用上下文的其它站点请求中
+        """
+        page = context.new_page()
+        try:
+            if cookies:
+                page.set_extra_http_headers({"cookie": cookies})
+            sync_stealth(page, pure=True)
+            page.goto(url)
+            if not sync_cf_retry(page)[0]:
+                logger.warn("cloudflare challenge fail！")
+            page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+            return page.content()
+        except Exception as e:
+            logger.error(f"获取网页源码失败: {str(e)}")
+            return None
+        finally:
+            page.close()
+
+
+class BrowserContextPool:
+    """
+    常驻浏览器上下文池，按代理及UA组合复用已启动的浏览器上下文，总数量有上限，空闲超时后自动回收，
+    上下文池不可用时回退为每次启动独立浏览器
+    """
+
+    def __init__(self, max_contexts: int = 2, idle_timeout: int = 300, wait_timeout: int = 120,
+                 browser_type: str = "chromium"):
+        # 上下文数量上限
+        self.max_contexts = max_contexts
+        # 空闲回收时间（秒）
+        self.idle_timeout = idle_timeout
+        # 等待空闲上下文的最长时间（秒）
+        self.wait_timeout = wait_timeout
+        self.browser_type = browser_type
+        self._workers: List[_BrowserWorker] = []
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        with self._cond:
+            return len(self._workers)
+
+    def get_page_source(self, url: str, cookies: str = None, ua: str = None, proxies: dict = None,
+                        timeout: int = 20) -> Optional[str]:
+        """
+        借用上下文获取网页源码
+        :param url: 网页地址
+        :param cookies: Cookie
+        :param ua: UA
+        :param proxies: 浏览器代理，如 settings.PROXY_SERVER
+        :param timeout: 页面加载超时时间（秒）
+        """
+        key = (tuple(sorted(proxies.items())) if proxies else None, ua)
+        worker, future = self.__borrow(key=key, url=url, cookies=cookies, timeout=timeout)
+        if not future:
+            logger.warn("浏览器上下文池繁忙，使用独立浏览器获取网页源码")
+        else:
+            try:
+                return future.result()
+            except Exception as e:
+                logger.warn(f"浏览器上下文池获取网页源码失败：{str(e)}，使用独立浏览器重试")
+            finally:
+                self.__release(worker)
+        return PlaywrightHelper().get_page_source(url=url, cookies=cookies, ua=ua, proxies=proxies)
+
+    def __borrow(self, key: tuple, url: str, cookies: Optional[str],
+                 timeout: int) -> Tuple[Optional[_BrowserWorker], Optional[Future]]:
+        """
+        借出一个空闲上下文并提交请求，优先复用相同代理及UA的上下文，数量已满时回收最久未使用的其它空闲上下文，
+        均不可用时等待归还
+        """
+        deadline = time.time() + self.wait_timeout
+        with self._cond:
+            while True:
+                worker = self.__acquire(key)
+                if worker:
+                    worker.borrowed = True
+                    # 在锁内提交，保证上下文关闭时请求能被清理
+                    return worker, worker.submit(url=url, cookies=cookies, timeout=timeout)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None, None
+                self._cond.wait(remaining)
+
+    def __acquire(self, key: tuple) -> Optional[_BrowserWorker]:
+        """
+        查找或创建可用的上下文，需在锁内调用
+        """
+        idle_workers = [worker for worker in self._workers if not worker.borrowed]
+        for worker in idle_workers:
+            if worker.key == key:
+                return worker
+        if len(self._workers) >= max(int(self.max_contexts or 1), 1):
+            if not idle_workers:
+                return None
+            self.__close_worker(min(idle_workers, key=lambda w: w.last_used))
+        worker = _BrowserWorker(pool=self, key=key)
+        self._workers.append(worker)
+        worker.start()
+        return worker
+
+    def __release(self, worker: _BrowserWorker):
+        with self._cond:
+            worker.borrowed = False
+            worker.last_used = time.time()
+            self._cond.notify_all()
+
+    def __close_worker(self, worker: _BrowserWorker):
+        """
+        关闭上下文，需在锁内调用
+        """
+        if worker in self._workers:
+            self._workers.remove(worker)
+        worker.stop()
+
+    def retire(self, worker: _BrowserWorker) -> bool:
+        """
+        回收空闲上下文，已被借出时返回False
+        """
+        with self._cond:
+            if worker.borrowed:
+                return False
+            self.__close_worker(worker)
+            self._cond.notify_all()
+            return True
+
+    def discard(self, worker: _BrowserWorker):
+        """
+        上下文线程退出时移出上下文池
+        """
+        with self._cond:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        关闭全部上下文
+        """
+        with self._cond:
+            for worker in list(self._workers):
+                self.__close_worker(worker)
+            self._cond.notify_all()
+
+
+# 插件共享的浏览器上下文池
+browser_pool = BrowserContextPool()
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 import json
 import re
+import threading
+import time
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Optional
+from typing import Optional, Any, List, Dict, Tuple, Set
 from urllib.parse import urljoin, urlsplit
 
+from lxml import etree
 from requests import Session
 
 from app.core.config import settings
@@ -15,6 +20,10 @@ from app.utils.http import RequestUtils
 from app.utils.site import SiteUtils
 
 SITE_BASE_ORDER = 1000
+# 单个站点解析过程中缓存的页面数量
+HTML_CACHE_SIZE = 8
+# 并发获取分页时允许的最大页数，超出时按下页链接逐页获取
+MAX_CONCURRENT_PAGES = 500
 
 
 # 站点框架
@@ -43,6 +52,14 @@ class ISiteUserInfo(metaclass=ABCMeta):
     order = SITE_BASE_ORDER
     # 请求模式 cookie/apikey
     request_mode = "cookie"
+    # 单个站点并发请求页面数
+    page_concurrency = 4
+    # 单个站点两次请求之间的最小间隔（秒）
+    page_interval = 0.5
+    # 站点识别特征，分别为首页html、页面文本、页面标题中包含的关键字，均未配置时使用match方法识别
+    match_html_keywords: Tuple[str, ...] = ()
+    match_text_keywords: Tuple[str, ...] = ()
+    match_title_keywords: Tuple[str, ...] = ()
 
     def __init__(self, site_name: str,
                  url: str,
@@ -96,11 +113,20 @@ class ISiteUserInfo(metaclass=ABCMeta):
 
         # 错误信息
         self.err_msg = None
+        # 站点模型是否来自缓存
+        self.schema_cached = False
         # 内部数据
         self._base_url = None
         self._site_cookie = None
         self._index_html = None
         self._addition_headers = None
+        # 页面解析缓存，同一页面只解析一次
+        self._html_cache_lock = threading.Lock()
+        self._html_trees: OrderedDict = OrderedDict()
+        self._prepared_texts: OrderedDict = OrderedDict()
+        # 并发请求页面的限速
+        self._page_request_lock = threading.Lock()
+        self._page_request_time = 0.0
 
         # 站点页面
         self._brief_page = "index.php"
@@ -140,6 +166,13 @@ class ISiteUserInfo(metaclass=ABCMeta):
         """
         return self.schema
 
+    @classmethod
+    def has_fingerprint(cls) -> bool:
+        """
+        是否配置了站点识别特征
+        """
+        return bool(cls.match_html_keywords or cls.match_text_keywords or cls.match_title_keywords)
+
     @classmethod
     def match(cls, html_text: str) -> bool:
         """
@@ -147,13 +180,24 @@ class ISiteUserInfo(metaclass=ABCMeta):
         :param html_text: 站点首页html
         :return: 是否匹配
         """
-        pass
+        if not cls.has_fingerprint():
+            return False
+        return SiteSchemaMatcher([cls]).detect(html_text) is cls
 
     def parse(self):
         """
         解析站点信息
         :return:
         """
+        try:
+            self._parse()
+        finally:
+            self._clear_html_cache()
+
+    def _parse(self):
+        """
+        依次解析站点各页面信息
+        """
         # 检查是否已经登录
         if not self._parse_logged_in(self._index_html):
             return
@@ -226,49 +270,153 @@ class ISiteUserInfo(metaclass=ABCMeta):
         # 重新更新未读消息数（99999表示有消息但数量未知）
         if self.message_unread == 99999:
             self.message_unread = len(unread_msg_links)
-        # 解析未读消息内容
-        for msg_link in unread_msg_links:
+        # 并发获取未读消息内容，按顺序解析
+        msg_pages = self._get_pages_content(
+            urls=[urljoin(self._base_url, msg_link) for msg_link in unread_msg_links],
+            params=self._mail_content_params,
+            headers=self._mail_content_headers
+        )
+        for msg_link, msg_page in zip(unread_msg_links, msg_pages):
             logger.debug(f"{self.site_name} 信息链接 {msg_link}")
-            head, date, content = self._parse_message_content(
-                self._get_page_content(
-                    urljoin(self._base_url, msg_link),
-                    params=self._mail_content_params,
-                    headers=self._mail_content_headers
-                )
-            )
+            head, date, content = self._parse_message_content(msg_page)
             logger.debug(f"{self.site_name} 标题 {head} 时间 {date} 内容 {content}")
             self.message_unread_contents.append((head, date, content))
 
     def _parse_seeding_pages(self):
         """
-        解析做种页面
+        解析做种页面，能从页面中获取总页数时并发获取剩余页面
         """
         if self._torrent_seeding_page:
             # 第一页
-            next_page = self._parse_user_torrent_seeding_info(
-                self._get_page_content(
-                    url=urljoin(self._base_url, self._torrent_seeding_page),
-                    params=self._torrent_seeding_params,
-                    headers=self._torrent_seeding_headers
-                )
+            html_text = self._get_page_content(
+                url=urljoin(self._base_url, self._torrent_seeding_page),
+                params=self._torrent_seeding_params,
+                headers=self._torrent_seeding_headers
             )
+            next_page = self._parse_user_torrent_seeding_info(html_text)
 
             # 其他页处理
+            fetched_urls = set()
             while next_page is not None and next_page is not False:
-                next_page = self._parse_user_torrent_seeding_info(
-                    self._get_page_content(
-                        url=urljoin(urljoin(self._base_url, self._torrent_seeding_page), next_page),
-                        params=self._torrent_seeding_params,
-                        headers=self._torrent_seeding_headers
-                    ),
-                    multi_page=True)
+                seeding_url = urljoin(self._base_url, self._torrent_seeding_page)
+                page_urls = self.__get_remaining_page_urls(seeding_url, html_text, next_page)
+                if page_urls:
+                    logger.debug(f"{self.site_name} 并发获取做种页面 {len(page_urls)} 页")
+                    for html_text in self._get_pages_content(urls=page_urls,
+                                                             params=self._torrent_seeding_params,
+                                                             headers=self._torrent_seeding_headers):
+                        next_page = self._parse_user_torrent_seeding_info(html_text, multi_page=True)
+                    fetched_urls.update(page_urls)
+                    if next_page and urljoin(seeding_url, next_page) in fetched_urls:
+                        break
+                    continue
+                page_url = urljoin(seeding_url, next_page)
+                if page_url in fetched_urls:
+                    break
+                fetched_urls.add(page_url)
+                html_text = self._get_page_content(
+                    url=page_url,
+                    params=self._torrent_seeding_params,
+                    headers=self._torrent_seeding_headers
+                )
+                next_page = self._parse_user_torrent_seeding_info(html_text, multi_page=True)
 
-    @staticmethod
-    def _prepare_html_text(html_text):
+    def __get_remaining_page_urls(self, seeding_url: str, html_text: str, next_page: str) -> Optional[List[str]]:
+        """
+        根据下页地址及页面中的分页链接推算剩余全部页面地址，无法推算时返回None
+        """
+        if self.page_concurrency <= 1 or not html_text:
+            return None
+        next_url = urljoin(seeding_url, next_page)
+        page_match = re.search(r"([?&]page=)(\d+)", next_url)
+        if not page_match:
+            return None
+        next_num = int(page_match.group(2))
+        next_path = urlsplit(next_url).path
+        html = self._get_html_tree(html_text)
+        if html is None:
+            return None
+        last_num = next_num
+        for href in html.xpath('//a/@href'):
+            href_url = urljoin(seeding_url, str(href).strip())
+            if urlsplit(href_url).path != next_path:
+                continue
+            href_match = re.search(r"[?&]page=(\d+)", href_url)
+            if href_match:
+                last_num = max(last_num, int(href_match.group(1)))
+        if last_num <= next_num or last_num - next_num > MAX_CONCURRENT_PAGES:
+            return None
+        return [f"{next_url[:page_match.start(2)]}{num}{next_url[page_match.end(2):]}"
+                for num in range(next_num, last_num + 1)]
+
+    def _get_pages_content(self, urls: List[str], params: dict = None, headers: dict = None) -> List[str]:
         """
-        处理掉HTML中的干扰部分
+        并发获取多个页面，按地址顺序返回页面内容，单个站点受并发数及请求间隔限制
         """
-        return re.sub(r"#\d+", "", re.sub(r"\d+px", "", html_text))
+        if not urls:
+            return []
+        if len(urls) == 1 or self.page_concurrency <= 1:
+            return [self._get_page_content(url=url, params=params, headers=headers) for url in urls]
+
+        def get_page(url: str) -> str:
+            self.__wait_page_interval()
+            try:
+                return self._get_page_content(url=url, params=params, headers=headers)
+            except Exception as err:
+                logger.error(f"{self.site_name} 获取页面 {url} 失败：{str(err)}")
+                return ""
+
+        with ThreadPoolExecutor(max_workers=min(self.page_concurrency, len(urls)),
+                                thread_name_prefix=f"siteuserinfo-{self.site_domain}") as executor:
+            return list(executor.map(get_page, urls))
+
+    def __wait_page_interval(self):
+        """
+        保证同一站点两次请求之间的最小间隔
+        """
+        with self._page_request_lock:
+            wait = self._page_request_time + self.page_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._page_request_time = time.time()
+
+    def _prepare_html_text(self, html_text: str) -> str:
+        """
+        处理掉HTML中的干扰部分，同一页面只处理一次
+        """
+        return self.__get_cached(self._prepared_texts, html_text,
+                                 lambda: re.sub(r"#\d+", "", re.sub(r"\d+px", "", html_text)))
+
+    def _get_html_tree(self, html_text: str) -> Any:
+        """
+        获取页面的lxml解析结果，同一页面只解析一次，各解析方法只读使用
+        """
+        return self.__get_cached(self._html_trees, html_text, lambda: etree.HTML(html_text))
+
+    def _clear_html_cache(self):
+        """
+        清空页面解析缓存
+        """
+        with self._html_cache_lock:
+            self._html_trees.clear()
+            self._prepared_texts.clear()
+
+    def __get_cached(self, cache: OrderedDict, html_text: str, builder) -> Any:
+        """
+        以页面内容为键读取缓存，未命中时构建并保留最近使用的若干页面
+        """
+        if not html_text:
+            return builder()
+        with self._html_cache_lock:
+            if html_text in cache:
+                cache.move_to_end(html_text)
+                return cache[html_text]
+        value = builder()
+        with self._html_cache_lock:
+            cache[html_text] = value
+            while len(cache) > HTML_CACHE_SIZE:
+                cache.popitem(last=False)
+        return value
 
     @abstractmethod
     def _parse_message_unread_links(self, html_text: str, msg_links: list) -> Optional[str]:
@@ -429,3 +577,83 @@ class ISiteUserInfo(metaclass=ABCMeta):
             if isinstance(getattr(self, attr), SiteSchema)
             else getattr(self, attr) for attr in attributes
         }
+
+
+class SiteSchemaMatcher:
+    """
+    站点模型识别器，将各模型的识别特征合并为一个正则，首页html、页面文本及标题各扫描一次即可识别站点模型
+    """
+
+    # 识别特征的范围
+    _scopes = ("html", "text", "title")
+
+    def __init__(self, schemas: List[Any]):
+        self._schemas = sorted(schemas, key=lambda x: x.order)
+        self._keywords: Dict[str, Set[str]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        for scope in self._scopes:
+            keywords = {keyword for schema in self._schemas
+                        for keyword in getattr(schema, f"match_{scope}_keywords") if keyword}
+            if not keywords:
+                continue
+            self._keywords[scope] = keywords
+            # 零宽断言可命中每个位置，长关键字优先，被覆盖的短关键字在命中后补全
+            self._patterns[scope] = re.compile(
+                "(?=(%s))" % "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)),
+                re.S)
+
+    def detect(self, html_text: str) -> Optional[Any]:
+        """
+        按模型顺序返回第一个匹配的站点模型
+        :param html_text: 站点首页html
+        """
+        if not html_text:
+            return None
+        hits: Dict[str, Set[str]] = {}
+        documents: Dict[str, Any] = {}
+        for schema in self._schemas:
+            try:
+                if not schema.has_fingerprint():
+                    if schema.match(html_text):
+                        return schema
+                    continue
+                for scope in self._scopes:
+                    keywords = getattr(schema, f"match_{scope}_keywords")
+                    if not keywords:
+                        continue
+                    if scope not in hits:
+                        hits[scope] = self.__scan(scope, self.__get_document(scope, html_text, documents))
+                    if hits[scope].intersection(keywords):
+                        return schema
+            except Exception as e:
+                logger.error(f"站点匹配失败 {str(e)}")
+        return None
+
+    def __scan(self, scope: str, document: str) -> Set[str]:
+        """
+        扫描文本，返回命中的全部关键字
+        """
+        if not document:
+            return set()
+        matched = {match.group(1) for match in self._patterns[scope].finditer(document)}
+        return {keyword for keyword in self._keywords[scope] if any(keyword in m for m in matched)}
+
+    @staticmethod
+    def __get_document(scope: str, html_text: str, documents: Dict[str, Any]) -> str:
+        """
+        获取识别范围对应的文本，页面只解析一次
+        """
+        if scope == "html":
+            return html_text
+        if scope not in documents:
+            if "tree" not in documents:
+                documents["tree"] = etree.HTML(html_text)
+            html = documents["tree"]
+            if html is None:
+                documents[scope] = ""
+            elif scope == "text":
+                documents[scope] = html.xpath("string(.)")
+            else:
+                titles = html.xpath("//title/text()")
+                documents[scope] = str(titles[0]) if titles else ""
+        return documents[scope]
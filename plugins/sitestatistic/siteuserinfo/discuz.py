@@ -2,8 +2,6 @@
 import re
 from typing import Optional
 
-from lxml import etree
-
 from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDER, SiteSchema
 from app.utils.string import StringUtils
 
@@ -11,19 +9,11 @@ from app.utils.string import StringUtils
 class DiscuzUserInfo(ISiteUserInfo):
     schema = SiteSchema.DiscuzX
     order = SITE_BASE_ORDER + 10
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
-        return 'Powered by Discuz!' in printable_text
+    match_text_keywords = ('Powered by Discuz!',)
 
     def _parse_user_base_info(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
 
         user_info = html.xpath('//a[contains(@href, "&uid=")]')
         if user_info:
@@ -44,7 +34,7 @@ class DiscuzUserInfo(ISiteUserInfo):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return None
 
@@ -87,7 +77,7 @@ class DiscuzUserInfo(ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return None
 
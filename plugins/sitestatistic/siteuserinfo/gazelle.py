@@ -2,8 +2,6 @@
 import re
 from typing import Optional
 
-from lxml import etree
-
 from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDER, SiteSchema
 from app.utils.string import StringUtils
 
@@ -11,20 +9,11 @@ from app.utils.string import StringUtils
 class GazelleSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.Gazelle
     order = SITE_BASE_ORDER
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
-
-        return "Powered by Gazelle" in printable_text or "DIC Music" in printable_text
+    match_text_keywords = ('Powered by Gazelle', 'DIC Music')
 
     def _parse_user_base_info(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
 
         tmps = html.xpath('//a[contains(@href, "user.php?id=")]')
         if tmps:
@@ -76,7 +65,7 @@ class GazelleSiteUserInfo(ISiteUserInfo):
         :param html_text:
         :return:
         """
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return None
 
@@ -106,7 +95,7 @@ class GazelleSiteUserInfo(ISiteUserInfo):
         :param multi_page: 是否多页数据
         :return: 下页地址
         """
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return None
 
@@ -2,8 +2,6 @@
 import re
 from typing import Optional
 
-from lxml import etree
-
 from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDER, SiteSchema
 from app.utils.string import StringUtils
 
@@ -11,14 +9,11 @@ from app.utils.string import StringUtils
 class IptSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.Ipt
     order = SITE_BASE_ORDER + 35
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'IPTorrents' in html_text
+    match_html_keywords = ('IPTorrents',)
 
     def _parse_user_base_info(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         tmps = html.xpath('//a[contains(@href, "/u/")]//text()')
         tmps_id = html.xpath('//a[contains(@href, "/u/")]/@href')
         if tmps:
@@ -44,7 +39,7 @@ class IptSiteUserInfo(ISiteUserInfo):
         pass
 
     def _parse_user_detail_info(self, html_text: str):
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return
 
@@ -58,7 +53,7 @@ class IptSiteUserInfo(ISiteUserInfo):
             self.join_at = StringUtils.unify_datetime_str(join_at_text[0].split(' (')[0])
 
     def _parse_user_torrent_seeding_info(self, html_text: str, multi_page: bool = False) -> Optional[str]:
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return
         # seeding start
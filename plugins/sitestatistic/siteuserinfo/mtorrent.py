@@ -3,8 +3,6 @@ import json
 from typing import Optional, Tuple
 from urllib.parse import urljoin
 
-from lxml import etree
-
 from app.log import logger
 from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDER, SiteSchema
 
@@ -12,6 +10,7 @@ from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDE
 class MTorrentSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.MTorrent
     order = SITE_BASE_ORDER + 60
+    match_title_keywords = ('M-Team',)
     request_mode = "apikey"
 
     # 用户级别字典
@@ -36,15 +35,6 @@ class MTorrentSiteUserInfo(ISiteUserInfo):
         "18": "Bet memberStaff",
     }
 
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-        if html.xpath("//title/text()") and "M-Team" in html.xpath("//title/text()")[0]:
-            return True
-        return False
-
     def _parse_site_page(self, html_text: str):
         """
         获取站点页面地址
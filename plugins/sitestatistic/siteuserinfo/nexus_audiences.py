@@ -8,10 +8,7 @@ from app.plugins.sitestatistic.siteuserinfo.nexus_php import NexusPhpSiteUserInf
 class NexusAudiencesSiteUserInfo(NexusPhpSiteUserInfo):
     schema = SiteSchema.NexusAudiences
     order = SITE_BASE_ORDER + 5
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'audiences.me' in html_text
+    match_html_keywords = ('audiences.me',)
 
     def _parse_seeding_pages(self):
         self._torrent_seeding_headers = {"Referer": urljoin(self._base_url, self._user_detail_page)}
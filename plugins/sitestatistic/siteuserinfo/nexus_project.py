@@ -8,10 +8,7 @@ from app.plugins.sitestatistic.siteuserinfo.nexus_php import NexusPhpSiteUserInf
 class NexusProjectSiteUserInfo(NexusPhpSiteUserInfo):
     schema = SiteSchema.NexusProject
     order = SITE_BASE_ORDER + 25
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'Nexus Project' in html_text
+    match_html_keywords = ('Nexus Project',)
 
     def _parse_site_page(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
@@ -2,8 +2,6 @@
 import json
 from typing import Optional
 
-from lxml import etree
-
 from app.log import logger
 from app.plugins.sitestatistic.siteuserinfo import SITE_BASE_ORDER, SiteSchema
 from app.plugins.sitestatistic.siteuserinfo.nexus_php import NexusPhpSiteUserInfo
@@ -12,15 +10,7 @@ from app.plugins.sitestatistic.siteuserinfo.nexus_php import NexusPhpSiteUserInf
 class NexusRabbitSiteUserInfo(NexusPhpSiteUserInfo):
     schema = SiteSchema.NexusRabbit
     order = SITE_BASE_ORDER + 5
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        html = etree.HTML(html_text)
-        if not html:
-            return False
-
-        printable_text = html.xpath("string(.)") if html else ""
-        return 'Style by Rabbit' in printable_text
+    match_text_keywords = ('Style by Rabbit',)
 
     def _parse_site_page(self, html_text: str):
         super()._parse_site_page(html_text)
@@ -2,8 +2,6 @@
 import re
 from typing import Optional
 
-from lxml import etree
-
 from app.plugins.sitestatistic.siteuserinfo import ISiteUserInfo, SITE_BASE_ORDER, SiteSchema
 from app.utils.string import StringUtils
 
@@ -11,10 +9,7 @@ from app.utils.string import StringUtils
 class SmallHorseSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.SmallHorse
     order = SITE_BASE_ORDER + 30
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'Small Horse' in html_text
+    match_html_keywords = ('Small Horse',)
 
     def _parse_site_page(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
@@ -28,7 +23,7 @@ class SmallHorseSiteUserInfo(ISiteUserInfo):
 
     def _parse_user_base_info(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         ret = html.xpath('//a[contains(@href, "user.php")]//text()')
         if ret:
             self.username = str(ret[0])
@@ -40,7 +35,7 @@ class SmallHorseSiteUserInfo(ISiteUserInfo):
         :return:
         """
         html_text = self._prepare_html_text(html_text)
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         tmps = html.xpath('//ul[@class = "stats nobullet"]')
         if tmps:
             if tmps[1].xpath("li") and tmps[1].xpath("li")[0].xpath("span//text()"):
@@ -67,7 +62,7 @@ class SmallHorseSiteUserInfo(ISiteUserInfo):
          :param multi_page: 是否多页数据
          :return: 下页地址
          """
-        html = etree.HTML(html_text)
+        html = self._get_html_tree(html_text)
         if not html:
             return None
 
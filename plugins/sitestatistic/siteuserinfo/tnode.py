@@ -10,10 +10,7 @@ from app.utils.string import StringUtils
 class TNodeSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.TNode
     order = SITE_BASE_ORDER + 60
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return 'Powered By TNode' in html_text
+    match_html_keywords = ('Powered By TNode',)
 
     def _parse_site_page(self, html_text: str):
         html_text = self._prepare_html_text(html_text)
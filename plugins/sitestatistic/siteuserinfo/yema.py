@@ -11,10 +11,7 @@ from app.utils.string import StringUtils
 class TYemaSiteUserInfo(ISiteUserInfo):
     schema = SiteSchema.Yema
     order = SITE_BASE_ORDER + 60
-
-    @classmethod
-    def match(cls, html_text: str) -> bool:
-        return '<title>YemaPT</title>' in html_text
+    match_html_keywords = ('<title>YemaPT</title>',)
 
     def _parse_site_page(self, html_text: str):
         """
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.log import logger
+
+# 按列存储的站点数据字段，其余字段保存在extra中
+STAT_COLUMNS = ("upload", "download", "ratio", "seeding", "seeding_size", "leeching", "bonus",
+                "message_unread", "username", "user_level", "join_at", "url", "err_msg", "updated_at")
+# 降采样周期对应的日期格式
+STAT_INTERVALS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-%W",
+    "month": "%Y-%m",
+}
+
+
+class SiteStatStore:
+    """
+    站点数据时间序列存储，每天每个站点一行，按日期及站点建立索引，支持区间查询及按周、月降采样
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.__init_schema()
+
+    def __init_schema(self):
+        columns = ", ".join(STAT_COLUMNS)
+        with self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS site_stats (
+                    date TEXT NOT NULL,
+                    site TEXT NOT NULL,
+                    {columns},
+                    extra TEXT,
+                    PRIMARY KEY (date, site)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_site_stats_site ON site_stats (site, date)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def migrate(self, loader: Callable[[], Iterable[Tuple[str, dict]]]):
+        """
+        从插件数据迁移历史站点数据，仅执行一次
+        :param loader: 返回（日期，当天站点数据）的方法
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+            days = 0
+            for date, sites_data in loader() or []:
+                if isinstance(sites_data, dict):
+                    self.save_day(date=date, sites_data=sites_data)
+                    days += 1
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+            logger.info(f"站点数据迁移完成，共 {days} 天")
+
+    def save_day(self, date: str, sites_data: Dict[str, dict]):
+        """
+        保存某一天全部站点的数据，覆盖当天已有数据
+        """
+        rows = []
+        for site, data in sites_data.items():
+            data = data or {}
+            extra = {key: value for key, value in data.items() if key not in STAT_COLUMNS}
+            rows.append((date, site, *[data.get(column) for column in STAT_COLUMNS],
+                         json.dumps(extra, ensure_ascii=False) if extra else None))
+        placeholders = ", ".join("?" * (len(STAT_COLUMNS) + 3))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM site_stats WHERE date = ?", (date,))
+            self._conn.executemany(
+                f"INSERT INTO site_stats (date, site, {', '.join(STAT_COLUMNS)}, extra) VALUES ({placeholders})",
+                rows)
+
+    def latest_dates(self, limit: int = 2) -> List[str]:
+        """
+        最近有数据的日期，按日期倒序
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT date FROM site_stats ORDER BY date DESC LIMIT ?",
+                                      (limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_day(self, date: str) -> Dict[str, dict]:
+        """
+        读取某一天全部站点的数据
+        """
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT site, {', '.join(STAT_COLUMNS)}, extra "
+                                        f"FROM site_stats WHERE date = ?", (date,))
+            return {row[0]: self.__to_data(row[1:]) for row in cursor.fetchall()}
+
+    def get_range(self, start: str, end: str, sites: Optional[List[str]] = None,
+                  interval: str = "day") -> List[Tuple[str, str, dict]]:
+        """
+        区间查询站点数据，按周期降采样，每个站点每个周期取最后一天的数据
+        :param start: 开始日期（含）
+        :param end: 结束日期（含）
+        :param sites: 站点名称，为空时查询全部站点
+        :param interval: 降采样周期 day/week/month
+        :return: （日期，站点，站点数据）列表，按日期升序
+        """
+        period = STAT_INTERVALS.get(interval) or STAT_INTERVALS["day"]
+        site_filter = ""
+        params: List[Any] = [start, end]
+        if sites:
+            site_filter = f" AND site IN ({', '.join('?' * len(sites))})"
+            params.extend(sites)
+        params.append(period)
+        sql = f"""
+            SELECT s.date, s.site, {', '.join(f's.{column}' for column in STAT_COLUMNS)}, s.extra
+            FROM site_stats s JOIN (
+                SELECT site, MAX(date) AS date FROM site_stats
+                WHERE date BETWEEN ? AND ?{site_filter}
+                GROUP BY site, strftime(?, date)
+            ) latest ON s.site = latest.site AND s.date = latest.date
+            ORDER BY s.date, s.site
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(row[0], row[1], self.__to_data(row[2:])) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def __to_data(values: tuple) -> dict:
+        """
+        将一行数据还原为站点数据字典，忽略空字段
+        """
+        data = {column: value for column, value in zip(STAT_COLUMNS, values) if value is not None}
+        extra = values[len(STAT_COLUMNS)]
+        if extra:
+            data.update(json.loads(extra))
+        return data
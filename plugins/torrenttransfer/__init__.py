@@ -1,8 +1,10 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from threading import Event
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Set
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -16,7 +18,6 @@ from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
 from app.schemas import NotificationType
-from app.utils.string import StringUtils
 
 
 class TorrentTransfer(_PluginBase):
@@ -27,7 +28,7 @@ class TorrentTransfer(_PluginBase):
     # 插件图标
     plugin_icon = "seed.png"
     # 插件版本
-    plugin_version = "1.4"
+    plugin_version = "1.5"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -68,6 +69,12 @@ class TorrentTransfer(_PluginBase):
     _is_recheck_running = False
     # 任务标签
     _torrent_tags = ["已整理", "转移做种"]
+    # 每批添加的任务数
+    _batch_size = 50
+    # 确认添加结果的最短等待时间（秒）
+    _confirm_timeout = 10
+    # 读取种子文件的线程数
+    _prepare_workers = 8
 
     def init_plugin(self, config: dict = None):
         self.torrent = TorrentHelper()
@@ -520,40 +527,134 @@ class TorrentTransfer(_PluginBase):
         else:
             return None
 
-    def __download(self, downloader: str, content: bytes,
-                   save_path: str) -> Optional[str]:
+    def __get_exist_hashes(self, downloader: str, hashes: List[str]) -> Set[str]:
         """
-        添加下载任务
+        一次性获取目的下载器中的全部种子hash，获取失败时按需转移的种子批量查询
         """
+        downloader_obj = self.__get_downloader(downloader)
+        torrents, error = downloader_obj.get_torrents()
+        if error:
+            logger.warn(f"获取下载器 {downloader} 全部种子失败，改为按hash批量查询 ...")
+            torrents = []
+            for i in range(0, len(hashes), self._batch_size):
+                chunk_torrents, _ = downloader_obj.get_torrents(ids=hashes[i:i + self._batch_size])
+                torrents.extend(chunk_torrents or [])
+        return {self.__get_hash(torrent, downloader) for torrent in torrents or []}
+
+    def __prepare_torrent(self, torrent_item: dict, downloader: str) -> Optional[dict]:
+        """
+        读取种子文件并转换保存路径，源下载器为QB且种子中没有tracker时从fastresume文件补充
+        :return: 添加下载任务所需信息，失败时返回None
+        """
+        # 检查种子文件是否存在
+        torrent_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.torrent"
+        if not torrent_file.exists():
+            logger.error(f"种子文件不存在：{torrent_file}")
+            return None
+
+        # 转换保存路径
+        download_dir = self.__convert_save_path(torrent_item.get('save_path'),
+                                                self._frompath,
+                                                self._topath)
+        if not download_dir:
+            logger.error(f"转换保存路径失败：{torrent_item.get('save_path')}")
+            return None
+
+        # 读取种子内容
+        content = torrent_file.read_bytes()
+        if not content:
+            logger.warn(f"读取种子文件失败：{torrent_file}")
+            return None
+
+        # 如果源下载器是QB检查是否有Tracker，没有的话额外获取
         if downloader == "qbittorrent":
-            # 生成随机Tag
-            tag = StringUtils.generate_random_str(10)
-            state = self.qb.add_torrent(content=content,
-                                        download_dir=save_path,
-                                        is_paused=True,
-                                        tag=["已整理", "转移做种", tag])
-            if not state:
+            # 读取trackers
+            try:
+                torrent_main = bdecode(content)
+                main_announce = torrent_main.get('announce')
+            except Exception as err:
+                logger.warn(f"解析种子文件 {torrent_file} 失败：{str(err)}")
                 return None
-            else:
-                # 获取种子Hash
-                torrent_hash = self.qb.get_torrent_id_by_tag(tags=tag)
-                if not torrent_hash:
-                    logger.error(f"{downloader} 下载任务添加成功，但获取任务信息失败！")
+
+            if not main_announce:
+                logger.info(f"{torrent_item.get('hash')} 未发现tracker信息，尝试补充tracker信息...")
+                # 读取fastresume文件
+                fastresume_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.fastresume"
+                if not fastresume_file.exists():
+                    logger.warn(f"fastresume文件不存在：{fastresume_file}")
+                    return None
+                # 尝试补充trackers
+                try:
+                    # 解析fastresume文件
+                    fastresume = fastresume_file.read_bytes()
+                    torrent_fastresume = bdecode(fastresume)
+                    # 读取trackers
+                    fastresume_trackers = torrent_fastresume.get('trackers')
+                    if isinstance(fastresume_trackers, list) \
+                            and len(fastresume_trackers) > 0 \
+                            and fastresume_trackers[0]:
+                        # 重新赋值
+                        torrent_main['announce'] = fastresume_trackers[0][0]
+                        # 重新编码
+                        content = bencode(torrent_main)
+                except Exception as err:
+                    logger.error(f"解析fastresume文件 {fastresume_file} 出错：{str(err)}")
                     return None
-            return torrent_hash
-        elif downloader == "transmission":
-            # 添加任务
-            torrent = self.tr.add_torrent(content=content,
-                                          download_dir=save_path,
-                                          is_paused=True,
-                                          labels=["已整理", "转移做种"])
-            if not torrent:
-                return None
-            else:
-                return torrent.hashString
 
-        logger.error(f"不支持的下载器：{downloader}")
-        return None
+        return {
+            "hash": torrent_item.get("hash"),
+            "torrent_file": torrent_file,
+            "content": content,
+            "download_dir": download_dir
+        }
+
+    def __add_torrents(self, downloader: str, tasks: List[dict]) -> Tuple[List[str], List[str]]:
+        """
+        批量添加下载任务，默认暂停，添加完成后查询目的下载器确认添加成功的任务
+        :return: 确认添加成功的种子hash，已提交但未能确认的种子hash
+        """
+        downloader_obj = self.__get_downloader(downloader)
+        submitted = []
+        for task in tasks:
+            # 发送到另一个下载器中下载：默认暂停、传输下载路径、关闭自动管理模式
+            logger.info(f"添加转移做种任务到下载器 {downloader}：{task.get('torrent_file')}")
+            if downloader == "qbittorrent":
+                state = self.qb.add_torrent(content=task.get("content"),
+                                            download_dir=task.get("download_dir"),
+                                            is_paused=True,
+                                            tag=self._torrent_tags)
+            elif downloader == "transmission":
+                state = self.tr.add_torrent(content=task.get("content"),
+                                            download_dir=task.get("download_dir"),
+                                            is_paused=True,
+                                            labels=self._torrent_tags)
+            else:
+                logger.error(f"不支持的下载器：{downloader}")
+                return [], []
+            if state:
+                submitted.append(task)
+            else:
+                logger.error(f"添加下载任务失败：{task.get('torrent_file')}")
+
+        # 种子hash不受tracker补充影响，直接按hash确认
+        # QB添加任务为异步处理，按任务数延长等待时间，持续查询直到全部出现或超时
+        pending = {task.get("hash") for task in submitted}
+        added_hashes = set()
+        deadline = time.time() + max(self._confirm_timeout, len(submitted) * 0.5)
+        while pending:
+            torrents, _ = downloader_obj.get_torrents(ids=list(pending))
+            found = {self.__get_hash(torrent, downloader) for torrent in torrents or []} & pending
+            added_hashes |= found
+            pending -= found
+            if not pending or time.time() >= deadline or self._event.wait(1):
+                break
+        for task in submitted:
+            if task.get("hash") in added_hashes:
+                logger.info(f"成功添加转移做种任务，种子文件：{task.get('torrent_file')}")
+            else:
+                logger.warn(f"已提交下载任务但未能确认添加结果：{task.get('torrent_file')}，hash：{task.get('hash')}")
+        return ([task.get("hash") for task in submitted if task.get("hash") in added_hashes],
+                [task.get("hash") for task in submitted if task.get("hash") not in added_hashes])
 
     def transfer(self):
         """
@@ -566,6 +667,7 @@ class TorrentTransfer(_PluginBase):
         # 目的下载器
         todownloader = self._todownloader
 
+        start_time = time.time()
         # 获取下载器中已完成的种子
         downloader_obj = self.__get_downloader(downloader)
         torrents = downloader_obj.get_completed_torrents()
@@ -648,132 +750,103 @@ class TorrentTransfer(_PluginBase):
             success = 0
             # 总失败数
             fail = 0
+            # 未确认数
+            unconfirmed = 0
             # 跳过数
             skip = 0
             # 删除重复数
             del_dup = 0
-
+            # 各阶段耗时
+            timings = {"筛选种子": time.time() - start_time}
+
+            # 一次性获取目的下载器中的全部种子hash
+            phase_time = time.time()
+            todownloader_obj = self.__get_downloader(todownloader)
+            exist_hashes = self.__get_exist_hashes(todownloader, [item.get("hash") for item in trans_torrents])
+            timings["查询目的下载器"] = time.time() - phase_time
+
+            # 已在目的下载器中的种子
+            new_torrents = []
+            duplicate_hashes = []
             for torrent_item in trans_torrents:
-                # 检查种子文件是否存在
-                torrent_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.torrent"
-                if not torrent_file.exists():
-                    logger.error(f"种子文件不存在：{torrent_file}")
-                    # 失败计数
-                    fail += 1
-                    continue
-
-                # 查询hash值是否已经在目的下载器中
-                todownloader_obj = self.__get_downloader(todownloader)
-                torrent_info, _ = todownloader_obj.get_torrents(ids=[torrent_item.get('hash')])
-                if torrent_info:
-                    # 删除重复的源种子，不能删除文件！
-                    if self._deleteduplicate:
-                        logger.info(f"删除重复的源下载器任务（不含文件）：{torrent_item.get('hash')} ...")
-                        downloader_obj.delete_torrents(delete_file=False, ids=[torrent_item.get('hash')])
-                        del_dup += 1
-                    else:
-                        logger.info(f"{torrent_item.get('hash')} 已在目的下载器中，跳过 ...")
-                        # 跳过计数
-                        skip += 1
-                    continue
-
-                # 转换保存路径
-                download_dir = self.__convert_save_path(torrent_item.get('save_path'),
-                                                        self._frompath,
-                                                        self._topath)
-                if not download_dir:
-                    logger.error(f"转换保存路径失败：{torrent_item.get('save_path')}")
-                    # 失败计数
-                    fail += 1
-                    continue
-
-                # 如果源下载器是QB检查是否有Tracker，没有的话额外获取
-                if downloader == "qbittorrent":
-                    # 读取种子内容、解析种子文件
-                    content = torrent_file.read_bytes()
-                    if not content:
-                        logger.warn(f"读取种子文件失败：{torrent_file}")
-                        fail += 1
-                        continue
-                    # 读取trackers
-                    try:
-                        torrent_main = bdecode(content)
-                        main_announce = torrent_main.get('announce')
-                    except Exception as err:
-                        logger.warn(f"解析种子文件 {torrent_file} 失败：{str(err)}")
-                        fail += 1
+                if torrent_item.get("hash") not in exist_hashes:
+                    new_torrents.append(torrent_item)
+                elif self._deleteduplicate:
+                    duplicate_hashes.append(torrent_item.get("hash"))
+                else:
+                    logger.info(f"{torrent_item.get('hash')} 已在目的下载器中，跳过 ...")
+                    # 跳过计数
+                    skip += 1
+            if duplicate_hashes:
+                # 删除重复的源种子，不能删除文件！
+                logger.info(f"删除重复的源下载器任务（不含文件）：{len(duplicate_hashes)} 个 ...")
+                downloader_obj.delete_torrents(delete_file=False, ids=duplicate_hashes)
+                del_dup += len(duplicate_hashes)
+
+            # 分批读取种子文件、补充tracker信息并添加到目的下载器，内存中只保留当前批次的种子内容
+            timings["准备种子文件"] = 0
+            timings["添加下载任务"] = 0
+            with ThreadPoolExecutor(max_workers=self._prepare_workers) as executor:
+                for i in range(0, len(new_torrents), self._batch_size):
+                    if self._event.is_set():
+                        logger.info(f"转移服务停止")
+                        break
+                    # 并发准备当前批次
+                    phase_time = time.time()
+                    batch = []
+                    for task in executor.map(lambda item: self.__prepare_torrent(item, downloader),
+                                             new_torrents[i:i + self._batch_size]):
+                        if task:
+                            batch.append(task)
+                        else:
+                            # 失败计数
+                            fail += 1
+                    timings["准备种子文件"] += time.time() - phase_time
+                    if not batch:
                         continue
 
-                    if not main_announce:
-                        logger.info(f"{torrent_item.get('hash')} 未发现tracker信息，尝试补充tracker信息...")
-                        # 读取fastresume文件
-                        fastresume_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.fastresume"
-                        if not fastresume_file.exists():
-                            logger.warn(f"fastresume文件不存在：{fastresume_file}")
-                            fail += 1
-                            continue
-                        # 尝试补充trackers
-                        try:
-                            # 解析fastresume文件
-                            fastresume = fastresume_file.read_bytes()
-                            torrent_fastresume = bdecode(fastresume)
-                            # 读取trackers
-                            fastresume_trackers = torrent_fastresume.get('trackers')
-                            if isinstance(fastresume_trackers, list) \
-                                    and len(fastresume_trackers) > 0 \
-                                    and fastresume_trackers[0]:
-                                # 重新赋值
-                                torrent_main['announce'] = fastresume_trackers[0][0]
-                                # 替换种子文件路径
-                                torrent_file = settings.TEMP_PATH / f"{torrent_item.get('hash')}.torrent"
-                                # 编码并保存到临时文件
-                                torrent_file.write_bytes(bencode(torrent_main))
-                        except Exception as err:
-                            logger.error(f"解析fastresume文件 {fastresume_file} 出错：{str(err)}")
-                            fail += 1
-                            continue
-
-                # 发送到另一个下载器中下载：默认暂停、传输下载路径、关闭自动管理模式
-                logger.info(f"添加转移做种任务到下载器 {todownloader}：{torrent_file}")
-                download_id = self.__download(downloader=todownloader,
-                                              content=torrent_file.read_bytes(),
-                                              save_path=download_dir)
-                if not download_id:
-                    # 下载失败
-                    fail += 1
-                    logger.error(f"添加下载任务失败：{torrent_file}")
-                    continue
-                else:
-                    # 下载成功
-                    logger.info(f"成功添加转移做种任务，种子文件：{torrent_file}")
+                    phase_time = time.time()
+                    added_hashes, unconfirmed_hashes = self.__add_torrents(todownloader, batch)
+                    timings["添加下载任务"] += time.time() - phase_time
+                    fail += len(batch) - len(added_hashes) - len(unconfirmed_hashes)
+                    unconfirmed += len(unconfirmed_hashes)
+                    # 未确认的任务可能稍后才出现在下载器中，同样校验并检查，但不删除源任务
+                    recheck_hashes = added_hashes + unconfirmed_hashes
+                    if not recheck_hashes:
+                        continue
 
                     # TR会自动校验，QB需要手动校验
                     if todownloader == "qbittorrent":
-                        logger.info(f"qbittorrent 开始校验 {download_id} ...")
-                        todownloader_obj.recheck_torrents(ids=[download_id])
+                        logger.info(f"qbittorrent 开始校验 {len(recheck_hashes)} 个任务 ...")
+                        todownloader_obj.recheck_torrents(ids=recheck_hashes)
 
                     # 追加校验任务
-                    logger.info(f"添加校验检查任务：{download_id} ...")
+                    logger.info(f"添加校验检查任务：{len(recheck_hashes)} 个 ...")
                     if not self._recheck_torrents.get(todownloader):
                         self._recheck_torrents[todownloader] = []
-                    self._recheck_torrents[todownloader].append(download_id)
+                    self._recheck_torrents[todownloader].extend(recheck_hashes)
+                    if not added_hashes:
+                        continue
 
                     # 删除源种子，不能删除文件！
                     if self._deletesource:
-                        logger.info(f"删除源下载器任务（不含文件）：{torrent_item.get('hash')} ...")
-                        downloader_obj.delete_torrents(delete_file=False, ids=[torrent_item.get('hash')])
-
-                    # 成功计数
-                    success += 1
-                    # 插入转种记录
-                    history_key = "%s-%s" % (self._fromdownloader, torrent_item.get('hash'))
-                    self.save_data(key=history_key,
-                                   value={
-                                       "to_download": self._todownloader,
-                                       "to_download_id": download_id,
-                                       "delete_source": self._deletesource,
-                                       "delete_duplicate": self._deleteduplicate,
-                                   })
+                        logger.info(f"删除源下载器任务（不含文件）：{len(added_hashes)} 个 ...")
+                        downloader_obj.delete_torrents(delete_file=False, ids=added_hashes)
+
+                    for download_id in added_hashes:
+                        # 成功计数
+                        success += 1
+                        # 插入转种记录
+                        history_key = "%s-%s" % (self._fromdownloader, download_id)
+                        self.save_data(key=history_key,
+                                       value={
+                                           "to_download": self._todownloader,
+                                           "to_download_id": download_id,
+                                           "delete_source": self._deletesource,
+                                           "delete_duplicate": self._deleteduplicate,
+                                       })
+            logger.info("转移做种各阶段耗时：" + "，".join(f"{name} {cost:.2f}秒" for name, cost in timings.items()))
+
             # 触发校验任务
             if success > 0 and self._autostart:
                 self.check_recheck()
@@ -783,7 +856,8 @@ class TorrentTransfer(_PluginBase):
                 self.post_message(
                     mtype=NotificationType.SiteMessage,
                     title="【转移做种任务执行完成】",
-                    text=f"总数：{total}，成功：{success}，失败：{fail}，跳过：{skip}，删除重复：{del_dup}"
+                    text=f"总数：{total}，成功：{success}，失败：{fail}，未确认：{unconfirmed}，"
+                         f"跳过：{skip}，删除重复：{del_dup}"
                 )
         else:
             logger.info(f"没有需要转移的种子")